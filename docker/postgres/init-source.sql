@@ -358,6 +358,20 @@ CREATE TABLE ecommerce.invoice_items (
 -- Index
 CREATE INDEX idx_invoice_items_invoice ON ecommerce.invoice_items(invoice_id);
 
+-- Index cho incremental ingestion (watermark updated_at, id; child tables: created_at, id)
+CREATE INDEX idx_categories_updated_at ON ecommerce.categories(updated_at, id);
+CREATE INDEX idx_products_updated_at ON ecommerce.products(updated_at, id);
+CREATE INDEX idx_customers_updated_at ON ecommerce.customers(updated_at, id);
+CREATE INDEX idx_orders_updated_at ON ecommerce.orders(updated_at, id);
+CREATE INDEX idx_payments_updated_at ON ecommerce.payments(updated_at, id);
+CREATE INDEX idx_invoices_updated_at ON ecommerce.invoices(updated_at, id);
+CREATE INDEX idx_order_items_created_at ON ecommerce.order_items(created_at, id);
+CREATE INDEX idx_invoice_items_created_at ON ecommerce.invoice_items(created_at, id);
+
+-- 💡 GIẢI THÍCH:
+-- Export incremental lọc WHERE (updated_at, id) > (last_ts, last_id)
+-- Index (updated_at, id) giúp chỉ quét rows thay đổi thay vì cả table
+
 -- ============================================================================
 -- PHẦN 5: TẠO FUNCTIONS VÀ TRIGGERS
 -- ============================================================================
@@ -490,6 +504,18 @@ ORDER BY order_date DESC, channel;
 
 COMMENT ON VIEW ecommerce.v_daily_sales IS 'View doanh số bán hàng theo ngày và kênh';
 
+-- ============================================================================
+-- PHẦN 7: PUBLICATION CHO CDC
+-- ============================================================================
+
+-- Publication cho logical replication (--mode cdc của export_to_staging.py)
+CREATE PUBLICATION ecommerce_cdc FOR TABLES IN SCHEMA ecommerce;
+
+-- 💡 GIẢI THÍCH:
+-- Cần server chạy với wal_level=logical (xem docker-compose.yml)
+-- Plugin pgoutput chỉ gửi thay đổi của các tables trong publication
+-- Replication slot được tạo khi chạy CDC lần đầu
+
 -- ============================================================================
 -- HOÀN TẤT
 -- ============================================================================
@@ -0,0 +1,95 @@
+"""
+===============================================================================
+FILE: benchmark_export.py
+PURPOSE: Benchmark các export engine của IngestPipeline (pandas vs COPY)
+AUTHOR: Data Engineering Team
+VERSION: 1.0
+
+HƯỚNG DẪN SỬ DỤNG:
+    # Benchmark tất cả engine với CSV và Parquet
+    python scripts/benchmarks/benchmark_export.py
+
+    # Chỉ benchmark một vài table, lặp 3 lần
+    python scripts/benchmarks/benchmark_export.py --tables orders order_items --repeat 3
+
+CÁCH ĐO:
+    Mỗi cấu hình chạy IngestPipeline vào một thư mục tạm,
+    lấy duration/rows/peak RSS từ kết quả pipeline rồi in bảng so sánh.
+    Số liệu phụ thuộc máy và kích thước DB nguồn.
+===============================================================================
+"""
+
+import sys
+import argparse
+import logging
+import tempfile
+from pathlib import Path
+
+# Cho phép chạy trực tiếp: python scripts/benchmarks/benchmark_export.py
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.ingestion.export_to_staging import IngestPipeline  # noqa: E402
+
+
+# Các cấu hình cần so sánh: (label, output_format, pipeline kwargs)
+SCENARIOS = [
+    ('pandas read_sql', 'csv', {'engine': 'pandas'}),
+    ('copy', 'csv', {'engine': 'copy'}),
+    ('pandas read_sql', 'parquet', {'engine': 'pandas'}),
+    ('pandas stream', 'parquet', {'engine': 'pandas', 'stream': True}),
+    ('copy', 'parquet', {'engine': 'copy'}),
+]
+
+
+def run_scenario(tables, output_format: str, kwargs: dict) -> dict:
+    """Chạy pipeline một lần trong thư mục tạm, trả về kết quả"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pipeline = IngestPipeline(
+            tables=tables,
+            output_format=output_format,
+            staging_path=tmp_dir,
+            **kwargs
+        )
+        result = pipeline.run()
+
+    if not result['success']:
+        raise RuntimeError(f"Benchmark run failed: {result.get('error')}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark IngestPipeline export engines')
+    parser.add_argument('--tables', nargs='+', help='Tables to export (default: all)')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per scenario (best is reported)')
+    args = parser.parse_args()
+
+    # Log của pipeline rất dài, chỉ giữ warning khi benchmark
+    logging.getLogger('src.ingestion.export_to_staging').setLevel(logging.WARNING)
+
+    rows = []
+    for label, output_format, kwargs in SCENARIOS:
+        best = None
+        for _ in range(args.repeat):
+            result = run_scenario(args.tables, output_format, kwargs)
+            if best is None or result['duration_seconds'] < best['duration_seconds']:
+                best = result
+
+        total_rows = sum(t['rows'] for t in best['tables'])
+        peak_rss = max(t['peak_rss_mb'] for t in best['tables'])
+        rows.append((label, output_format, best['duration_seconds'], total_rows, peak_rss))
+
+    baseline = {fmt: dur for label, fmt, dur, _, _ in rows if label == 'pandas read_sql'}
+
+    print(f"\n{'engine':<18}{'format':<10}{'seconds':>10}{'rows/s':>14}{'peak MB':>10}{'speedup':>10}")
+    print('-' * 72)
+    for label, output_format, duration, total_rows, peak_rss in rows:
+        rows_per_sec = total_rows / duration if duration else 0
+        speedup = baseline[output_format] / duration if duration else 0
+        print(
+            f"{label:<18}{output_format:<10}{duration:>10.2f}"
+            f"{rows_per_sec:>14,.0f}{peak_rss:>10.1f}{speedup:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
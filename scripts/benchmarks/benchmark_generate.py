@@ -0,0 +1,103 @@
+"""
+===============================================================================
+FILE: benchmark_generate.py
+PURPOSE: Benchmark các engine sinh orders của OrderGenerator (python vs numpy)
+AUTHOR: Data Engineering Team
+VERSION: 1.0
+
+HƯỚNG DẪN SỬ DỤNG:
+    # So sánh 2 engine với 100,000 orders
+    python scripts/benchmarks/benchmark_generate.py
+
+    # Chỉ chạy engine numpy ở quy mô load test
+    python scripts/benchmarks/benchmark_generate.py --orders 10000000 --engines numpy
+
+CÁCH ĐO:
+    Không cần database: customer_ids và products được tạo giả trong bộ nhớ
+    theo kích thước DataConfig. Mỗi engine chạy OrderGenerator.generate()
+    với cùng seed, in thời gian, throughput và vài chỉ số phân bố
+    (tỷ lệ Completed, số items/order, quantity trung bình) để kiểm tra
+    hai engine sinh ra cùng phân bố.
+===============================================================================
+"""
+
+import sys
+import time
+import argparse
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Cho phép chạy trực tiếp: python scripts/benchmarks/benchmark_generate.py
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'data_generation'))
+
+from generate_data import DataConfig, OrderGenerator  # noqa: E402
+
+
+def make_inputs(config: DataConfig, seed: int) -> tuple:
+    """Tạo customer_ids và product_data giả thay cho dữ liệu đọc từ DB"""
+    rng = np.random.default_rng(seed)
+    customer_ids = list(range(1, config.NUM_CUSTOMERS + 1))
+    product_data = pd.DataFrame({
+        'id': np.arange(1, config.NUM_PRODUCTS + 1),
+        'unit_price': np.round(rng.uniform(50_000, 5_000_000, config.NUM_PRODUCTS), -3),
+    })
+    return customer_ids, product_data
+
+
+def run_engine(config: DataConfig, engine: str, seed: int, customer_ids, product_data) -> dict:
+    """Chạy OrderGenerator một lần, trả về thời gian và chỉ số phân bố"""
+    generator = OrderGenerator(config, customer_ids, product_data, seed=seed, engine=engine)
+
+    started = time.perf_counter()
+    orders_df, items_df = generator.generate()
+    duration = time.perf_counter() - started
+
+    return {
+        'engine': engine,
+        'seconds': duration,
+        'orders': len(orders_df),
+        'items': len(items_df),
+        'completed_share': (orders_df['status'] == 'Completed').mean(),
+        'items_per_order': len(items_df) / len(orders_df),
+        'avg_quantity': items_df['quantity'].mean(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark OrderGenerator engines')
+    parser.add_argument('--orders', type=int, default=DataConfig.NUM_ORDERS, help='Số orders cần sinh')
+    parser.add_argument('--engines', nargs='+', default=DataConfig.SUPPORTED_ORDER_ENGINES,
+                        choices=DataConfig.SUPPORTED_ORDER_ENGINES, help='Engine cần đo')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    args = parser.parse_args()
+
+    # Log tiến độ của engine python rất dài, chỉ giữ warning khi benchmark
+    logging.getLogger('generate_data').setLevel(logging.WARNING)
+
+    config = DataConfig()
+    config.NUM_ORDERS = args.orders
+    customer_ids, product_data = make_inputs(config, args.seed)
+
+    rows = [run_engine(config, engine, args.seed, customer_ids, product_data) for engine in args.engines]
+    baseline = rows[0]['seconds']
+
+    print(
+        f"\n{'engine':<10}{'seconds':>10}{'orders/s':>14}{'items':>12}"
+        f"{'completed':>11}{'items/ord':>11}{'avg qty':>9}{'speedup':>10}"
+    )
+    print('-' * 87)
+    for row in rows:
+        orders_per_sec = row['orders'] / row['seconds'] if row['seconds'] else 0
+        speedup = baseline / row['seconds'] if row['seconds'] else 0
+        print(
+            f"{row['engine']:<10}{row['seconds']:>10.2f}{orders_per_sec:>14,.0f}{row['items']:>12,}"
+            f"{row['completed_share']:>11.3f}{row['items_per_order']:>11.3f}{row['avg_quantity']:>9.3f}"
+            f"{speedup:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
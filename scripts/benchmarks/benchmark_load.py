@@ -0,0 +1,116 @@
+"""
+===============================================================================
+FILE: benchmark_load.py
+PURPOSE: Benchmark các cách load dữ liệu sinh ra vào PostgreSQL (execute_values vs COPY)
+AUTHOR: Data Engineering Team
+VERSION: 1.0
+
+HƯỚNG DẪN SỬ DỤNG:
+    # Load 300,000 order_items với mỗi loader
+    python scripts/benchmarks/benchmark_load.py
+
+    # Ít rows hơn, lặp 3 lần
+    python scripts/benchmarks/benchmark_load.py --rows 100000 --repeat 3
+
+CÁCH ĐO:
+    Cần PostgreSQL nguồn đang chạy (docker-compose up -d postgres-source).
+    order_items được sinh bằng OrderGenerator (engine numpy) rồi load vào
+    bảng tạm ecommerce._benchmark_order_items (LIKE order_items: cùng index,
+    không có FK, id là identity riêng). Bảng được TRUNCATE trước mỗi lần
+    chạy và drop khi xong. Số liệu phụ thuộc máy và cấu hình PostgreSQL.
+===============================================================================
+"""
+
+import sys
+import time
+import argparse
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Cho phép chạy trực tiếp: python scripts/benchmarks/benchmark_load.py
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'data_generation'))
+
+from generate_data import DataConfig, DatabaseConnection, OrderGenerator  # noqa: E402
+
+
+BENCHMARK_TABLE = '_benchmark_order_items'
+
+# Các cấu hình cần so sánh: (label, DatabaseConnection kwargs)
+SCENARIOS = [
+    ('insert (execute_values)', {'loader': 'insert'}),
+    ('copy', {'loader': 'copy'}),
+    ('copy + rebuild indexes', {'loader': 'copy', 'rebuild_indexes': True}),
+]
+
+
+def make_order_items(num_rows: int) -> pd.DataFrame:
+    """Sinh khoảng num_rows order_items (không cần customers/products trong DB)"""
+    config = DataConfig()
+    # Trung bình ~2 items mỗi order
+    config.NUM_ORDERS = num_rows // 2
+    product_data = pd.DataFrame({
+        'id': np.arange(1, config.NUM_PRODUCTS + 1),
+        'unit_price': np.round(np.random.default_rng(42).uniform(50_000, 5_000_000, config.NUM_PRODUCTS), -3),
+    })
+    generator = OrderGenerator(
+        config, list(range(1, config.NUM_CUSTOMERS + 1)), product_data, engine='numpy'
+    )
+    _, items_df = generator.generate()
+    return items_df.head(num_rows)
+
+
+def run_scenario(items_df: pd.DataFrame, kwargs: dict) -> float:
+    """TRUNCATE bảng benchmark rồi load items_df một lần, trả về số giây"""
+    with DatabaseConnection(**kwargs) as db:
+        db.execute_statement(f"TRUNCATE ecommerce.{BENCHMARK_TABLE}")
+        started = time.perf_counter()
+        db.load_dataframe(items_df, BENCHMARK_TABLE)
+        return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark DatabaseConnection loaders')
+    parser.add_argument('--rows', type=int, default=300_000, help='Số order_items cần load')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per scenario (best is reported)')
+    args = parser.parse_args()
+
+    # Log của generator/loader rất dài, chỉ giữ warning khi benchmark
+    logging.getLogger('generate_data').setLevel(logging.WARNING)
+
+    items_df = make_order_items(args.rows)
+
+    with DatabaseConnection() as db:
+        db.execute_statement(f"DROP TABLE IF EXISTS ecommerce.{BENCHMARK_TABLE}")
+        db.execute_statement(
+            f"CREATE TABLE ecommerce.{BENCHMARK_TABLE} "
+            f"(LIKE ecommerce.order_items INCLUDING INDEXES)"
+        )
+        # id dùng identity riêng để không tiêu sequence của order_items thật
+        db.execute_statement(
+            f"ALTER TABLE ecommerce.{BENCHMARK_TABLE} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY"
+        )
+
+    rows = []
+    try:
+        for label, kwargs in SCENARIOS:
+            best = min(run_scenario(items_df, kwargs) for _ in range(args.repeat))
+            rows.append((label, best))
+    finally:
+        with DatabaseConnection() as db:
+            db.execute_statement(f"DROP TABLE IF EXISTS ecommerce.{BENCHMARK_TABLE}")
+
+    baseline = rows[0][1]
+
+    print(f"\n{'loader':<26}{'seconds':>10}{'rows/s':>14}{'speedup':>10}")
+    print('-' * 60)
+    for label, duration in rows:
+        rows_per_sec = len(items_df) / duration if duration else 0
+        speedup = baseline / duration if duration else 0
+        print(f"{label:<26}{duration:>10.2f}{rows_per_sec:>14,.0f}{speedup:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
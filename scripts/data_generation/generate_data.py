@@ -6,27 +6,49 @@ AUTHOR: Data Engineering Team
 VERSION: 1.0
 
 HƯỚNG DẪN SỬ DỤNG:
-    1. Đảm bảo đã cài đặt các thư viện: pip install faker pandas sqlalchemy psycopg2-binary python-dotenv
+    1. Đảm bảo đã cài đặt các thư viện: pip install faker numpy pandas sqlalchemy psycopg2-binary python-dotenv
     2. Đảm bảo PostgreSQL đang chạy (docker-compose up -d postgres-source)
     3. Chạy script: python scripts/data_generation/generate_data.py
 
+    # Sinh orders bằng NumPy (vectorized, dùng cho dataset lớn)
+    python scripts/data_generation/generate_data.py --order-engine numpy
+
+    # Sinh song song trên 8 process (output giống hệt --workers 1)
+    python scripts/data_generation/generate_data.py --order-engine numpy --workers 8
+
+    ⚠️ Seed không tương thích ngược: customers/orders/payments/invoices luôn sinh
+    theo shard (seed riêng mỗi shard), kể cả --workers 1 với --order-engine python,
+    nên cùng --seed cho dữ liệu khác các phiên bản trước khi có --workers.
+
+    # Load bằng COPY, tạo lại index sau khi load
+    python scripts/data_generation/generate_data.py --loader copy --rebuild-indexes
+
 CẤU TRÚC CODE:
     1. Configuration - Cấu hình số lượng và tham số
     2. Database Connection - Kết nối database
     3. Generator Classes - Các class sinh dữ liệu
-    4. Main Pipeline - Luồng chạy chính
+    4. Sharded Generation - Sinh song song theo shard (--workers)
+    5. Main Pipeline - Luồng chạy chính
 ===============================================================================
 """
 
+import io
 import os
 import sys
+import copy
+import json
+import zlib
 import random
+import argparse
 from datetime import datetime, timedelta, date
 from typing import List, Dict, Any, Optional
+from pathlib import Path
 import logging
+from concurrent.futures import ProcessPoolExecutor
 
 # Third-party imports
 from faker import Faker
+import numpy as np
 import pandas as pd
 from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
@@ -115,6 +137,43 @@ class DataConfig:
         'E-Wallet': ['Momo', 'ZaloPay', 'VNPay'],
     }
     
+    # Engine sinh orders/order_items:
+    # - 'python': vòng lặp từng order (engine gốc)
+    # - 'numpy': sinh cả mảng một lần, cùng phân bố, nhanh hơn nhiều lần
+    ORDER_ENGINE = os.getenv('ORDER_ENGINE', 'python')
+    SUPPORTED_ORDER_ENGINES = ['python', 'numpy']
+    
+    # Faker locales (trộn tên/địa chỉ Việt Nam và tiếng Anh)
+    FAKER_LOCALES = ['vi_VN', 'en_US']
+    
+    # Value pool: số giá trị Faker unique sinh sẵn cho mỗi field
+    # (address, phone, name...), các row lấy mẫu từ pool theo index
+    FAKER_POOL_SIZE = int(os.getenv('FAKER_POOL_SIZE', '2000'))
+    
+    # Thư mục cache pool trên đĩa, key theo locale + seed + field.
+    # Để rỗng để tắt cache.
+    FAKER_POOL_CACHE_DIR = os.getenv('FAKER_POOL_CACHE_DIR', 'data/cache/faker_pools')
+    
+    # Seed riêng cho value pool (None = dùng seed của generator)
+    FAKER_POOL_SEED = None
+    
+    # Sinh sharded (--workers): customers/orders/payments/invoices được chia
+    # thành các shard SHARD_SIZE rows theo ID, mỗi shard có seed riêng.
+    # SHARD_SIZE cố định (không phụ thuộc số worker) nên output không đổi
+    # khi thay đổi --workers.
+    GENERATION_WORKERS = int(os.getenv('GENERATION_WORKERS', '1'))
+    SHARD_SIZE = int(os.getenv('GENERATION_SHARD_SIZE', '50000'))
+    
+    # Cách load DataFrame vào DB:
+    # - 'insert': execute_values từng trang 100 rows (mặc định)
+    # - 'copy': COPY ... FROM STDIN (CSV), nhanh hơn nhiều lần
+    DATA_LOADER = os.getenv('DATA_LOADER', 'insert')
+    SUPPORTED_LOADERS = ['insert', 'copy']
+    
+    # COPY: số rows format CSV mỗi lần, và chuỗi đại diện NULL trong CSV
+    COPY_CHUNK_ROWS = int(os.getenv('COPY_CHUNK_ROWS', '50000'))
+    COPY_NULL = '\\N'
+    
     # Danh sách thành phố Việt Nam
     VN_CITIES = [
         'Hồ Chí Minh', 'Hà Nội', 'Đà Nẵng', 'Hải Phòng', 'Cần Thơ',
@@ -127,6 +186,41 @@ class DataConfig:
 # PHẦN 2: DATABASE CONNECTION
 # ============================================================================
 
+class DataFrameCsvStream:
+    """
+    File-like object đọc DataFrame dưới dạng CSV, dùng cho cursor.copy_expert().
+    
+    💡 GIẢI THÍCH:
+    Thay vì to_csv() cả DataFrame vào một buffer (gấp đôi bộ nhớ), mỗi lần
+    buffer hiện tại đọc hết thì format tiếp chunk_rows rows kế tiếp.
+    NaN/NaT/None được to_csv ghi thành null_marker (vectorized, không
+    duyệt từng ô); chuỗi rỗng vẫn là chuỗi rỗng.
+    
+    Ví dụ sử dụng:
+        cur.copy_expert("COPY t FROM STDIN WITH (FORMAT csv, NULL '\\N')", DataFrameCsvStream(df))
+    """
+    
+    def __init__(self, df: pd.DataFrame, chunk_rows: int = 50_000, null_marker: Optional[str] = None):
+        self._chunks = (
+            df.iloc[start:start + chunk_rows].to_csv(
+                index=False, header=False, na_rep=null_marker or DataConfig.COPY_NULL
+            )
+            for start in range(0, len(df), chunk_rows)
+        )
+        self._buffer = io.StringIO()
+    
+    def read(self, size: int = -1) -> str:
+        """Đọc tối đa size ký tự; trả về '' khi đã hết DataFrame"""
+        while True:
+            data = self._buffer.read(size)
+            if data:
+                return data
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return ''
+            self._buffer = io.StringIO(chunk)
+
+
 class DatabaseConnection:
     """
     💡 GIẢI THÍCH:
@@ -136,10 +230,25 @@ class DatabaseConnection:
     Ví dụ sử dụng:
         with DatabaseConnection() as db:
             db.execute_query("SELECT 1")
+        
+        # Bulk load bằng COPY, drop/tạo lại index quanh mỗi lần load
+        with DatabaseConnection(loader='copy', rebuild_indexes=True) as db:
+            db.load_dataframe(orders_df, 'orders')
     """
     
-    def __init__(self):
-        """Khởi tạo connection string từ biến môi trường"""
+    def __init__(self, loader: Optional[str] = None, rebuild_indexes: bool = False):
+        """
+        Khởi tạo connection string từ biến môi trường
+        
+        Args:
+            loader: 'insert' (execute_values) hoặc 'copy' (COPY FROM STDIN), mặc định DataConfig.DATA_LOADER
+            rebuild_indexes: Với loader copy, drop/tạo lại index và trigger quanh mỗi lần load
+        """
+        self.loader = loader or DataConfig.DATA_LOADER
+        if self.loader not in DataConfig.SUPPORTED_LOADERS:
+            raise ValueError(f"Unsupported loader: {self.loader}. Supported: {DataConfig.SUPPORTED_LOADERS}")
+        self.rebuild_indexes = rebuild_indexes
+        
         self.host = os.getenv('SOURCE_DB_HOST', 'localhost')
         self.port = os.getenv('SOURCE_DB_PORT', '5432')
         self.database = os.getenv('SOURCE_DB_NAME', 'ecommerce_source')
@@ -189,7 +298,6 @@ class DatabaseConnection:
             schema: Schema name (default: ecommerce)
         """
         from psycopg2.extras import execute_values
-        import numpy as np
         
         try:
             # Get column names
@@ -228,6 +336,120 @@ class DatabaseConnection:
             logger.error(f"❌ Failed to insert into {table_name}: {e}")
             raise
     
+    def load_dataframe(self, df: pd.DataFrame, table_name: str, schema: str = 'ecommerce'):
+        """
+        Load DataFrame vào database bằng loader đã chọn (insert hoặc copy).
+        
+        Args:
+            df: Pandas DataFrame chứa data
+            table_name: Tên bảng (không có schema)
+            schema: Schema name (default: ecommerce)
+        """
+        if self.loader == 'copy':
+            self.copy_dataframe(df, table_name, schema, rebuild_indexes=self.rebuild_indexes)
+        else:
+            self.insert_dataframe(df, table_name, schema)
+    
+    def copy_dataframe(self, df: pd.DataFrame, table_name: str, schema: str = 'ecommerce',
+                       rebuild_indexes: bool = False):
+        """
+        Bulk load DataFrame bằng COPY ... FROM STDIN (CSV).
+        
+        💡 GIẢI THÍCH:
+        insert_dataframe đổi từng ô qua clean_value() rồi gửi INSERT từng
+        trang 100 rows. COPY gửi cả bảng trong một statement: DataFrame được
+        format CSV bằng to_csv() theo từng chunk COPY_CHUNK_ROWS rows và stream
+        thẳng vào cursor.copy_expert(). NULL xử lý vectorized: NaN/NaT/None
+        được to_csv ghi thành COPY_NULL.
+        
+        rebuild_indexes=True: drop các index không gắn với constraint (PK,
+        UNIQUE giữ nguyên) và các trigger trg_*_updated_at trước khi COPY,
+        tạo lại sau khi COPY. Tạo index một lần trên bảng đầy đủ nhanh hơn
+        cập nhật index cho từng row. Tất cả nằm trong một transaction nên
+        nếu COPY lỗi thì index/trigger được rollback về như cũ.
+        
+        Args:
+            df: Pandas DataFrame chứa data
+            table_name: Tên bảng (không có schema)
+            schema: Schema name (default: ecommerce)
+            rebuild_indexes: Drop/tạo lại index và trigger quanh lần load
+        """
+        col_str = ', '.join([f'"{c}"' for c in df.columns])
+        copy_sql = (
+            f"COPY {schema}.{table_name} ({col_str}) FROM STDIN "
+            f"WITH (FORMAT csv, NULL '{DataConfig.COPY_NULL}')"
+        )
+        
+        try:
+            conn = self.engine.raw_connection()
+            try:
+                cur = conn.cursor()
+                dropped = self._drop_load_objects(cur, table_name, schema) if rebuild_indexes else []
+                
+                cur.copy_expert(copy_sql, DataFrameCsvStream(df, DataConfig.COPY_CHUNK_ROWS))
+                
+                for definition in dropped:
+                    cur.execute(definition)
+                conn.commit()
+                cur.close()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+            
+            rebuilt = f", rebuilt {len(dropped)} indexes/triggers" if dropped else ""
+            logger.info(f"✅ Copied {len(df)} rows into {schema}.{table_name}{rebuilt}")
+        except Exception as e:
+            logger.error(f"❌ Failed to copy into {table_name}: {e}")
+            raise
+    
+    @staticmethod
+    def _drop_load_objects(cur, table_name: str, schema: str) -> List[str]:
+        """
+        Drop index không gắn constraint và trigger trg_*_updated_at của bảng.
+        
+        Returns:
+            List câu lệnh CREATE (pg_get_indexdef/pg_get_triggerdef) để tạo lại
+        """
+        cur.execute(
+            """
+            SELECT i.relname, pg_get_indexdef(i.oid)
+            FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            JOIN pg_class t ON t.oid = x.indrelid
+            JOIN pg_namespace n ON n.oid = t.relnamespace
+            WHERE n.nspname = %s AND t.relname = %s
+              AND NOT x.indisprimary
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)
+            ORDER BY i.relname
+            """,
+            (schema, table_name)
+        )
+        indexes = cur.fetchall()
+        
+        cur.execute(
+            """
+            SELECT tg.tgname, pg_get_triggerdef(tg.oid)
+            FROM pg_trigger tg
+            JOIN pg_class t ON t.oid = tg.tgrelid
+            JOIN pg_namespace n ON n.oid = t.relnamespace
+            WHERE n.nspname = %s AND t.relname = %s
+              AND NOT tg.tgisinternal
+              AND tg.tgname LIKE 'trg\\_%%\\_updated\\_at'
+            ORDER BY tg.tgname
+            """,
+            (schema, table_name)
+        )
+        triggers = cur.fetchall()
+        
+        for name, _ in indexes:
+            cur.execute(f'DROP INDEX {schema}."{name}"')
+        for name, _ in triggers:
+            cur.execute(f'DROP TRIGGER "{name}" ON {schema}.{table_name}')
+        
+        return [definition for _, definition in indexes + triggers]
+    
     def execute_query(self, query: str) -> pd.DataFrame:
         """Chạy query và trả về DataFrame"""
         return pd.read_sql(query, self.engine)
@@ -252,6 +474,10 @@ class BaseGenerator:
     Sử dụng OOP pattern: Inheritance (kế thừa)
     """
     
+    # Value pools đã load trong process, key = _pool_key(); dùng chung giữa
+    # các generator để mỗi process (worker) chỉ load/sinh một pool một lần
+    _pool_cache: Dict[str, np.ndarray] = {}
+    
     def __init__(self, config: DataConfig, seed: int = 42):
         """
         Args:
@@ -259,9 +485,14 @@ class BaseGenerator:
             seed: Random seed để kết quả có thể reproduce được
         """
         self.config = config
+        self.seed = seed
+        
+        # Seed của value pool: mặc định là seed của generator; chạy sharded
+        # dùng base seed để mọi shard chung một bộ pool
+        self.pool_seed = seed if config.FAKER_POOL_SEED is None else config.FAKER_POOL_SEED
         
         # Tạo Faker instance với locale Việt Nam
-        self.fake = Faker(['vi_VN', 'en_US'])
+        self.fake = Faker(config.FAKER_LOCALES)
         
         # Set seed cho cả Faker và random
         # Điều này đảm bảo chạy nhiều lần sẽ cho kết quả giống nhau
@@ -290,6 +521,22 @@ class BaseGenerator:
         weights = list(options.values())
         return random.choices(items, weights=weights, k=1)[0]
     
+    @staticmethod
+    def weighted_choices(rng: np.random.Generator, options: Dict[Any, float], size: int) -> np.ndarray:
+        """
+        Bản vectorized của weighted_choice: chọn `size` giá trị một lần.
+        
+        Args:
+            rng: np.random.Generator (tạo từ seed của generator)
+            options: Dict với key là giá trị, value là trọng số (được chuẩn hóa về tổng 1)
+            size: Số giá trị cần chọn
+        
+        Returns:
+            Mảng numpy các giá trị được chọn
+        """
+        weights = np.asarray(list(options.values()), dtype=float)
+        return rng.choice(np.asarray(list(options.keys())), size=size, p=weights / weights.sum())
+    
     @staticmethod
     def generate_code(prefix: str, number: int, year: int = 2024) -> str:
         """
@@ -298,6 +545,98 @@ class BaseGenerator:
         Ví dụ: generate_code('ORD', 1, 2024) -> 'ORD-2024-000001'
         """
         return f"{prefix}-{year}-{str(number).zfill(6)}"
+    
+    @staticmethod
+    def generate_codes(prefix: str, numbers: np.ndarray, year: int = 2024) -> pd.Series:
+        """
+        Bản vectorized của generate_code cho cả mảng số thứ tự.
+        
+        Ví dụ: generate_codes('ORD', np.array([1, 2])) -> ['ORD-2024-000001', 'ORD-2024-000002']
+        """
+        return f"{prefix}-{year}-" + pd.Series(numbers).astype(str).str.zfill(6)
+    
+    def value_pool(self, provider: str, size: Optional[int] = None, **kwargs) -> np.ndarray:
+        """
+        Lấy pool các giá trị Faker unique cho một field.
+        
+        💡 GIẢI THÍCH:
+        Gọi Faker cho từng row (address, phone, name...) là phần chậm nhất khi
+        sinh hàng triệu rows. Pool chỉ gọi Faker khoảng `size` lần, các row
+        lấy mẫu trong pool bằng rng.integers() (xem sample_pool).
+        
+        Pool là hàm thuần của (locales, seed, provider, size, kwargs): Faker
+        riêng cho pool được seed theo key này, nên có thể cache trên đĩa
+        (FAKER_POOL_CACHE_DIR) và dùng lại giữa các lần chạy.
+        
+        Provider có ít giá trị khác nhau (ví dụ first_name_male) cho pool nhỏ
+        hơn `size`: dừng khi `size` lần gọi liên tiếp chỉ ra giá trị trùng.
+        
+        Args:
+            provider: Tên method của Faker, ví dụ 'address', 'phone_number'
+            size: Số giá trị tối đa trong pool (mặc định FAKER_POOL_SIZE)
+            **kwargs: Tham số truyền cho method, ví dụ max_nb_chars=200
+        """
+        size = size or self.config.FAKER_POOL_SIZE
+        key = self._pool_key(provider, size, kwargs)
+        if key in self._pool_cache:
+            return self._pool_cache[key]
+        
+        cache_path = self._pool_cache_path(provider, size, kwargs)
+        if cache_path is not None and cache_path.exists():
+            values = json.loads(cache_path.read_text(encoding='utf-8'))
+        else:
+            values = self._build_pool(provider, size, kwargs)
+            if cache_path is not None:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                # Tên file tạm theo pid: nhiều worker có thể cùng ghi một pool
+                tmp_path = cache_path.with_suffix(f'.{os.getpid()}.tmp')
+                tmp_path.write_text(json.dumps(values, ensure_ascii=False), encoding='utf-8')
+                tmp_path.replace(cache_path)
+        
+        pool = np.empty(len(values), dtype=object)
+        pool[:] = values
+        self._pool_cache[key] = pool
+        return pool
+    
+    def sample_pool(self, rng: np.random.Generator, provider: str, size: int, **kwargs) -> np.ndarray:
+        """
+        Lấy `size` giá trị ngẫu nhiên (có lặp) từ value pool của provider.
+        
+        Ví dụ: sample_pool(rng, 'phone_number', 1_000_000)
+        """
+        pool = self.value_pool(provider, **kwargs)
+        return pool[rng.integers(0, len(pool), size)]
+    
+    def _pool_key(self, provider: str, size: int, kwargs: Dict) -> str:
+        """Key của pool: locales + pool seed + provider + kwargs + size"""
+        params = ''.join(f"_{name}={value}" for name, value in sorted(kwargs.items()))
+        return f"{'+'.join(self.config.FAKER_LOCALES)}_seed{self.pool_seed}_{provider}{params}_{size}"
+    
+    def _pool_cache_path(self, provider: str, size: int, kwargs: Dict) -> Optional[Path]:
+        """File cache của pool, None nếu cache bị tắt"""
+        if not self.config.FAKER_POOL_CACHE_DIR:
+            return None
+        return Path(self.config.FAKER_POOL_CACHE_DIR) / f"{self._pool_key(provider, size, kwargs)}.json"
+    
+    def _build_pool(self, provider: str, size: int, kwargs: Dict) -> List[str]:
+        """Sinh pool các giá trị unique bằng một Faker seed theo key của pool"""
+        fake = Faker(self.config.FAKER_LOCALES)
+        fake.seed_instance(self._pool_key(provider, size, kwargs))
+        
+        values = []
+        seen = set()
+        misses = 0
+        while len(values) < size and misses < size:
+            # Không cache getattr: với nhiều locale, Faker chọn locale tại lúc getattr
+            value = getattr(fake, provider)(**kwargs)
+            if value in seen:
+                misses += 1
+                continue
+            seen.add(value)
+            values.append(value)
+            misses = 0
+        
+        return values
 
 
 class CategoryGenerator(BaseGenerator):
@@ -375,6 +714,15 @@ class ProductGenerator(BaseGenerator):
         'Thời trang Nữ': ['Váy đầm', 'Áo kiểu', 'Quần tây', 'Giày cao gót', 'Túi xách'],
     }
     
+    # Giá từ 50k đến 50 triệu, phân bố theo log (nhiều sản phẩm giá thấp)
+    PRICE_RANGES = [
+        (50_000, 200_000, 0.30),      # 30% sản phẩm giá 50k-200k
+        (200_000, 1_000_000, 0.35),   # 35% sản phẩm giá 200k-1tr
+        (1_000_000, 5_000_000, 0.20), # 20% sản phẩm giá 1tr-5tr
+        (5_000_000, 20_000_000, 0.10),# 10% sản phẩm giá 5tr-20tr
+        (20_000_000, 50_000_000, 0.05),# 5% sản phẩm giá 20tr-50tr
+    ]
+    
     def __init__(self, config: DataConfig, category_ids: List[int], seed: int = 42):
         """
         Args:
@@ -385,9 +733,9 @@ class ProductGenerator(BaseGenerator):
         super().__init__(config, seed)
         self.category_ids = category_ids
     
-    def _generate_price(self) -> tuple:
+    def _generate_prices(self, rng: np.random.Generator, size: int) -> tuple:
         """
-        Sinh giá bán và giá vốn.
+        Sinh giá bán và giá vốn cho `size` sản phẩm.
         
         💡 GIẢI THÍCH:
         - unit_price: Giá bán cho khách
@@ -395,29 +743,19 @@ class ProductGenerator(BaseGenerator):
         - Margin = (unit_price - cost_price) / unit_price
         - Thông thường margin từ 20-40%
         """
-        # Giá từ 50k đến 50 triệu, phân bố theo log (nhiều sản phẩm giá thấp)
-        price_ranges = [
-            (50_000, 200_000, 0.30),      # 30% sản phẩm giá 50k-200k
-            (200_000, 1_000_000, 0.35),   # 35% sản phẩm giá 200k-1tr
-            (1_000_000, 5_000_000, 0.20), # 20% sản phẩm giá 1tr-5tr
-            (5_000_000, 20_000_000, 0.10),# 10% sản phẩm giá 5tr-20tr
-            (20_000_000, 50_000_000, 0.05),# 5% sản phẩm giá 20tr-50tr
-        ]
-        
-        # Chọn range theo xác suất
-        r = random.random()
-        cumulative = 0
-        for min_price, max_price, prob in price_ranges:
-            cumulative += prob
-            if r <= cumulative:
-                unit_price = round(random.uniform(min_price, max_price), -3)  # Làm tròn nghìn
-                break
+        # Chọn range theo xác suất rồi random đều trong range
+        ranges = self.weighted_choices(
+            rng, {i: prob for i, (_, _, prob) in enumerate(self.PRICE_RANGES)}, size
+        )
+        min_prices = np.array([r[0] for r in self.PRICE_RANGES], dtype=float)[ranges]
+        max_prices = np.array([r[1] for r in self.PRICE_RANGES], dtype=float)[ranges]
+        unit_prices = np.round(rng.uniform(min_prices, max_prices), -3)  # Làm tròn nghìn
         
         # Cost = 60-80% của giá bán
-        margin = random.uniform(0.20, 0.40)
-        cost_price = round(unit_price * (1 - margin), -3)
+        margins = rng.uniform(0.20, 0.40, size)
+        cost_prices = np.round(unit_prices * (1 - margins), -3)
         
-        return unit_price, cost_price
+        return unit_prices, cost_prices
     
     def generate(self) -> pd.DataFrame:
         """
@@ -426,32 +764,34 @@ class ProductGenerator(BaseGenerator):
         Returns:
             DataFrame với các cột theo schema
         """
-        products = []
+        rng = np.random.default_rng(self.seed)
+        num_products = self.config.NUM_PRODUCTS
         
-        for idx in range(1, self.config.NUM_PRODUCTS + 1):
-            # Random category
-            category_id = random.choice(self.category_ids)
-            
-            # Generate prices
-            unit_price, cost_price = self._generate_price()
-            
-            products.append({
-                'sku': f'SKU-{str(idx).zfill(6)}',
-                'name': f'{self.fake.catch_phrase()} {self.fake.word().title()}',
-                'description': self.fake.text(max_nb_chars=200),
-                'category_id': category_id,
-                'unit_price': unit_price,
-                'cost_price': cost_price,
-                'stock_quantity': random.randint(0, 1000),
-                'is_active': random.random() > 0.05,  # 95% active
-                'created_at': self.fake.date_time_between(
-                    start_date='-2y',  # 2 năm trước
-                    end_date='-6M'     # 6 tháng trước
-                ),
-                'updated_at': datetime.now(),
-            })
+        unit_prices, cost_prices = self._generate_prices(rng, num_products)
+        
+        # created_at: trong khoảng 2 năm trước -> 6 tháng trước
+        now = datetime.now()
+        created_start = np.datetime64(now - timedelta(days=730), 's')
+        created_span = int(timedelta(days=730 - 182).total_seconds())
+        created_at = created_start + rng.integers(0, created_span, num_products).astype('timedelta64[s]')
+        
+        names = (
+            pd.Series(self.sample_pool(rng, 'catch_phrase', num_products)) + ' '
+            + pd.Series(self.sample_pool(rng, 'word', num_products)).str.title()
+        )
         
-        df = pd.DataFrame(products)
+        df = pd.DataFrame({
+            'sku': 'SKU-' + pd.Series(np.arange(1, num_products + 1)).astype(str).str.zfill(6),
+            'name': names,
+            'description': self.sample_pool(rng, 'text', num_products, max_nb_chars=200),
+            'category_id': rng.choice(np.asarray(self.category_ids), size=num_products),
+            'unit_price': unit_prices,
+            'cost_price': cost_prices,
+            'stock_quantity': rng.integers(0, 1001, num_products),
+            'is_active': rng.random(num_products) > 0.05,  # 95% active
+            'created_at': created_at.astype('datetime64[ns]'),
+            'updated_at': now,
+        })
         logger.info(f"Generated {len(df)} products")
         return df
 
@@ -463,8 +803,21 @@ class CustomerGenerator(BaseGenerator):
     💡 GIẢI THÍCH:
     Customers là bảng dimension quan trọng.
     Mỗi customer có segment được assign dựa trên config.
+    
+    Các cột text (tên, phone, địa chỉ...) lấy mẫu từ value pool; các cột
+    unique (customer_code, email) được dựng từ số thứ tự nên luôn unique.
     """
     
+    def __init__(self, config: DataConfig, seed: int = 42, first_id: int = 1):
+        """
+        Args:
+            config: DataConfig instance
+            seed: Random seed
+            first_id: Số thứ tự của customer đầu tiên (khi sinh theo shard)
+        """
+        super().__init__(config, seed)
+        self.first_id = first_id
+    
     def generate(self) -> pd.DataFrame:
         """
         Sinh dữ liệu cho bảng customers.
@@ -472,52 +825,57 @@ class CustomerGenerator(BaseGenerator):
         Returns:
             DataFrame với các cột theo schema
         """
-        customers = []
-        
-        # Tính ngày bắt đầu đăng ký (trước ngày bắt đầu data 1 năm)
-        reg_start = self.config.DATE_START - timedelta(days=365)
-        reg_end = self.config.DATE_END
+        rng = np.random.default_rng(self.seed)
+        num_customers = self.config.NUM_CUSTOMERS
+        customer_idx = np.arange(self.first_id, self.first_id + num_customers)
+        
+        # Ngày đăng ký: từ 1 năm trước ngày bắt đầu data đến ngày kết thúc
+        reg_start = np.datetime64(self.config.DATE_START - timedelta(days=365), 'D')
+        reg_days = (self.config.DATE_END - self.config.DATE_START).days + 365
+        reg_dates = reg_start + rng.integers(0, reg_days + 1, num_customers)
+        
+        # Ngày sinh: 18-70 tuổi tính đến hôm nay
+        today = np.datetime64(date.today(), 'D')
+        birth_dates = today - rng.integers(int(18 * 365.25), int(71 * 365.25), num_customers)
+        
+        segments = self.weighted_choices(rng, self.config.CUSTOMER_SEGMENTS, num_customers)
+        
+        # First name theo gender
+        genders = rng.choice(np.array(['Male', 'Female', 'Other'], dtype=object), size=num_customers)
+        first_names = np.select(
+            [genders == 'Male', genders == 'Female'],
+            [
+                self.sample_pool(rng, 'first_name_male', num_customers),
+                self.sample_pool(rng, 'first_name_female', num_customers),
+            ],
+            default=self.sample_pool(rng, 'first_name', num_customers),
+        )
         
-        for idx in range(1, self.config.NUM_CUSTOMERS + 1):
-            # Generate registration date
-            reg_date = self.fake.date_between(start_date=reg_start, end_date=reg_end)
-            
-            # Assign segment dựa trên weighted choice
-            segment = self.weighted_choice(self.config.CUSTOMER_SEGMENTS)
-            
-            # Random gender
-            gender = random.choice(['Male', 'Female', 'Other'])
-            
-            # Generate name dựa trên gender
-            if gender == 'Male':
-                first_name = self.fake.first_name_male()
-            elif gender == 'Female':
-                first_name = self.fake.first_name_female()
-            else:
-                first_name = self.fake.first_name()
-            
-            customers.append({
-                'customer_code': self.generate_code('CUST', idx),
-                'email': f"customer{idx}@{self.fake.free_email_domain()}",
-                'first_name': first_name,
-                'last_name': self.fake.last_name(),
-                'phone': self.fake.phone_number()[:20],
-                'date_of_birth': self.fake.date_of_birth(minimum_age=18, maximum_age=70),
-                'gender': gender,
-                'address_line1': self.fake.street_address()[:255],
-                'address_line2': None,
-                'city': random.choice(self.config.VN_CITIES),
-                'state': None,
-                'postal_code': self.fake.postcode()[:20],
-                'country': 'Vietnam',
-                'segment': segment,
-                'registration_date': reg_date,
-                'is_active': random.random() > 0.02,  # 98% active
-                'created_at': datetime.combine(reg_date, datetime.min.time()),
-                'updated_at': datetime.now(),
-            })
+        emails = (
+            'customer' + pd.Series(customer_idx).astype(str) + '@'
+            + pd.Series(self.sample_pool(rng, 'free_email_domain', num_customers))
+        )
         
-        df = pd.DataFrame(customers)
+        df = pd.DataFrame({
+            'customer_code': self.generate_codes('CUST', customer_idx),
+            'email': emails,
+            'first_name': first_names,
+            'last_name': self.sample_pool(rng, 'last_name', num_customers),
+            'phone': pd.Series(self.sample_pool(rng, 'phone_number', num_customers)).str[:20],
+            'date_of_birth': birth_dates.astype(object),
+            'gender': genders,
+            'address_line1': pd.Series(self.sample_pool(rng, 'street_address', num_customers)).str[:255],
+            'address_line2': None,
+            'city': rng.choice(np.asarray(self.config.VN_CITIES, dtype=object), size=num_customers),
+            'state': None,
+            'postal_code': pd.Series(self.sample_pool(rng, 'postcode', num_customers)).str[:20],
+            'country': 'Vietnam',
+            'segment': segments.astype(object),
+            'registration_date': reg_dates.astype(object),
+            'is_active': rng.random(num_customers) > 0.02,  # 98% active
+            'created_at': reg_dates.astype('datetime64[ns]'),
+            'updated_at': datetime.now(),
+        })
         logger.info(f"Generated {len(df)} customers")
         return df
 
@@ -533,18 +891,69 @@ class OrderGenerator(BaseGenerator):
     - 0-N payments
     
     Cần generate orders trước, sau đó generate order_items.
+    
+    Có 2 engine cho cùng một bộ phân bố (các hằng số bên dưới):
+    - 'python': vòng lặp từng order bằng module random
+    - 'numpy': sinh cả mảng bằng np.random.Generator, dùng cho dataset lớn
     """
     
+    # Status distribution
+    STATUS_WEIGHTS = {
+        'Completed': 0.70,   # 70% hoàn thành
+        'Delivered': 0.10,   # 10% đã giao
+        'Shipped': 0.05,     # 5% đang ship
+        'Processing': 0.05, # 5% đang xử lý
+        'Pending': 0.03,    # 3% chờ
+        'Cancelled': 0.05,  # 5% hủy
+        'Refunded': 0.02,   # 2% hoàn tiền
+    }
+    
+    # Số items trong order (1-5, phần lớn 1-2)
+    ITEM_COUNT_WEIGHTS = {1: 0.4, 2: 0.35, 3: 0.15, 4: 0.07, 5: 0.03}
+    
+    # Quantity: phần lớn mua 1-2 sản phẩm
+    QUANTITY_WEIGHTS = {1: 0.5, 2: 0.3, 3: 0.1, 4: 0.05, 5: 0.05}
+    
+    # Discount % ở line level
+    DISCOUNT_WEIGHTS = {0: 0.5, 5: 0.2, 10: 0.15, 15: 0.1, 20: 0.05}
+    
+    # Discount ở order level (coupon), tính theo tỷ lệ subtotal
+    ORDER_DISCOUNT_WEIGHTS = {0.0: 0.7, 0.05: 0.2, 0.10: 0.1}
+    
+    # Shipping fee
+    SHIPPING_FEE_WEIGHTS = {0: 0.3, 20000: 0.4, 30000: 0.2, 50000: 0.1}
+    
+    # Giờ đặt hàng theo index 0-23, peak 10am-10pm
+    HOUR_WEIGHTS = [1, 1, 1, 1, 1, 2, 3, 5, 7, 8, 9, 10, 10, 9, 8, 7, 8, 9, 10, 10, 8, 6, 4, 2]
+    
+    # Tham số Pareto khi chọn product: 20% sản phẩm chiếm 80% doanh số
+    PARETO_ALPHA = 1.5
+    
     def __init__(self, config: DataConfig, customer_ids: List[int], 
-                 product_data: pd.DataFrame, seed: int = 42):
+                 product_data: pd.DataFrame, seed: int = 42,
+                 engine: Optional[str] = None, first_id: int = 1,
+                 order_dates: Optional[np.ndarray] = None):
         """
         Args:
             config: DataConfig instance
             customer_ids: List customer_id đã tạo
             product_data: DataFrame products (cần id và unit_price)
             seed: Random seed
+            engine: 'python' hoặc 'numpy' (mặc định DataConfig.ORDER_ENGINE)
+            first_id: Số thứ tự của order đầu tiên (khi sinh theo shard)
+            order_dates: Ngày của từng order (datetime64[D]) đã phân bổ sẵn,
+                mặc định tự phân bổ NUM_ORDERS đơn theo seasonality
         """
         super().__init__(config, seed)
+        self.first_id = first_id
+        self.order_dates = order_dates
+        self.engine = engine or config.ORDER_ENGINE
+        if self.engine not in config.SUPPORTED_ORDER_ENGINES:
+            raise ValueError(
+                f"Unsupported order engine: {self.engine}. "
+                f"Supported: {config.SUPPORTED_ORDER_ENGINES}"
+            )
+        
         self.customer_ids = customer_ids
         self.product_data = product_data
         
@@ -555,6 +964,11 @@ class OrderGenerator(BaseGenerator):
         ))
         self.product_ids = product_data['id'].tolist()
     
+    @staticmethod
+    def _choices(options: Dict) -> Any:
+        """random.choices theo dict {giá trị: trọng số} (engine python)"""
+        return random.choices(list(options.keys()), weights=list(options.values()))[0]
+    
     def _distribute_orders_by_date(self) -> List[date]:
         """
         Phân bổ đơn hàng theo ngày với seasonality.
@@ -614,7 +1028,7 @@ class OrderGenerator(BaseGenerator):
             while True:
                 # Chọn index theo Pareto
                 idx = min(
-                    int(random.paretovariate(1.5) - 1),
+                    int(random.paretovariate(self.PARETO_ALPHA) - 1),
                     len(self.product_ids) - 1
                 )
                 product_id = self.product_ids[idx]
@@ -623,15 +1037,11 @@ class OrderGenerator(BaseGenerator):
                     used_products.add(product_id)
                     break
             
-            # Quantity: phần lớn mua 1-2 sản phẩm
-            quantity = random.choices([1, 2, 3, 4, 5], weights=[0.5, 0.3, 0.1, 0.05, 0.05])[0]
+            quantity = self._choices(self.QUANTITY_WEIGHTS)
             
             # Giá tại thời điểm mua (có thể discount)
             base_price = self.product_prices[product_id]
-            discount_percent = random.choices(
-                [0, 5, 10, 15, 20],
-                weights=[0.5, 0.2, 0.15, 0.1, 0.05]
-            )[0]
+            discount_percent = self._choices(self.DISCOUNT_WEIGHTS)
             
             unit_price = base_price  # Giá gốc
             line_total = quantity * unit_price * (1 - discount_percent / 100)
@@ -655,35 +1065,29 @@ class OrderGenerator(BaseGenerator):
         Returns:
             Tuple (orders_df, order_items_df)
         """
+        if self.engine == 'numpy':
+            return self._generate_numpy()
+        
         orders = []
         all_order_items = []
         
         # Phân bổ ngày cho orders
-        order_dates = self._distribute_orders_by_date()
-        
-        # Status distribution
-        status_weights = {
-            'Completed': 0.70,   # 70% hoàn thành
-            'Delivered': 0.10,   # 10% đã giao
-            'Shipped': 0.05,     # 5% đang ship
-            'Processing': 0.05, # 5% đang xử lý
-            'Pending': 0.03,    # 3% chờ
-            'Cancelled': 0.05,  # 5% hủy
-            'Refunded': 0.02,   # 2% hoàn tiền
-        }
-        
-        for idx, order_date in enumerate(order_dates, 1):
+        if self.order_dates is not None:
+            order_dates = list(self.order_dates.astype(object))
+        else:
+            order_dates = self._distribute_orders_by_date()
+        
+        for idx, order_date in enumerate(order_dates, self.first_id):
             # Random customer
             customer_id = random.choice(self.customer_ids)
             
             # Random status
-            status = self.weighted_choice(status_weights)
+            status = self.weighted_choice(self.STATUS_WEIGHTS)
             
             # Random channel
             channel = self.weighted_choice(self.config.SALES_CHANNELS)
             
-            # Số items trong order (1-5, phần lớn 1-2)
-            num_items = random.choices([1, 2, 3, 4, 5], weights=[0.4, 0.35, 0.15, 0.07, 0.03])[0]
+            num_items = self._choices(self.ITEM_COUNT_WEIGHTS)
             
             # Generate order items trước để tính total
             order_id = idx  # Temporary ID, sẽ được DB assign
@@ -693,21 +1097,17 @@ class OrderGenerator(BaseGenerator):
             subtotal = sum(item['line_total'] for item in items)
             
             # Discount ở order level (coupon)
-            order_discount = random.choices([0, subtotal * 0.05, subtotal * 0.10], weights=[0.7, 0.2, 0.1])[0]
+            order_discount = subtotal * self._choices(self.ORDER_DISCOUNT_WEIGHTS)
             
             # Tax 10% VAT
             tax = (subtotal - order_discount) * 0.10
             
-            # Shipping fee
-            shipping = random.choices([0, 20000, 30000, 50000], weights=[0.3, 0.4, 0.2, 0.1])[0]
+            shipping = self._choices(self.SHIPPING_FEE_WEIGHTS)
             
             total = subtotal - order_discount + tax + shipping
             
             # Generate timestamp
-            hour = random.choices(
-                range(24),
-                weights=[1,1,1,1,1,2,3,5,7,8,9,10,10,9,8,7,8,9,10,10,8,6,4,2]  # Peak 10am-10pm
-            )[0]
+            hour = random.choices(range(24), weights=self.HOUR_WEIGHTS)[0]
             minute = random.randint(0, 59)
             second = random.randint(0, 59)
             order_timestamp = datetime.combine(order_date, datetime.min.time()) + timedelta(
@@ -747,6 +1147,187 @@ class OrderGenerator(BaseGenerator):
         logger.info(f"Generated {len(orders_df)} orders and {len(items_df)} order items")
         
         return orders_df, items_df
+    
+    # ------------------------------------------------------------------------
+    # Engine numpy
+    # ------------------------------------------------------------------------
+    
+    @staticmethod
+    def distribute_order_dates(config: DataConfig, rng: np.random.Generator) -> np.ndarray:
+        """
+        Bản vectorized của _distribute_orders_by_date.
+        
+        💡 GIẢI THÍCH:
+        Cùng công thức (weight tháng × weight cuối tuần × ±20%) nhưng tính
+        cho cả dãy ngày một lần, rồi np.repeat + permutation thay cho
+        extend + shuffle.
+        
+        Returns:
+            Mảng datetime64[D], tối đa NUM_ORDERS phần tử
+        """
+        days = np.arange(
+            np.datetime64(config.DATE_START, 'D'),
+            np.datetime64(config.DATE_END, 'D') + 1
+        )
+        total_days = (config.DATE_END - config.DATE_START).days
+        avg_orders_per_day = config.NUM_ORDERS / total_days
+        
+        months = days.astype('datetime64[M]').astype(np.int64) % 12 + 1
+        month_weights = np.array([config.MONTHLY_WEIGHTS.get(m, 1.0) for m in range(1, 13)])
+        
+        # 1970-01-01 là thứ Năm -> (days + 3) % 7 cho weekday theo quy ước Monday=0
+        weekdays = (days.astype(np.int64) + 3) % 7
+        weekday_weights = np.where(weekdays >= 5, 1.2, 1.0)
+        
+        daily_orders = (avg_orders_per_day * month_weights[months - 1] * weekday_weights).astype(np.int64)
+        daily_orders = (daily_orders * rng.uniform(0.8, 1.2, len(days))).astype(np.int64)
+        
+        order_dates = np.repeat(days, np.maximum(1, daily_orders))
+        return rng.permutation(order_dates)[:config.NUM_ORDERS]
+    
+    def _pick_products_numpy(self, rng: np.random.Generator, order_pos: np.ndarray) -> np.ndarray:
+        """
+        Chọn product index theo Pareto cho mọi item, không trùng trong một order.
+        
+        💡 GIẢI THÍCH:
+        rng.pareto() là phân bố Lomax = random.paretovariate() - 1, nên
+        floor() cho đúng index như engine python. Thay cho vòng while-retry,
+        ta rút cho tất cả items, sort theo (order, index) để tìm bản trùng
+        rồi rút lại chỉ các bản trùng. Mỗi vòng chỉ kiểm tra lại những order
+        vừa có bản trùng nên số phần tử giảm rất nhanh.
+        
+        Args:
+            order_pos: Vị trí order (0-based) của từng item, đã sort tăng dần
+        """
+        max_index = len(self.product_ids) - 1
+        
+        def draw(size: int) -> np.ndarray:
+            return np.minimum(np.floor(rng.pareto(self.PARETO_ALPHA, size)), max_index).astype(np.int64)
+        
+        picks = draw(len(order_pos))
+        candidates = np.arange(len(order_pos))
+        
+        while len(candidates):
+            orders = order_pos[candidates]
+            order = np.lexsort((picks[candidates], orders))
+            sorted_orders = orders[order]
+            sorted_picks = picks[candidates][order]
+            
+            duplicated = (sorted_orders[1:] == sorted_orders[:-1]) & (sorted_picks[1:] == sorted_picks[:-1])
+            redo = candidates[order[1:][duplicated]]
+            if not len(redo):
+                break
+            
+            picks[redo] = draw(len(redo))
+            
+            # Vòng sau chỉ cần xét các order vừa có bản trùng
+            retry_orders = np.unique(order_pos[redo])
+            candidates = candidates[np.isin(orders, retry_orders, assume_unique=False)]
+        
+        return picks
+    
+    def _generate_numpy(self) -> tuple:
+        """
+        Sinh orders và order_items bằng NumPy.
+        
+        💡 GIẢI THÍCH:
+        Mỗi cột là một lần gọi np.random.Generator cho cả mảng thay vì
+        vài lần random.choices() cho từng order. Phân bố lấy từ cùng các
+        hằng số với engine python; kết quả reproduce được theo seed
+        (nhưng khác từng giá trị so với engine python vì khác RNG).
+        
+        Faker (address, phone, note) không được gọi cho từng row: giá trị
+        lấy mẫu từ value pool (xem BaseGenerator.value_pool).
+        
+        Returns:
+            Tuple (orders_df, order_items_df) cùng schema với engine python
+        """
+        rng = np.random.default_rng(self.seed)
+        
+        if self.order_dates is not None:
+            order_dates = self.order_dates
+        else:
+            order_dates = self.distribute_order_dates(self.config, rng)
+        num_orders = len(order_dates)
+        
+        customer_ids = rng.choice(np.asarray(self.customer_ids), size=num_orders)
+        statuses = self.weighted_choices(rng, self.STATUS_WEIGHTS, num_orders)
+        channels = self.weighted_choices(rng, self.config.SALES_CHANNELS, num_orders)
+        
+        # Không thể có nhiều item hơn số product khác nhau
+        num_items = np.minimum(
+            self.weighted_choices(rng, self.ITEM_COUNT_WEIGHTS, num_orders),
+            len(self.product_ids)
+        )
+        
+        # Order items: order_pos[i] = vị trí order của item i
+        order_pos = np.repeat(np.arange(num_orders), num_items)
+        num_lines = len(order_pos)
+        
+        product_index = self._pick_products_numpy(rng, order_pos)
+        quantities = self.weighted_choices(rng, self.QUANTITY_WEIGHTS, num_lines)
+        discounts = self.weighted_choices(rng, self.DISCOUNT_WEIGHTS, num_lines)
+        
+        unit_prices = np.asarray(self.product_data['unit_price'], dtype=float)[product_index]
+        line_totals = np.round(quantities * unit_prices * (1 - discounts / 100), 2)
+        
+        # Totals
+        subtotals = np.bincount(order_pos, weights=line_totals, minlength=num_orders)
+        order_discounts = subtotals * self.weighted_choices(rng, self.ORDER_DISCOUNT_WEIGHTS, num_orders)
+        taxes = (subtotals - order_discounts) * 0.10
+        shipping = self.weighted_choices(rng, self.SHIPPING_FEE_WEIGHTS, num_orders)
+        totals = subtotals - order_discounts + taxes + shipping
+        
+        # Timestamps
+        hour_weights = np.asarray(self.HOUR_WEIGHTS, dtype=float)
+        hours = rng.choice(24, size=num_orders, p=hour_weights / hour_weights.sum())
+        minutes = rng.integers(0, 60, num_orders)
+        seconds = rng.integers(0, 60, num_orders)
+        order_timestamps = (
+            order_dates.astype('datetime64[s]')
+            + (hours * 3600 + minutes * 60 + seconds).astype('timedelta64[s]')
+        ).astype('datetime64[ns]')
+        
+        # Giá trị Faker lấy mẫu từ value pool
+        has_note = rng.random(num_orders) < 0.1
+        notes = np.full(num_orders, None, dtype=object)
+        notes[has_note] = self.sample_pool(rng, 'sentence', int(has_note.sum()))
+        
+        now = datetime.now()
+        orders_df = pd.DataFrame({
+            'order_number': self.generate_codes('ORD', np.arange(self.first_id, self.first_id + num_orders)),
+            'customer_id': customer_ids,
+            'order_date': order_dates.astype(object),
+            'order_timestamp': order_timestamps,
+            'status': statuses.astype(object),
+            'subtotal': np.round(subtotals, 2),
+            'discount_amount': np.round(order_discounts, 2),
+            'tax_amount': np.round(taxes, 2),
+            'shipping_fee': shipping,
+            'total_amount': np.round(totals, 2),
+            'channel': channels.astype(object),
+            'shipping_address': self.sample_pool(rng, 'address', num_orders),
+            'shipping_city': rng.choice(np.asarray(self.config.VN_CITIES, dtype=object), size=num_orders),
+            'shipping_phone': pd.Series(self.sample_pool(rng, 'phone_number', num_orders)).str[:20],
+            'customer_note': notes,
+            'internal_note': None,
+            'created_at': order_timestamps,
+            'updated_at': now,
+        })
+        
+        items_df = pd.DataFrame({
+            'order_id': order_pos + self.first_id,  # Temporary ID, sẽ được DB assign
+            'product_id': np.asarray(self.product_ids)[product_index],
+            'quantity': quantities,
+            'unit_price': unit_prices,
+            'discount_percent': discounts,
+            'line_total': line_totals,
+            'created_at': now,
+        })
+        
+        logger.info(f"Generated {len(orders_df)} orders and {len(items_df)} order items (numpy engine)")
+        
+        return orders_df, items_df
 
 
 class PaymentGenerator(BaseGenerator):
@@ -758,8 +1339,14 @@ class PaymentGenerator(BaseGenerator):
     - Một order có thể có nhiều payments (trả góp, partial payment)
     - Có thể có orders chưa có payment (Pending, COD chưa giao)
     - Payment status có thể khác order status
+    
+    Toàn bộ logic chạy trên mảng (mask theo status + np.random.Generator),
+    không duyệt từng order bằng iterrows().
     """
     
+    # Tỷ lệ payment có amount khác order total (để test reconciliation)
+    AMOUNT_VARIANCE_RATE = 0.05
+    
     def __init__(self, config: DataConfig, orders_df: pd.DataFrame, seed: int = 42):
         """
         Args:
@@ -770,91 +1357,108 @@ class PaymentGenerator(BaseGenerator):
         super().__init__(config, seed)
         self.orders_df = orders_df
     
+    @staticmethod
+    def _transaction_refs(rng: np.random.Generator, size: int) -> pd.Series:
+        """
+        Sinh transaction_ref dạng uuid4 (cắt 20 ký tự) cho cả mảng.
+        
+        💡 GIẢI THÍCH:
+        Tương đương fake.uuid4()[:20]: 16 byte ngẫu nhiên, set bit version 4
+        và variant, rồi format 'xxxxxxxx-xxxx-4xxx-y' bằng string ops của pandas.
+        """
+        raw = np.frombuffer(rng.bytes(16 * size), dtype=np.uint8).reshape(size, 16).copy()
+        raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+        raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+        hex_digits = pd.Series(
+            np.frombuffer(raw.tobytes().hex().encode(), dtype='S32').astype(str), dtype=object
+        )
+        return (
+            hex_digits.str[0:8] + '-' + hex_digits.str[8:12] + '-'
+            + hex_digits.str[12:16] + '-' + hex_digits.str[16:17]
+        )
+    
     def generate(self) -> pd.DataFrame:
         """
         Sinh dữ liệu cho bảng payments.
         
         💡 Logic nghiệp vụ:
         - Orders với status Completed/Delivered/Shipped có payment Completed
-        - Orders Cancelled có payment Failed hoặc Refunded
-        - Orders Pending/Processing có thể có payment Pending hoặc không có payment
+        - Orders Processing có payment Completed hoặc Processing (50/50)
+        - Orders Pending: 50% chưa có payment, còn lại payment Pending
+        - Orders Cancelled: 30% không có payment, còn lại payment Failed
+        - Orders Refunded có payment Refunded
         
         Returns:
             DataFrame payments
         """
-        payments = []
-        payment_idx = 1
+        rng = np.random.default_rng(self.seed)
+        orders = self.orders_df
+        num_orders = len(orders)
+        order_status = orders['status'].to_numpy()
+        
+        # Xác định payment status và order nào có payment (mặc định Completed)
+        payment_status = np.full(num_orders, 'Completed', dtype=object)
+        has_payment = np.ones(num_orders, dtype=bool)
+        draw = rng.random(num_orders)
+        
+        processing = order_status == 'Processing'
+        payment_status[processing & (draw < 0.5)] = 'Processing'
+        
+        pending = order_status == 'Pending'
+        payment_status[pending] = 'Pending'
+        has_payment[pending] = draw[pending] > 0.5
+        
+        cancelled = order_status == 'Cancelled'
+        payment_status[cancelled] = 'Failed'
+        has_payment[cancelled] = draw[cancelled] > 0.3
+        
+        payment_status[order_status == 'Refunded'] = 'Refunded'
+        
+        # Chỉ giữ orders có payment
+        order_ids = orders.index.to_numpy()[has_payment] + 1  # DataFrame index + 1 = DB id
+        order_dates = orders['order_date'].to_numpy()[has_payment].astype('datetime64[D]')
+        amounts = orders['total_amount'].to_numpy(dtype=float)[has_payment]
+        payment_status = payment_status[has_payment]
+        num_payments = len(order_ids)
+        
+        # Payment method & gateway
+        methods = self.weighted_choices(rng, self.config.PAYMENT_METHODS, num_payments).astype(object)
+        gateways = np.full(num_payments, None, dtype=object)
+        for method, options in self.config.PAYMENT_GATEWAYS.items():
+            mask = methods == method
+            gateways[mask] = rng.choice(np.asarray(options, dtype=object), size=int(mask.sum()))
+        
+        # Completed payment trong vòng 0-3 ngày sau order, paid_at 8h-22h
+        completed = payment_status == 'Completed'
+        payment_dates = order_dates + np.where(completed, rng.integers(0, 4, num_payments), 0)
+        paid_offsets = rng.integers(8, 23, num_payments) * 60 + rng.integers(0, 60, num_payments)
+        paid_at = payment_dates.astype('datetime64[m]') + paid_offsets.astype('timedelta64[m]')
+        paid_at = np.where(completed, paid_at, np.datetime64('NaT')).astype('datetime64[ns]')
+        
+        # 5% cases có amount khác order total (±10%)
+        variance = rng.random(num_payments) < self.AMOUNT_VARIANCE_RATE
+        amounts[variance] = np.round(
+            amounts[variance] * (1 + rng.uniform(-0.1, 0.1, int(variance.sum()))), 2
+        )
         
-        for _, order in self.orders_df.iterrows():
-            order_status = order['status']
-            order_date = order['order_date']
-            order_id = order.name + 1  # DataFrame index + 1 = DB id
-            
-            # Xác định xem order này có payment không
-            should_have_payment = True
-            payment_status = 'Completed'
-            
-            if order_status in ['Completed', 'Delivered', 'Shipped']:
-                payment_status = 'Completed'
-            elif order_status == 'Processing':
-                payment_status = random.choice(['Completed', 'Processing'])
-            elif order_status == 'Pending':
-                # 50% Pending orders chưa có payment
-                should_have_payment = random.random() > 0.5
-                payment_status = 'Pending'
-            elif order_status == 'Cancelled':
-                # 70% cancelled orders có payment failed, 30% không có payment
-                should_have_payment = random.random() > 0.3
-                payment_status = 'Failed'
-            elif order_status == 'Refunded':
-                payment_status = 'Refunded'
-            
-            if not should_have_payment:
-                continue
-            
-            # Payment method & gateway
-            method = self.weighted_choice(self.config.PAYMENT_METHODS)
-            gateways = self.config.PAYMENT_GATEWAYS[method]
-            gateway = random.choice(gateways)
-            
-            # Payment date
-            if payment_status == 'Completed':
-                # Completed payment trong vòng 0-3 ngày sau order
-                payment_date = order_date + timedelta(days=random.randint(0, 3))
-                paid_at = datetime.combine(payment_date, datetime.min.time()) + timedelta(
-                    hours=random.randint(8, 22),
-                    minutes=random.randint(0, 59)
-                )
-            else:
-                payment_date = order_date
-                paid_at = None
-            
-            # Amount (có thể thanh toán thiếu/thừa cho reconciliation)
-            amount = order['total_amount']
-            
-            # 5% cases có amount khác order total (để test reconciliation)
-            if random.random() < 0.05:
-                variance = random.uniform(-0.1, 0.1)  # ±10%
-                amount = round(amount * (1 + variance), 2)
-            
-            payments.append({
-                'payment_code': self.generate_code('PAY', payment_idx),
-                'order_id': order_id,
-                'amount': amount,
-                'payment_method': method,
-                'payment_gateway': gateway,
-                'status': payment_status,
-                'payment_date': payment_date,
-                'paid_at': paid_at,
-                'transaction_ref': self.fake.uuid4()[:20] if gateway else None,
-                'gateway_response': None,
-                'created_at': datetime.combine(order_date, datetime.min.time()),
-                'updated_at': datetime.now(),
-            })
-            
-            payment_idx += 1
+        transaction_refs = np.where(
+            pd.isna(gateways), None, self._transaction_refs(rng, num_payments).to_numpy(dtype=object)
+        )
         
-        df = pd.DataFrame(payments)
+        df = pd.DataFrame({
+            'payment_code': self.generate_codes('PAY', np.arange(1, num_payments + 1)),
+            'order_id': order_ids,
+            'amount': amounts,
+            'payment_method': methods,
+            'payment_gateway': gateways,
+            'status': payment_status,
+            'payment_date': payment_dates.astype(object),
+            'paid_at': paid_at,
+            'transaction_ref': transaction_refs,
+            'gateway_response': None,
+            'created_at': order_dates.astype('datetime64[ns]'),
+            'updated_at': datetime.now(),
+        })
         logger.info(f"Generated {len(df)} payments")
         return df
 
@@ -868,8 +1472,14 @@ class InvoiceGenerator(BaseGenerator):
     - Invoice có thể được tạo tự động khi order hoàn thành
     - Hoặc được tạo manual bởi kế toán
     - Amount có thể khác order (chiết khấu hậu mãi, điều chỉnh...)
+    
+    invoice_items được tạo bằng một lần merge invoices ↔ order_items theo
+    order_id thay vì lọc order_items_df cho từng invoice (O(orders × items)).
     """
     
+    # Tỷ lệ invoice có adjustment so với order (để test reconciliation)
+    ADJUSTMENT_RATE = 0.03
+    
     def __init__(self, config: DataConfig, orders_df: pd.DataFrame, 
                  order_items_df: pd.DataFrame, seed: int = 42):
         super().__init__(config, seed)
@@ -888,81 +1498,67 @@ class InvoiceGenerator(BaseGenerator):
         Returns:
             Tuple (invoices_df, invoice_items_df)
         """
-        invoices = []
-        all_invoice_items = []
-        invoice_idx = 1
+        rng = np.random.default_rng(self.seed)
         
         # Chỉ tạo invoice cho orders completed
         completed_orders = self.orders_df[
             self.orders_df['status'].isin(['Completed', 'Delivered'])
         ]
+        num_invoices = len(completed_orders)
         
-        for _, order in completed_orders.iterrows():
-            order_id = order.name + 1  # DataFrame index + 1 = DB id
-            order_date = order['order_date']
-            
-            # Invoice date: 0-5 ngày sau order date
-            invoice_date = order_date + timedelta(days=random.randint(0, 5))
-            
-            # Due date: 30 ngày sau invoice date
-            due_date = invoice_date + timedelta(days=30)
-            
-            # Status
-            invoice_status = random.choices(
-                ['Paid', 'Issued', 'Closed'],
-                weights=[0.85, 0.10, 0.05]
-            )[0]
-            
-            # Amount (có thể khác order để test reconciliation)
-            subtotal = order['subtotal']
-            tax = order['tax_amount']
-            
-            # 3% cases có adjustment
-            if random.random() < 0.03:
-                adjustment = random.uniform(-0.05, 0.05)
-                subtotal = round(subtotal * (1 + adjustment), 2)
-                tax = round(subtotal * 0.10, 2)
-            
-            total = subtotal + tax
-            
-            # Accounting period
-            accounting_period = invoice_date.strftime('%Y-%m')
-            
-            invoices.append({
-                'invoice_number': self.generate_code('INV', invoice_idx),
-                'order_id': order_id,
-                'customer_id': order['customer_id'],
-                'invoice_date': invoice_date,
-                'due_date': due_date,
-                'subtotal': subtotal,
-                'tax_amount': tax,
-                'total_amount': round(total, 2),
-                'status': invoice_status,
-                'accounting_period': accounting_period,
-                'notes': None,
-                'created_at': datetime.combine(invoice_date, datetime.min.time()),
-                'updated_at': datetime.now(),
-            })
-            
-            # Generate invoice items
-            order_items = self.order_items_df[self.order_items_df['order_id'] == order_id]
-            
-            for _, item in order_items.iterrows():
-                all_invoice_items.append({
-                    'invoice_id': invoice_idx,
-                    'product_id': item['product_id'],
-                    'description': f'Sản phẩm #{item["product_id"]}',
-                    'quantity': item['quantity'],
-                    'unit_price': item['unit_price'],
-                    'tax_rate': 10,  # VAT 10%
-                    'line_total': item['line_total'],
-                    'created_at': datetime.now(),
-                })
-            
-            invoice_idx += 1
+        order_ids = completed_orders.index.to_numpy() + 1  # DataFrame index + 1 = DB id
+        order_dates = completed_orders['order_date'].to_numpy().astype('datetime64[D]')
         
-        invoices_df = pd.DataFrame(invoices)
-        items_df = pd.DataFrame(all_invoice_items)
+        # Invoice date: 0-5 ngày sau order date, due date: 30 ngày sau invoice date
+        invoice_dates = order_dates + rng.integers(0, 6, num_invoices)
+        due_dates = invoice_dates + 30
+        
+        invoice_status = self.weighted_choices(
+            rng, {'Paid': 0.85, 'Issued': 0.10, 'Closed': 0.05}, num_invoices
+        ).astype(object)
+        
+        # Amount (có thể khác order để test reconciliation)
+        subtotals = completed_orders['subtotal'].to_numpy(dtype=float).copy()
+        taxes = completed_orders['tax_amount'].to_numpy(dtype=float).copy()
+        
+        # 3% cases có adjustment ±5%, tax tính lại theo subtotal mới
+        adjusted = rng.random(num_invoices) < self.ADJUSTMENT_RATE
+        subtotals[adjusted] = np.round(
+            subtotals[adjusted] * (1 + rng.uniform(-0.05, 0.05, int(adjusted.sum()))), 2
+        )
+        taxes[adjusted] = np.round(subtotals[adjusted] * 0.10, 2)
+        
+        invoice_ids = np.arange(1, num_invoices + 1)
+        invoices_df = pd.DataFrame({
+            'invoice_number': self.generate_codes('INV', invoice_ids),
+            'order_id': order_ids,
+            'customer_id': completed_orders['customer_id'].to_numpy(),
+            'invoice_date': invoice_dates.astype(object),
+            'due_date': due_dates.astype(object),
+            'subtotal': subtotals,
+            'tax_amount': taxes,
+            'total_amount': np.round(subtotals + taxes, 2),
+            'status': invoice_status,
+            'accounting_period': invoice_dates.astype('datetime64[M]').astype(str),
+            'notes': None,
+            'created_at': invoice_dates.astype('datetime64[ns]'),
+            'updated_at': datetime.now(),
+        })
+        
+        # Invoice items: inner merge giữ thứ tự invoice, trong mỗi invoice giữ thứ tự order_items
+        items = pd.DataFrame({'invoice_id': invoice_ids, 'order_id': order_ids}).merge(
+            self.order_items_df, on='order_id', how='inner'
+        )
+        items_df = pd.DataFrame({
+            'invoice_id': items['invoice_id'],
+            'product_id': items['product_id'],
+            'description': 'Sản phẩm #' + items['product_id'].astype(str),
+            'quantity': items['quantity'],
+            'unit_price': items['unit_price'],
+            'tax_rate': 10,  # VAT 10%
+            'line_total': items['line_total'],
+            'created_at': datetime.now(),
+        })
         
         logger.info(f"Generated {len(invoices_df)} invoices and {len(items_df)} invoice items")
         
@@ -970,9 +1566,263 @@ class InvoiceGenerator(BaseGenerator):
 
 
 # ============================================================================
-# PHẦN 4: MAIN PIPELINE
+# PHẦN 4: SHARDED GENERATION
 # ============================================================================
 
+def shard_ranges(total: int, shard_size: int) -> List[tuple]:
+    """
+    Chia [0, total) thành các khoảng [start, end) liên tiếp, mỗi khoảng shard_size rows.
+    
+    Ví dụ: shard_ranges(5, 2) -> [(0, 2), (2, 4), (4, 5)]
+    """
+    return [(start, min(start + shard_size, total)) for start in range(0, total, shard_size)]
+
+
+def shard_seed(seed: int, table: str, shard_index: int) -> int:
+    """
+    Seed của một shard, suy ra từ base seed + tên bảng + số thứ tự shard.
+    
+    💡 GIẢI THÍCH:
+    np.random.SeedSequence trộn các giá trị đầu vào thành seed độc lập
+    thống kê với nhau: shard 0 của customers và shard 0 của orders không
+    dùng chung chuỗi random. Seed chỉ phụ thuộc shard (không phụ thuộc
+    worker chạy nó) nên kết quả không đổi theo --workers.
+    """
+    entropy = [seed, zlib.crc32(table.encode('utf-8')), shard_index]
+    return int(np.random.SeedSequence(entropy).generate_state(1)[0])
+
+
+def _shard_config(config: DataConfig, seed: int, **overrides) -> DataConfig:
+    """Bản sao config cho một shard: số rows của shard + pool seed = base seed"""
+    shard_config = copy.copy(config)
+    shard_config.FAKER_POOL_SEED = seed
+    for name, value in overrides.items():
+        setattr(shard_config, name, value)
+    return shard_config
+
+
+# Các hàm *_shard chạy trong worker process nên phải ở module level (pickle được)
+
+def _customer_shard(task: tuple) -> pd.DataFrame:
+    config, seed, shard_index, (start, end) = task
+    generator = CustomerGenerator(
+        _shard_config(config, seed, NUM_CUSTOMERS=end - start),
+        seed=shard_seed(seed, 'customers', shard_index),
+        first_id=start + 1,
+    )
+    return generator.generate()
+
+
+def _order_shard(task: tuple) -> tuple:
+    config, seed, shard_index, start, order_dates, customer_ids, product_data, engine = task
+    generator = OrderGenerator(
+        _shard_config(config, seed, NUM_ORDERS=len(order_dates)),
+        customer_ids,
+        product_data,
+        seed=shard_seed(seed, 'orders', shard_index),
+        engine=engine,
+        first_id=start + 1,
+        order_dates=order_dates,
+    )
+    return generator.generate()
+
+
+def _payment_shard(task: tuple) -> pd.DataFrame:
+    config, seed, shard_index, orders_df = task
+    generator = PaymentGenerator(
+        _shard_config(config, seed), orders_df, seed=shard_seed(seed, 'payments', shard_index)
+    )
+    return generator.generate()
+
+
+def _invoice_shard(task: tuple) -> tuple:
+    config, seed, shard_index, orders_df, order_items_df = task
+    generator = InvoiceGenerator(
+        _shard_config(config, seed), orders_df, order_items_df, seed=shard_seed(seed, 'invoices', shard_index)
+    )
+    return generator.generate()
+
+
+class ShardedGeneration:
+    """
+    Sinh customers, orders, payments, invoices theo shard trên process pool.
+    
+    💡 GIẢI THÍCH:
+    Mỗi bảng được chia thành các shard SHARD_SIZE rows theo ID (số thứ tự).
+    Mỗi shard là một generator độc lập với seed riêng (shard_seed) và ID bắt
+    đầu từ đầu shard, nên có thể chạy song song trên nhiều process.
+    Kết quả được nối lại theo thứ tự shard.
+    
+    Layout shard chỉ phụ thuộc SHARD_SIZE, không phụ thuộc số worker:
+    cùng seed -> cùng output dù chạy --workers 1 hay --workers 8.
+    main() luôn đi qua đây (không còn đường một chuỗi random cho cả bảng), nên
+    output theo seed khác phiên bản trước khi có shard, với mọi engine.
+    
+    Payments/invoices được sinh theo shard của orders. Số payment/invoice của
+    mỗi shard chỉ biết sau khi sinh, nên payment_code, invoice_number và
+    invoice_id được đánh số lại liên tục sau khi nối.
+    
+    Ví dụ sử dụng:
+        with ShardedGeneration(config, seed=42, workers=4) as sharded:
+            customers_df = sharded.customers()
+    """
+    
+    def __init__(self, config: DataConfig, seed: int = 42, workers: Optional[int] = None,
+                 order_engine: Optional[str] = None):
+        """
+        Args:
+            config: DataConfig instance
+            seed: Base seed, seed của từng shard được suy ra từ đây
+            workers: Số process (mặc định GENERATION_WORKERS, 1 = chạy tuần tự trong process hiện tại)
+            order_engine: Engine của OrderGenerator (mặc định DataConfig.ORDER_ENGINE)
+        """
+        self.config = config
+        self.seed = seed
+        self.workers = workers or config.GENERATION_WORKERS
+        self.order_engine = order_engine
+        self.executor = None
+        
+        if self.workers < 1:
+            raise ValueError(f"workers must be >= 1, got {self.workers}")
+    
+    def __enter__(self):
+        if self.workers > 1:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+    
+    def _map(self, fn, tasks: List[tuple]) -> list:
+        """Chạy fn cho từng task, giữ thứ tự task (map của executor hoặc built-in)"""
+        if self.executor is None:
+            return [fn(task) for task in tasks]
+        return list(self.executor.map(fn, tasks))
+    
+    def _shards(self, total: int) -> List[tuple]:
+        return shard_ranges(total, self.config.SHARD_SIZE)
+    
+    def customers(self) -> pd.DataFrame:
+        """Sinh NUM_CUSTOMERS customers"""
+        tasks = [
+            (self.config, self.seed, index, shard)
+            for index, shard in enumerate(self._shards(self.config.NUM_CUSTOMERS))
+        ]
+        return pd.concat(self._map(_customer_shard, tasks), ignore_index=True)
+    
+    def orders(self, customer_ids: List[int], product_data: pd.DataFrame) -> tuple:
+        """
+        Sinh NUM_ORDERS orders và order_items.
+        
+        💡 GIẢI THÍCH:
+        Ngày của orders được phân bổ một lần cho toàn bộ NUM_ORDERS (seasonality
+        tính trên tổng số đơn) rồi chia slice cho các shard, nên phân bố ngày
+        và tổng số orders không phụ thuộc SHARD_SIZE.
+        
+        Returns:
+            Tuple (orders_df, order_items_df), order_id của items = số thứ tự order
+        """
+        order_dates = OrderGenerator.distribute_order_dates(
+            self.config, np.random.default_rng(shard_seed(self.seed, 'order_dates', 0))
+        )
+        tasks = [
+            (self.config, self.seed, index, start, order_dates[start:end],
+             customer_ids, product_data, self.order_engine)
+            for index, (start, end) in enumerate(self._shards(len(order_dates)))
+        ]
+        results = self._map(_order_shard, tasks)
+        orders_df = pd.concat([orders for orders, _ in results], ignore_index=True)
+        items_df = pd.concat([items for _, items in results], ignore_index=True)
+        logger.info(f"Generated {len(orders_df)} orders and {len(items_df)} order items in {len(tasks)} shards")
+        return orders_df, items_df
+    
+    def payments(self, orders_df: pd.DataFrame) -> pd.DataFrame:
+        """Sinh payments theo shard của orders (orders_df cần RangeIndex: order_id = index + 1)"""
+        tasks = [
+            (self.config, self.seed, index, orders_df.iloc[start:end])
+            for index, (start, end) in enumerate(self._shards(len(orders_df)))
+        ]
+        payments_df = pd.concat(self._map(_payment_shard, tasks), ignore_index=True)
+        payments_df['payment_code'] = BaseGenerator.generate_codes('PAY', np.arange(1, len(payments_df) + 1))
+        return payments_df
+    
+    def invoices(self, orders_df: pd.DataFrame, order_items_df: pd.DataFrame) -> tuple:
+        """
+        Sinh invoices và invoice_items theo shard của orders.
+        
+        Args:
+            orders_df: Orders với RangeIndex (order_id = index + 1)
+            order_items_df: Order items với order_id tạm (chưa map sang DB id), sort theo order_id
+        """
+        item_order_ids = order_items_df['order_id'].to_numpy()
+        tasks = []
+        for index, (start, end) in enumerate(self._shards(len(orders_df))):
+            # Items của shard: order_id trong (start, end]
+            lo, hi = np.searchsorted(item_order_ids, [start + 1, end + 1])
+            tasks.append((self.config, self.seed, index, orders_df.iloc[start:end], order_items_df.iloc[lo:hi]))
+        results = self._map(_invoice_shard, tasks)
+        
+        # Đánh số lại invoice liên tục giữa các shard
+        offset = 0
+        all_invoice_items = []
+        for invoices, invoice_items in results:
+            all_invoice_items.append(invoice_items.assign(invoice_id=invoice_items['invoice_id'] + offset))
+            offset += len(invoices)
+        
+        invoices_df = pd.concat([invoices for invoices, _ in results], ignore_index=True)
+        invoices_df['invoice_number'] = BaseGenerator.generate_codes('INV', np.arange(1, len(invoices_df) + 1))
+        return invoices_df, pd.concat(all_invoice_items, ignore_index=True)
+
+
+# ============================================================================
+# PHẦN 5: MAIN PIPELINE
+# ============================================================================
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(
+        description='Generate fake e-commerce data into the source database'
+    )
+    parser.add_argument(
+        '--order-engine',
+        choices=DataConfig.SUPPORTED_ORDER_ENGINES,
+        default=DataConfig.ORDER_ENGINE,
+        help='Engine sinh orders/order_items: python (vòng lặp) hoặc numpy (vectorized)'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=42,
+        help='Random seed (cùng seed -> cùng dữ liệu với mọi --workers; '
+             'khác dữ liệu của phiên bản trước khi sinh theo shard)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=DataConfig.GENERATION_WORKERS,
+        help='Số process sinh customers/orders/payments/invoices theo shard (output không đổi theo số worker)'
+    )
+    parser.add_argument(
+        '--loader',
+        choices=DataConfig.SUPPORTED_LOADERS,
+        default=DataConfig.DATA_LOADER,
+        help='Cách load vào DB: insert (execute_values) hoặc copy (COPY FROM STDIN)'
+    )
+    parser.add_argument(
+        '--rebuild-indexes',
+        action='store_true',
+        help='Với --loader copy: drop index (trừ PK/UNIQUE) và trigger trg_*_updated_at trước khi load, tạo lại sau'
+    )
+    args = parser.parse_args(argv)
+    
+    if args.rebuild_indexes and args.loader != 'copy':
+        parser.error('--rebuild-indexes requires --loader copy')
+    
+    return args
+
+
 def main():
     """
     Main function chạy toàn bộ pipeline sinh dữ liệu.
@@ -989,79 +1839,78 @@ def main():
     logger.info("Starting Data Generation Pipeline")
     logger.info("="*60)
     
+    args = parse_args()
     config = DataConfig()
     
     # Kết nối database
-    with DatabaseConnection() as db:
+    with DatabaseConnection(loader=args.loader, rebuild_indexes=args.rebuild_indexes) as db, ShardedGeneration(
+        config, seed=args.seed, workers=args.workers, order_engine=args.order_engine
+    ) as sharded:
         
         # 1. Generate và insert Categories
         logger.info("\n📦 Step 1: Generating Categories...")
-        cat_gen = CategoryGenerator(config)
+        cat_gen = CategoryGenerator(config, seed=args.seed)
         categories_df = cat_gen.generate()
-        db.insert_dataframe(categories_df, 'categories')
+        db.load_dataframe(categories_df, 'categories')
         
         # Lấy category IDs từ DB
         cat_ids = db.execute_query("SELECT id FROM ecommerce.categories")['id'].tolist()
         
         # 2. Generate và insert Products
         logger.info("\n📦 Step 2: Generating Products...")
-        prod_gen = ProductGenerator(config, cat_ids)
+        prod_gen = ProductGenerator(config, cat_ids, seed=args.seed)
         products_df = prod_gen.generate()
-        db.insert_dataframe(products_df, 'products')
+        db.load_dataframe(products_df, 'products')
         
         # Lấy product data từ DB
         product_data = db.execute_query("SELECT id, unit_price FROM ecommerce.products")
         
         # 3. Generate và insert Customers
         logger.info("\n👥 Step 3: Generating Customers...")
-        cust_gen = CustomerGenerator(config)
-        customers_df = cust_gen.generate()
-        db.insert_dataframe(customers_df, 'customers')
+        customers_df = sharded.customers()
+        db.load_dataframe(customers_df, 'customers')
         
         # Lấy customer IDs
         cust_ids = db.execute_query("SELECT id FROM ecommerce.customers")['id'].tolist()
         
         # 4. Generate và insert Orders & Order Items
         logger.info("\n🛒 Step 4: Generating Orders and Order Items...")
-        order_gen = OrderGenerator(config, cust_ids, product_data)
-        orders_df, items_df = order_gen.generate()
+        orders_df, items_df = sharded.orders(cust_ids, product_data)
         
         # Insert orders first
-        db.insert_dataframe(orders_df, 'orders')
+        db.load_dataframe(orders_df, 'orders')
         
         # Get actual order IDs and update items
         order_ids = db.execute_query(
             "SELECT id, order_number FROM ecommerce.orders"
         )
         order_id_map = dict(zip(range(1, len(orders_df) + 1), order_ids['id'].tolist()))
-        items_df['order_id'] = items_df['order_id'].map(order_id_map)
         
-        db.insert_dataframe(items_df, 'order_items')
+        # Giữ items_df với order_id tạm để sinh invoice_items ở step 6
+        db.load_dataframe(items_df.assign(order_id=items_df['order_id'].map(order_id_map)), 'order_items')
         
         # 5. Generate và insert Payments
         logger.info("\n💳 Step 5: Generating Payments...")
-        pay_gen = PaymentGenerator(config, orders_df)
-        payments_df = pay_gen.generate()
+        payments_df = sharded.payments(orders_df)
         
         # Update order_id mapping
         payments_df['order_id'] = payments_df['order_id'].map(order_id_map)
-        db.insert_dataframe(payments_df, 'payments')
+        db.load_dataframe(payments_df, 'payments')
         
         # 6. Generate và insert Invoices & Invoice Items
         logger.info("\n📄 Step 6: Generating Invoices...")
-        inv_gen = InvoiceGenerator(config, orders_df, items_df)
-        invoices_df, inv_items_df = inv_gen.generate()
+        invoices_df, inv_items_df = sharded.invoices(orders_df, items_df)
         
         # Update mappings
         invoices_df['order_id'] = invoices_df['order_id'].map(order_id_map)
-        db.insert_dataframe(invoices_df, 'invoices')
+        db.load_dataframe(invoices_df, 'invoices')
         
         # Get invoice IDs
         invoice_ids = db.execute_query("SELECT id FROM ecommerce.invoices")['id'].tolist()
         inv_id_map = dict(zip(range(1, len(invoices_df) + 1), invoice_ids))
         inv_items_df['invoice_id'] = inv_items_df['invoice_id'].map(inv_id_map)
         
-        db.insert_dataframe(inv_items_df, 'invoice_items')
+        db.load_dataframe(inv_items_df, 'invoice_items')
         
         # Print summary
         logger.info("\n" + "="*60)
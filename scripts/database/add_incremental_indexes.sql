@@ -0,0 +1,24 @@
+-- ============================================================================
+-- FILE: add_incremental_indexes.sql
+-- PURPOSE: Thêm index (updated_at, id) cho database nguồn đã khởi tạo trước đó
+--          (order_items / invoice_items: (created_at, id), watermark riêng của child)
+--
+-- HƯỚNG DẪN SỬ DỤNG:
+--     psql -h localhost -U postgres -d ecommerce_source \
+--          -f scripts/database/add_incremental_indexes.sql
+--
+-- 💡 GIẢI THÍCH:
+-- docker/postgres/init-source.sql chỉ chạy khi volume còn trống.
+-- Database đã có dữ liệu cần chạy file này để incremental export
+-- (--mode incremental) dùng được index thay vì quét toàn bộ table.
+-- CONCURRENTLY để không khóa ghi trên source đang chạy.
+-- ============================================================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_categories_updated_at ON ecommerce.categories(updated_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_products_updated_at ON ecommerce.products(updated_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_customers_updated_at ON ecommerce.customers(updated_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_orders_updated_at ON ecommerce.orders(updated_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_payments_updated_at ON ecommerce.payments(updated_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_invoices_updated_at ON ecommerce.invoices(updated_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_order_items_created_at ON ecommerce.order_items(created_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_invoice_items_created_at ON ecommerce.invoice_items(created_at, id);
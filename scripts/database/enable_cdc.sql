@@ -0,0 +1,27 @@
+-- ============================================================================
+-- FILE: enable_cdc.sql
+-- PURPOSE: Chuẩn bị database nguồn cho CDC (--mode cdc)
+--
+-- HƯỚNG DẪN SỬ DỤNG:
+--     # 1. Server phải chạy với wal_level=logical (docker-compose đã cấu hình)
+--     # 2. Tạo publication:
+--     psql -h localhost -U postgres -d ecommerce_source \
+--          -f scripts/database/enable_cdc.sql
+--
+-- 💡 GIẢI THÍCH:
+-- Publication chọn tables mà plugin pgoutput gửi thay đổi. Replication slot
+-- do export_to_staging.py tự tạo ở lần chạy CDC đầu tiên.
+-- DELETE chỉ mang primary key (REPLICA IDENTITY DEFAULT), đủ để downstream
+-- xóa đúng row.
+-- ============================================================================
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_publication WHERE pubname = 'ecommerce_cdc') THEN
+        CREATE PUBLICATION ecommerce_cdc FOR TABLES IN SCHEMA ecommerce;
+    END IF;
+END
+$$;
+
+-- Slot không còn dùng sẽ giữ WAL vô thời hạn, xóa bằng:
+-- SELECT pg_drop_replication_slot('ecommerce_staging');
@@ -0,0 +1,463 @@
+"""
+===============================================================================
+FILE: async_engine.py
+PURPOSE: Engine export bất đồng bộ (asyncio + asyncpg) cho --engine async
+AUTHOR: Data Engineering Team
+VERSION: 1.0
+
+HƯỚNG DẪN SỬ DỤNG:
+    # Cùng CLI flags và cùng _metadata.json với engine đồng bộ
+    python src/ingestion/export_to_staging.py --engine async --format parquet --workers 8
+    python src/ingestion/export_to_staging.py --engine async --partitions 4 --consistent
+
+KIẾN TRÚC:
+    Mỗi table (hoặc mỗi part khi --partitions) là một chuỗi stage nối bằng
+    asyncio.Queue có giới hạn (IngestConfig.ASYNC_QUEUE_DEPTH):
+
+    Parquet:
+        asyncpg cursor ──► Queue ──► encode (thread pool) ──► Queue ──► write (thread pool)
+        (binary protocol)  rows      rows -> RecordBatch      batches   ParquetWriter
+
+    CSV:
+        COPY ... TO STDOUT ──► Queue ──► write (thread pool)
+        (asyncpg copy_from_query)  bytes
+
+    Event loop
+        ├── orders     part 0: read │ encode │ write
+        ├── orders     part 1: read │ encode │ write
+        ├── customers        : read │ encode │ write
+        └── ...  (tối đa --workers tables cùng lúc, connection lấy từ asyncpg pool)
+
+    Trong khi chunk N đang được ghi xuống disk, chunk N+1 đang encode và
+    chunk N+2 đang về qua network. Queue đầy -> stage trước dừng chờ, nên
+    memory mỗi table/part bị chặn ở ~ 2 * ASYNC_QUEUE_DEPTH chunk.
+    --memory-budget: stage read giữ chỗ trong budget trước mỗi lần fetch,
+    stage write trả lại sau khi ghi, nên tổng chunk của mọi table/part
+    đang nằm trong các Queue không vượt budget.
+===============================================================================
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List
+
+from src.ingestion.export_to_staging import (
+    ExportCancelledError,
+    IngestConfig,
+    IngestPipeline,
+    get_rss_mb,
+    rows_to_record_batch,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def run_stages(*coroutines) -> List:
+    """
+    Chạy các stage của một pipeline đồng thời.
+
+    💡 GIẢI THÍCH:
+    Giống asyncio.gather nhưng một stage lỗi thì các stage còn lại bị
+    cancel (và chờ dọn xong) trước khi raise lỗi đó. Nếu không, stage
+    trước sẽ chờ mãi trên một Queue đầy mà không còn ai đọc.
+
+    Returns:
+        Kết quả của từng stage theo thứ tự truyền vào
+    """
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+class AsyncIngestPipeline(IngestPipeline):
+    """
+    💡 GIẢI THÍCH:
+    IngestPipeline với phần đọc / ghi dữ liệu chạy trên một event loop.
+
+    Engine đồng bộ dùng 1 thread cho mỗi table/part, và trong thread đó đọc
+    network rồi mới ghi disk, lần lượt. Ở đây:
+    - Mọi table/part chạy như coroutine trên cùng một event loop, connection
+      lấy từ asyncpg pool (binary protocol, decode trong C)
+    - Mỗi table/part là chuỗi stage read -> encode -> write nối bằng Queue có
+      giới hạn, nên network, CPU (Arrow) và disk chạy chồng lên nhau
+    - Công việc blocking (build RecordBatch, ParquetWriter, file I/O) được đẩy
+      sang thread pool, event loop chỉ điều phối
+
+    Phần còn lại giữ nguyên từ IngestPipeline: setup, --consistent (exported
+    snapshot), incremental plan, --resume, --skip-unchanged, sink local/s3,
+    _metadata.json và _SUCCESS. Kiểu dữ liệu Parquet giống engine arrow
+    (decimal128, date32, dictionary).
+
+    Ví dụ sử dụng:
+        pipeline = AsyncIngestPipeline(output_format='parquet', workers=8, partitions=4)
+        result = pipeline.run()
+    """
+
+    ENGINES = ['async']
+
+    # read / encode / write chạy chồng lên nhau trên 3 chunk khác nhau
+    CHUNKS_PER_READER = 3
+
+    def __init__(self, *args, queue_depth: int = IngestConfig.ASYNC_QUEUE_DEPTH, **kwargs):
+        """
+        Args:
+            *args, **kwargs: Như IngestPipeline (engine mặc định 'async')
+            queue_depth: Số chunk tối đa chờ giữa hai stage
+        """
+        kwargs.setdefault('engine', 'async')
+        super().__init__(*args, **kwargs)
+
+        if queue_depth < 1:
+            raise ValueError("queue_depth must be >= 1")
+        self.queue_depth = queue_depth
+        self.pool = None
+        self._memory_freed = None
+
+    # ------------------------------------------------------------------
+    # Điều phối
+    # ------------------------------------------------------------------
+
+    def _export_tables(self):
+        """Chạy export mọi table trên một event loop mới (gọi từ run())"""
+        asyncio.run(self._export_tables_async())
+
+    async def _export_tables_async(self):
+        """
+        Export tất cả tables, tối đa self.workers tables cùng lúc.
+
+        Giống _export_tables đồng bộ: self.results theo đúng thứ tự
+        self.tables; một table lỗi -> các table khác bị cancel, lỗi được
+        raise lại cho run().
+        """
+        import asyncpg
+
+        self._cancel_event.clear()
+        self._memory_freed = asyncio.Event()
+        self.pool = await asyncpg.create_pool(
+            host=self.db.host,
+            port=int(self.db.port),
+            database=self.db.database,
+            user=self.db.user,
+            password=self.db.password,
+            min_size=1,
+            max_size=self.db.pool_size,
+            server_settings={'application_name': IngestConfig.SOURCE_APPLICATION_NAME},
+        )
+        slots = asyncio.Semaphore(self.workers)
+
+        async def export(table_name: str) -> Dict:
+            async with slots:
+                return await self._export_table_async(table_name)
+
+        try:
+            tasks = {table: asyncio.ensure_future(export(table)) for table in self.tables}
+            done, pending = await asyncio.wait(tasks.values(), return_when=asyncio.FIRST_EXCEPTION)
+
+            first_error = next(
+                (t.exception() for t in done if not t.cancelled() and t.exception() is not None),
+                None,
+            )
+            if pending:
+                # Một table lỗi: dừng các table đang chạy / đang chờ slot
+                self._cancel_event.set()
+                for task in pending:
+                    task.cancel()
+                await asyncio.wait(pending)
+        finally:
+            await self.pool.close()
+            self.pool = None
+
+        results = []
+        for table, task in tasks.items():
+            if task.cancelled() or isinstance(task.exception(), ExportCancelledError):
+                results.append({'table': table, 'status': 'cancelled'})
+            elif task.exception() is not None:
+                results.append({'table': table, 'status': 'failed', 'error': str(task.exception())})
+            else:
+                results.append(task.result())
+        self.results = results
+
+        if first_error is not None:
+            raise first_error
+
+    async def _export_table_async(self, table_name: str) -> Dict:
+        """Bản async của _export_table (cùng kết quả trong _metadata.json)"""
+        logger.info(f"\n📦 Exporting: {table_name}")
+        start_time = time.time()
+
+        try:
+            self._check_cancelled(table_name)
+
+            # Resume / clear / fingerprint là I/O đồng bộ ngắn -> thread pool
+            done, fingerprint = await asyncio.to_thread(self._prepare_table, table_name, start_time)
+            if done is not None:
+                return done
+
+            where = self.incremental_plan.get(table_name, {}).get('where')
+            if self.memory is not None:
+                await asyncio.to_thread(self._plan_memory, table_name)
+            if self.partitions > 1 and table_name in self.split_tables:
+                stats = await self._export_table_ranges_async(table_name, where)
+            else:
+                stats = await self._export_table_stream_async(table_name, where)
+
+            result = self._table_result(table_name, stats, start_time, fingerprint)
+            await asyncio.to_thread(self._record_progress, table_name, result)
+            return result
+
+        except (ExportCancelledError, asyncio.CancelledError):
+            raise
+        except Exception as e:
+            logger.error(f"Failed to export {table_name}: {e}")
+            raise
+
+    async def _export_table_ranges_async(self, table_name: str, where: str = None) -> Dict:
+        """
+        Bản async của _export_table_ranges: mỗi khoảng id là một coroutine
+        với connection riêng từ pool, thay vì một thread.
+        """
+        ranges = await asyncio.to_thread(self._plan_ranges, table_name)
+
+        async def export_part(part: int, id_range: tuple) -> Dict:
+            done = await asyncio.to_thread(self._resume_part, table_name, part)
+            if done is not None:
+                return done
+
+            stats = await self._export_table_stream_async(
+                table_name, self._range_where(id_range, where), part
+            )
+            await asyncio.to_thread(self._record_part, table_name, part, id_range, stats)
+            return stats
+
+        try:
+            parts = await run_stages(*(
+                export_part(part, id_range) for part, id_range in enumerate(ranges)
+            ))
+        except Exception:
+            self._cancel_event.set()
+            raise
+
+        return self._merge_parts(table_name, parts)
+
+    # ------------------------------------------------------------------
+    # Đọc source
+    # ------------------------------------------------------------------
+
+    async def _acquire_memory(self, table_name: str, nbytes: int):
+        """
+        Giữ chỗ trong --memory-budget mà không chặn thread nào.
+
+        💡 GIẢI THÍCH:
+        Nếu chờ bằng MemoryBudget.acquire trong thread pool, đủ nhiều reader
+        đang chờ sẽ chiếm hết thread của pool, stage write không còn thread
+        để ghi (và trả chỗ) -> deadlock. Ở đây reader chờ trên asyncio.Event,
+        được set mỗi khi có chỗ được trả lại (mọi release đều chạy trên loop).
+        """
+        start = None
+        while not self.memory.acquire(table_name, nbytes, blocking=False):
+            start = start or time.monotonic()
+            self._memory_freed.clear()
+            await self._memory_freed.wait()
+        if start is not None:
+            self.memory.record_wait(table_name, time.monotonic() - start)
+
+    def _release_memory(self, nbytes: int):
+        """Trả chỗ trong budget và đánh thức các reader đang chờ"""
+        self.memory.release(nbytes)
+        self._memory_freed.set()
+
+    @asynccontextmanager
+    async def _throttle_slot(self):
+        """
+        Bản async của SourceThrottle.slot() (--throttle) cho một FETCH / COPY.
+
+        Lấy mẫu (query đồng bộ) chạy trong thread pool, pause bằng
+        asyncio.sleep, và slot được chờ bằng cách thử lại định kỳ thay vì
+        chặn một thread của pool.
+        """
+        throttle = self.db.throttle
+        if throttle is None:
+            yield
+            return
+
+        if throttle.sample_due():
+            await asyncio.to_thread(throttle.maybe_sample)
+        pause = throttle.pause()
+        if pause > 0:
+            await asyncio.sleep(pause)
+            throttle.record_pause(pause)
+        while not throttle.acquire(blocking=False):
+            await asyncio.sleep(IngestConfig.THROTTLE_POLL_SECONDS)
+        try:
+            yield
+        finally:
+            throttle.release()
+
+    @asynccontextmanager
+    async def _read_transaction(self):
+        """
+        Connection từ pool trong một transaction chỉ đọc.
+
+        --consistent: transaction REPEATABLE READ gắn vào exported snapshot
+        của coordinator (SET TRANSACTION SNAPSHOT phải là lệnh đầu tiên),
+        giống _use_exported_snapshot của SourceDatabase.
+        """
+        snapshot_id = self.db.snapshot_id
+        async with self.pool.acquire() as conn:
+            isolation = 'repeatable_read' if snapshot_id else None
+            async with conn.transaction(isolation=isolation, readonly=True):
+                if snapshot_id:
+                    escaped = snapshot_id.replace("'", "''")
+                    await conn.execute(f"SET TRANSACTION SNAPSHOT '{escaped}'")
+                yield conn
+
+    async def _export_table_stream_async(self, table_name: str, where: str = None, part: int = None) -> Dict:
+        """
+        Export một table/part: CSV qua COPY, Parquet qua cursor + Arrow.
+
+        Returns:
+            Dict stats giống engine đồng bộ: rows, file, chunks, peak_rss_mb, parquet
+        """
+        if self.output_format == 'csv':
+            return await self._export_copy_async(table_name, where, part)
+        return await self._export_cursor_async(table_name, where, part)
+
+    async def _export_copy_async(self, table_name: str, where: str = None, part: int = None) -> Dict:
+        """
+        CSV: COPY (SELECT ...) TO STDOUT, bytes đi thẳng từ socket vào file.
+
+        💡 GIẢI THÍCH:
+        asyncpg gọi callback cho mỗi block COPY nhận được; callback chỉ đẩy
+        block vào Queue. Stage write gom các block đang chờ thành một lần
+        f.write trong thread pool, nên đọc socket và ghi disk chồng lên nhau.
+        """
+        query = self.db.build_select(table_name, IngestConfig.SOURCE_SCHEMA, where)
+        output_path = self.staging.get_table_path(table_name, 'csv', part)
+        blocks = asyncio.Queue(maxsize=self.queue_depth)
+        peak_rss = get_rss_mb()
+
+        async def read() -> str:
+            async with self._read_transaction() as conn, self._throttle_slot():
+                status = await conn.copy_from_query(query, output=blocks.put, format='csv', header=True)
+            await blocks.put(None)
+            return status
+
+        async def write(f):
+            while True:
+                data = [await blocks.get()]
+                while not blocks.empty():
+                    data.append(blocks.get_nowait())
+                finished = data[-1] is None
+                if finished:
+                    data.pop()
+                if data:
+                    self._check_cancelled(table_name)
+                    await asyncio.to_thread(f.write, b''.join(data))
+                if finished:
+                    return
+
+        with self.staging.open_output(output_path) as f:
+            status, _ = await run_stages(read(), write(f))
+
+        # status = 'COPY <rows>'
+        rows = int(status.split()[-1])
+        logger.info(f"✅ Written: {output_path} ({rows} rows, COPY async)")
+        return {'rows': rows, 'file': output_path, 'peak_rss_mb': max(peak_rss, get_rss_mb())}
+
+    async def _export_cursor_async(self, table_name: str, where: str = None, part: int = None) -> Dict:
+        """
+        Parquet: cursor (binary protocol) -> RecordBatch -> ParquetWriter.
+
+        💡 GIẢI THÍCH:
+        - read: cursor.fetch(chunk_size) trong transaction, đẩy list Record vào Queue
+        - encode: rows_to_record_batch trong thread pool (kiểu chính xác như engine arrow)
+        - write: writer.write_arrow trong thread pool, mỗi batch = 1 chunk
+        Ba stage chạy song song trên các chunk khác nhau.
+
+        --memory-budget: read giữ chỗ (bytes mỗi row * chunk rows) trước mỗi
+        fetch, write trả lại sau khi ghi; bytes mỗi row được đo lại ở encode.
+        """
+        schema = await asyncio.to_thread(
+            self.db.get_table_schema, table_name, IngestConfig.SOURCE_SCHEMA, True
+        )
+        query = self.db.build_select(table_name, IngestConfig.SOURCE_SCHEMA, where)
+        raw = asyncio.Queue(maxsize=self.queue_depth)
+        encoded = asyncio.Queue(maxsize=self.queue_depth)
+        peak_rss = get_rss_mb()
+        chunk_rows = self._chunk_rows(table_name)
+        row_bytes = self.row_bytes.get(table_name)
+        # Chỗ đã giữ trong budget của các chunk chưa ghi xong (theo thứ tự fetch)
+        held = []
+
+        async def read():
+            async with self._read_transaction() as conn:
+                statement = await conn.prepare(query)
+                columns = [attribute.name for attribute in statement.get_attributes()]
+                if columns != schema.names:
+                    raise ValueError(f"Columns of {table_name} changed during export: {columns}")
+
+                cursor = await statement.cursor()
+                while True:
+                    self._check_cancelled(table_name)
+                    if self.memory is not None:
+                        nbytes = int(row_bytes * chunk_rows)
+                        await self._acquire_memory(table_name, nbytes)
+                        held.append(nbytes)
+                    async with self._throttle_slot():
+                        fetch_rows = self.db.throttle.fetch_rows(chunk_rows) if self.db.throttle else chunk_rows
+                        rows = await cursor.fetch(fetch_rows)
+                    if not rows:
+                        break
+                    await raw.put(rows)
+            await raw.put(None)
+
+        async def encode():
+            nonlocal row_bytes
+            loop = asyncio.get_running_loop()
+            while (rows := await raw.get()) is not None:
+                batch = await loop.run_in_executor(None, rows_to_record_batch, rows, schema)
+                if self.memory is not None:
+                    row_bytes = self.memory.observe(table_name, batch.num_rows, batch.nbytes) or row_bytes
+                await encoded.put(batch)
+            await encoded.put(None)
+
+        async def write(writer):
+            nonlocal peak_rss
+            while (batch := await encoded.get()) is not None:
+                await asyncio.to_thread(writer.write_arrow, batch)
+                if held:
+                    self._release_memory(held.pop(0))
+                peak_rss = max(peak_rss, get_rss_mb())
+
+        writer = self.staging.open_writer(
+            table_name, self.output_format, schema, part, self._parquet_options(table_name),
+            self.variants.get(table_name)
+        )
+        try:
+            await run_stages(read(), encode(), write(writer))
+        except BaseException:
+            writer.abort()
+            raise
+        finally:
+            # Lần fetch cuối (0 rows) hoặc chunk còn trong Queue khi lỗi
+            for nbytes in held:
+                self._release_memory(nbytes)
+            held.clear()
+        await asyncio.to_thread(writer.close)
+
+        logger.info(f"✅ Written: {writer.file_path} ({writer.rows} rows, {writer.chunks} chunks, async)")
+        return {
+            'rows': writer.rows,
+            'file': writer.file_path,
+            'chunks': writer.chunks,
+            'peak_rss_mb': max(peak_rss, get_rss_mb()),
+            'parquet': writer.parquet_layout(),
+            'hive_partitions': writer.partition_info(),
+        }
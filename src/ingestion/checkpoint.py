@@ -0,0 +1,247 @@
+"""
+===============================================================================
+FILE: checkpoint.py
+PURPOSE: Progress manifest để resume một lần export bị gián đoạn (--resume)
+AUTHOR: Data Engineering Team
+VERSION: 1.0
+
+KIẾN TRÚC:
+    data/staging/
+        snapshot_date=2024-01-15/
+            _progress.json       <- file này (ghi atomic sau mỗi table / part)
+            categories.parquet
+            orders/
+                part-00000.parquet
+                part-00001.parquet
+            _SUCCESS             <- chỉ có khi mọi table đã xong
+
+    _progress.json:
+    {
+        "config": {"output_format": "parquet", "engine": "copy", "partitions": 2, ...},
+        "complete": false,
+        "tables": {
+            "categories": {
+                "status": "complete",
+                "files": {"categories.parquet": "<sha256>"},
+                "result": {...kết quả trong _metadata.json...}
+            },
+            "orders": {
+                "status": "running",
+                "id_ranges": [[1, 50000], [50001, null]],
+                "parts": {
+                    "0": {"files": {"orders/part-00000.parquet": "<sha256>"}, "stats": {...}}
+                }
+            }
+        }
+    }
+===============================================================================
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.ingestion.watermark import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_FILE = '_progress.json'
+
+
+def file_checksum(file_path: Path, block_size: int = 1 << 20) -> str:
+    """SHA-256 của file, đọc theo block để không phải load cả file vào memory"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ProgressManifest:
+    """
+    💡 GIẢI THÍCH:
+    Ghi lại tiến độ của một snapshot: table nào đã xong, và với table lớn
+    được chia khoảng id (--partitions) thì part nào đã xong.
+
+    - Mỗi table / part chỉ được đánh dấu xong SAU KHI file đã đóng và đổi tên
+      từ file tạm, kèm SHA-256 của từng file.
+    - Manifest được ghi lại bằng write_json_atomic (file tạm + os.replace)
+      sau mỗi lần cập nhật, nên process bị kill lúc nào cũng không làm hỏng nó.
+    - --resume: table / part đã xong được kiểm tra lại checksum rồi bỏ qua;
+      file bị sửa hoặc mất -> export lại phần đó.
+
+    Đơn vị resume nhỏ nhất là một part file: Parquet chỉ hợp lệ khi đã ghi
+    footer, nên một file đang ghi dở không thể nối tiếp mà phải ghi lại.
+    Các worker ghi song song nên mọi cập nhật đi qua một lock.
+    """
+
+    def __init__(self, snapshot_path: Path, config: Dict):
+        """
+        Args:
+            snapshot_path: Thư mục snapshot (chứa _progress.json)
+            config: Các option ảnh hưởng tới file output (format, engine, partitions...).
+                    Resume với config khác -> bắt đầu lại từ đầu.
+        """
+        self.snapshot_path = Path(snapshot_path)
+        self.path = self.snapshot_path / PROGRESS_FILE
+        self.config = json.loads(json.dumps(config, default=str))
+        self.state = {'config': self.config, 'complete': False, 'tables': {}}
+        self._lock = threading.Lock()
+
+    def begin(self, resume: bool = False):
+        """
+        Bắt đầu một lần chạy.
+
+        resume=False: bỏ manifest cũ (nếu có), mọi table được export lại.
+        resume=True: dùng manifest cũ nếu cùng config.
+        """
+        if resume and self.path.exists():
+            with open(self.path, encoding='utf-8') as f:
+                previous = json.load(f)
+            if previous.get('config') == self.config:
+                self.state = previous
+                self.state['complete'] = False
+                done = [t for t, entry in self.state['tables'].items() if entry['status'] == 'complete']
+                logger.info(f"Resuming {self.snapshot_path.name}: {len(done)} table(s) already complete")
+            else:
+                logger.warning("Progress manifest was written with different options: starting over")
+        elif resume:
+            logger.info("No progress manifest found: starting from scratch")
+
+        self.state['started_at'] = datetime.now().isoformat()
+        self.save()
+
+    def save(self):
+        write_json_atomic(self.path, self.state)
+
+    def _checksums(self, files: List[Path]) -> Dict[str, str]:
+        return {
+            f.relative_to(self.snapshot_path).as_posix(): file_checksum(f)
+            for f in files
+        }
+
+    def _verify(self, checksums: Dict[str, str]) -> bool:
+        """Mọi file còn đó và đúng checksum đã ghi"""
+        for rel_path, expected in checksums.items():
+            file_path = self.snapshot_path / rel_path
+            if not file_path.exists():
+                logger.warning(f"Checkpoint file missing: {rel_path}")
+                return False
+            if file_checksum(file_path) != expected:
+                logger.warning(f"Checkpoint checksum mismatch: {rel_path}")
+                return False
+        return True
+
+    # ------------------------------------------------------------------
+    # Table
+    # ------------------------------------------------------------------
+
+    def completed_table(self, table_name: str) -> Optional[Dict]:
+        """
+        Kết quả của table nếu đã xong ở lần chạy trước và file vẫn đúng checksum.
+
+        Returns:
+            Dict kết quả (như trong _metadata.json), None nếu phải export
+        """
+        with self._lock:
+            entry = self.state['tables'].get(table_name)
+        if not entry or entry['status'] != 'complete':
+            return None
+
+        if not self._verify(entry['files']):
+            with self._lock:
+                del self.state['tables'][table_name]
+                self.save()
+            return None
+        return entry['result']
+
+    def has_parts(self, table_name: str) -> bool:
+        """Table đang dở và đã có part hoàn thành (không được clear cả table)"""
+        with self._lock:
+            entry = self.state['tables'].get(table_name)
+        return bool(entry and entry['status'] == 'running' and entry.get('parts'))
+
+    def table_ranges(self, table_name: str) -> Optional[List[list]]:
+        """Khoảng id đã chốt cho table đang dở (part đã xong phải khớp đúng khoảng này)"""
+        with self._lock:
+            entry = self.state['tables'].get(table_name)
+        if not entry or entry['status'] != 'running':
+            return None
+        return entry.get('id_ranges')
+
+    def start_table(self, table_name: str, id_ranges: List[tuple] = None):
+        """
+        Đánh dấu table đang export (kèm id_ranges nếu table được chia part).
+
+        Cùng id_ranges với lần chạy trước -> giữ các part đã xong,
+        ngược lại bắt đầu lại table.
+        """
+        id_ranges = [list(r) for r in id_ranges] if id_ranges is not None else None
+        with self._lock:
+            entry = self.state['tables'].get(table_name)
+            if entry and entry['status'] == 'running' and entry.get('id_ranges') == id_ranges:
+                return
+            self.state['tables'][table_name] = {'status': 'running', 'id_ranges': id_ranges, 'parts': {}}
+            self.save()
+
+    def record_table(self, table_name: str, result: Dict, files: List[Path]):
+        """Table đã ghi xong: lưu kết quả + checksum (part đã có checksum thì dùng lại)"""
+        with self._lock:
+            entry = self.state['tables'].get(table_name) or {}
+            known = {}
+            for part in entry.get('parts', {}).values():
+                known.update(part['files'])
+
+        checksums = {
+            rel_path: known.get(rel_path) or file_checksum(self.snapshot_path / rel_path)
+            for rel_path in (f.relative_to(self.snapshot_path).as_posix() for f in files)
+        }
+        with self._lock:
+            self.state['tables'][table_name] = {
+                'status': 'complete',
+                'files': checksums,
+                'result': json.loads(json.dumps(result, default=str)),
+                'completed_at': datetime.now().isoformat(),
+            }
+            self.save()
+
+    # ------------------------------------------------------------------
+    # Part (khoảng id của table lớn)
+    # ------------------------------------------------------------------
+
+    def completed_part(self, table_name: str, part: int) -> Optional[Dict]:
+        """Stats của part đã xong và file vẫn đúng checksum, None nếu phải export lại"""
+        with self._lock:
+            entry = self.state['tables'].get(table_name) or {}
+            record = entry.get('parts', {}).get(str(part))
+        if record is None:
+            return None
+
+        if not self._verify(record['files']):
+            with self._lock:
+                del entry['parts'][str(part)]
+                self.save()
+            return None
+        return record['stats']
+
+    def record_part(self, table_name: str, part: int, stats: Dict, files: List[Path]):
+        """Part đã ghi xong (file đã đổi tên từ file tạm)"""
+        checksums = self._checksums(files)
+        with self._lock:
+            entry = self.state['tables'][table_name]
+            entry['parts'][str(part)] = {
+                'files': checksums,
+                'stats': json.loads(json.dumps(stats, default=str)),
+            }
+            self.save()
+
+    def finish(self):
+        """Cả snapshot đã xong (gọi ngay trước khi ghi _SUCCESS)"""
+        with self._lock:
+            self.state['complete'] = True
+            self.state['completed_at'] = datetime.now().isoformat()
+            self.save()
@@ -0,0 +1,552 @@
+"""
+===============================================================================
+FILE: delta_store.py
+PURPOSE: Lưu snapshot dạng base + delta theo primary key, tái dựng và compaction
+AUTHOR: Data Engineering Team
+VERSION: 1.0
+
+KIẾN TRÚC:
+    data/staging/
+        delta/
+            _manifest.json                   <- chuỗi base/delta của từng chain
+            snapshot_date=2024-01-01/        <- base: toàn bộ table
+                orders.parquet
+                _hashes/orders.parquet       <- (id, hash) của từng row
+                _metadata.json
+            snapshot_date=2024-01-02/        <- delta: chỉ rows thay đổi
+                orders.parquet               <- thêm cột _op = insert/update/delete
+                ...
+
+    _manifest.json:
+    {
+        "chains": [
+            {"base": "2024-01-01", "deltas": ["2024-01-02", "2024-01-03"]},
+            {"base": "2024-01-31", "deltas": []}
+        ]
+    }
+
+💡 GIẢI THÍCH:
+Snapshot full mỗi ngày chép lại cả 8 tables dù phần lớn rows không đổi.
+Ở đây chỉ base lưu toàn bộ, các ngày sau lưu rows insert/update/delete
+so với ngày trước (so sánh hash của từng row theo id):
+- insert: id chưa có ở ngày trước
+- update: id đã có nhưng hash khác
+- delete: id có ở ngày trước nhưng không còn trong source (chỉ có cột id)
+
+Tái dựng ngày D = base của chain + áp dụng lần lượt các delta <= D.
+Chain dài quá DELTA_COMPACT_EVERY delta thì lần chạy sau ghi base mới;
+compact() gộp các delta cũ thành base mà không cần đọc lại source.
+===============================================================================
+"""
+
+import json
+import shutil
+import logging
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.ingestion.cdc import CHANGE_OPS
+from src.ingestion.watermark import write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+
+PRIMARY_KEY = 'id'
+OP_COLUMN = '_op'
+HASH_DIR = '_hashes'
+
+# Số delta tối đa trong một chain trước khi lần chạy sau ghi base mới
+DELTA_COMPACT_EVERY = 30
+
+
+def row_hashes(table) -> np.ndarray:
+    """
+    Hash 64-bit cho từng row của một pyarrow.Table.
+
+    💡 GIẢI THÍCH:
+    Dùng pandas.util.hash_pandas_object trên đúng schema Arrow của table,
+    nên cùng dữ liệu cho cùng hash dù đọc từ source hay từ file Parquet.
+    """
+    return pd.util.hash_pandas_object(table.to_pandas(), index=False).to_numpy(dtype=np.uint64)
+
+
+def parquet_writer_options(parquet_options: Dict = None) -> Dict:
+    """Kwargs codec / dictionary / statistics cho ParquetWriter từ layout Parquet của table"""
+    options = parquet_options or {}
+    return {
+        'compression': options.get('compression', 'snappy'),
+        'compression_level': options.get('compression_level'),
+        'use_dictionary': options.get('use_dictionary', True),
+        'write_statistics': options.get('write_statistics', True),
+    }
+
+
+def open_hash_writer(hash_path: Path):
+    """ParquetWriter cho file _hashes/<table>.parquet (id, hash)"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    hash_path.parent.mkdir(parents=True, exist_ok=True)
+    return pq.ParquetWriter(hash_path, pa.schema([(PRIMARY_KEY, pa.int64()), ('hash', pa.uint64())]))
+
+
+def hash_table(table):
+    """(id, hash) của từng row trong table, để ghi bằng open_hash_writer"""
+    import pyarrow as pa
+
+    ids = table.column(PRIMARY_KEY).to_numpy().astype(np.int64)
+    return pa.table({PRIMARY_KEY: ids, 'hash': row_hashes(table)})
+
+
+class DeltaTableWriter:
+    """
+    💡 GIẢI THÍCH:
+    Ghi một table của một ngày vào delta store theo từng chunk.
+
+    - previous_hashes = None: ghi base (toàn bộ rows)
+    - previous_hashes = Series(hash, index=id) của ngày trước: chỉ ghi rows
+      insert/update, khi close() ghi thêm các id đã bị xóa
+
+    Hash (id, hash) của mọi row luôn được ghi ra _hashes/ để lần chạy sau so sánh,
+    nên không phải tái dựng lại ngày trước.
+
+    Ví dụ sử dụng:
+        with DeltaTableWriter(snapshot_path, 'orders', schema, previous) as writer:
+            for chunk in db.iter_table_chunks('orders'):
+                writer.write(chunk)
+        writer.stats  # {'insert': 10, 'update': 3, 'delete': 1, 'unchanged': 9986}
+    """
+
+    def __init__(
+        self,
+        snapshot_path: Path,
+        table_name: str,
+        schema,
+        previous_hashes: Optional[pd.Series] = None,
+        parquet_options: Dict = None
+    ):
+        """
+        Args:
+            snapshot_path: Thư mục snapshot_date=... của ngày đang ghi
+            table_name: Tên table
+            schema: pyarrow.Schema của table (từ get_table_schema)
+            previous_hashes: Hash của ngày trước (None = ghi base)
+            parquet_options: compression / compression_level / use_dictionary / write_statistics
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.table_name = table_name
+        self.schema = schema
+        self.is_delta = previous_hashes is not None
+        self.file_path = Path(snapshot_path) / f"{table_name}.parquet"
+        self.hash_path = Path(snapshot_path) / HASH_DIR / f"{table_name}.parquet"
+
+        self.rows = 0
+        self.chunks = 0
+        self.stats = dict.fromkeys(CHANGE_OPS + ['unchanged'], 0)
+
+        if self.is_delta:
+            self._previous_index = previous_hashes.index
+            self._previous_values = previous_hashes.to_numpy(dtype=np.uint64)
+            self._seen = np.zeros(len(previous_hashes), dtype=bool)
+            self.output_schema = schema.append(pa.field(OP_COLUMN, pa.string()))
+        else:
+            self.output_schema = schema
+
+        self._writer = pq.ParquetWriter(
+            self.file_path, self.output_schema, **parquet_writer_options(parquet_options)
+        )
+        self._hash_writer = open_hash_writer(self.hash_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is not None:
+            self.abort()
+        else:
+            self.close()
+
+    def write(self, df: pd.DataFrame):
+        """Append một chunk DataFrame"""
+        import pyarrow as pa
+
+        self.write_arrow(pa.Table.from_pandas(df, schema=self.schema, preserve_index=False, safe=False))
+
+    def write_arrow(self, table):
+        """Append một pyarrow.Table / RecordBatch: ghi hash, so sánh với ngày trước"""
+        import pyarrow as pa
+
+        if isinstance(table, pa.RecordBatch):
+            table = pa.Table.from_batches([table])
+        table = table.select(self.schema.names).cast(self.schema)
+
+        hashed = hash_table(table)
+        ids = hashed.column(PRIMARY_KEY).to_numpy()
+        hashes = hashed.column('hash').to_numpy()
+        self._hash_writer.write_table(hashed)
+        self.rows += table.num_rows
+        self.chunks += 1
+
+        if not self.is_delta:
+            self._writer.write_table(table)
+            self.stats['insert'] += table.num_rows
+            return
+
+        positions = self._previous_index.get_indexer(ids)
+        is_new = positions < 0
+        existing = positions[~is_new]
+        self._seen[existing] = True
+
+        changed = is_new.copy()
+        changed[~is_new] = self._previous_values[existing] != hashes[~is_new]
+
+        inserts = int(is_new.sum())
+        updates = int(changed.sum()) - inserts
+        self.stats['insert'] += inserts
+        self.stats['update'] += updates
+        self.stats['unchanged'] += table.num_rows - inserts - updates
+
+        if changed.any():
+            ops = np.where(is_new, 'insert', 'update')[changed]
+            out = table.filter(pa.array(changed)).append_column(OP_COLUMN, pa.array(ops, pa.string()))
+            self._writer.write_table(out)
+
+    def close(self) -> Path:
+        """Ghi các id đã bị xóa (delta) rồi đóng file"""
+        import pyarrow as pa
+
+        if self.is_delta:
+            deleted = self._previous_index.to_numpy()[~self._seen]
+            if len(deleted):
+                columns = [
+                    pa.array(deleted, field.type) if field.name == PRIMARY_KEY else pa.nulls(len(deleted), field.type)
+                    for field in self.schema
+                ]
+                columns.append(pa.array(['delete'] * len(deleted), pa.string()))
+                self._writer.write_table(pa.Table.from_arrays(columns, schema=self.output_schema))
+            self.stats['delete'] = len(deleted)
+
+        self._writer.close()
+        self._hash_writer.close()
+        return self.file_path
+
+    def abort(self):
+        """Lỗi giữa chừng: đóng và xóa file dở dang"""
+        self._writer.close()
+        self._hash_writer.close()
+        self.file_path.unlink(missing_ok=True)
+        self.hash_path.unlink(missing_ok=True)
+
+
+class DeltaSnapshotStore:
+    """
+    💡 GIẢI THÍCH:
+    Quản lý _manifest.json, tái dựng table tại một ngày và compaction.
+
+    Ví dụ sử dụng:
+        store = DeltaSnapshotStore('data/staging/delta')
+        plan = store.plan(date(2024, 1, 15))      # {'kind': 'delta', 'previous': '2024-01-14'}
+        ... ghi từng table bằng DeltaTableWriter ...
+        store.commit(date(2024, 1, 15), plan['kind'])
+
+        df = store.read_table('orders', date(2024, 1, 10))
+        store.compact()                           # gộp chain mới nhất thành base
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        compact_every: int = DELTA_COMPACT_EVERY,
+        parquet_options: Callable[[str], Dict] = None
+    ):
+        """
+        Args:
+            root: Thư mục gốc của delta store (vd: data/staging/delta)
+            compact_every: Số delta tối đa mỗi chain trước khi ghi base mới
+            parquet_options: table -> layout Parquet (như khi ghi delta), dùng khi
+                compact() ghi lại base; None = mặc định của DeltaTableWriter
+        """
+        self.root = Path(root)
+        self.compact_every = compact_every
+        self.parquet_options = parquet_options
+        self.manifest_path = self.root / '_manifest.json'
+        self.manifest = self._load()
+        self._recover_compaction()
+
+    def _load(self) -> Dict:
+        if not self.manifest_path.exists():
+            return {'chains': []}
+        return json.loads(self.manifest_path.read_text(encoding='utf-8'))
+
+    def _recover_compaction(self):
+        """
+        Dọn dở dang của compact() bị dừng giữa chừng (crash, kill).
+
+        💡 GIẢI THÍCH:
+        _manifest.json là commit point của compact():
+        - .compact-<ngày> còn tồn tại: chưa đổi chỗ -> xóa, thư mục delta vẫn nguyên
+        - .old-<ngày> + manifest đã ghi ngày đó là base: compact đã commit -> xóa bản cũ
+        - .old-<ngày> + manifest vẫn ghi là delta: chưa commit -> bỏ bản đã gộp (nếu
+          đã đổi tên vào chỗ) và trả thư mục delta về chỗ cũ
+        """
+        bases = {chain['base'] for chain in self.chains}
+        for tmp_path in self.root.glob('.compact-*'):
+            shutil.rmtree(tmp_path)
+        for old_path in self.root.glob('.old-*'):
+            day = old_path.name[len('.old-'):]
+            if day in bases:
+                shutil.rmtree(old_path)
+                continue
+            source_path = self.snapshot_path(day)
+            if source_path.exists():
+                shutil.rmtree(source_path)
+            old_path.rename(source_path)
+            logger.warning(f"Rolled back interrupted compaction of {day}")
+
+    def _save(self):
+        self.manifest['updated_at'] = datetime.now().isoformat()
+        write_json_atomic(self.manifest_path, self.manifest)
+
+    @property
+    def chains(self) -> List[Dict]:
+        return self.manifest['chains']
+
+    def snapshot_dates(self) -> List[str]:
+        """Mọi ngày đã commit (ISO), tăng dần"""
+        return [d for chain in self.chains for d in [chain['base']] + chain['deltas']]
+
+    def snapshot_path(self, snapshot_date) -> Path:
+        snapshot_date = snapshot_date if isinstance(snapshot_date, str) else snapshot_date.isoformat()
+        return self.root / f"snapshot_date={snapshot_date}"
+
+    def plan(self, snapshot_date: date) -> Dict:
+        """
+        Quyết định ngày snapshot_date ghi base hay delta, so với ngày nào.
+
+        💡 GIẢI THÍCH:
+        - Chưa có gì / chain cuối đã đủ compact_every delta -> base mới
+        - Còn lại -> delta so với ngày gần nhất
+        - Chạy lại đúng ngày gần nhất -> ghi lại cùng loại, so với ngày trước nó
+
+        Returns:
+            Dict {'kind': 'base' | 'delta', 'previous': iso date hoặc None}
+
+        Raises:
+            ValueError: snapshot_date cũ hơn ngày gần nhất đã commit
+        """
+        day = snapshot_date.isoformat()
+        if not self.chains:
+            return {'kind': 'base', 'previous': None}
+
+        chain = self.chains[-1]
+        dates = [chain['base']] + chain['deltas']
+        latest = dates[-1]
+
+        if day < latest:
+            raise ValueError(f"snapshot_date {day} is older than last delta snapshot {latest}")
+        if day == latest:
+            if day == chain['base']:
+                return {'kind': 'base', 'previous': None}
+            return {'kind': 'delta', 'previous': dates[-2]}
+        if len(chain['deltas']) >= self.compact_every:
+            return {'kind': 'base', 'previous': None}
+        return {'kind': 'delta', 'previous': latest}
+
+    def commit(self, snapshot_date: date, kind: str):
+        """Ghi ngày vào manifest sau khi mọi table đã ghi xong (atomic)"""
+        day = snapshot_date.isoformat()
+        chain = self.chains[-1] if self.chains else None
+
+        if kind == 'base':
+            if chain is None or chain['base'] != day:
+                self.chains.append({'base': day, 'deltas': []})
+        elif day not in chain['deltas']:
+            chain['deltas'].append(day)
+
+        self._prune_hashes()
+        self._save()
+        logger.info(f"Committed {kind} snapshot {day} to {self.manifest_path}")
+
+    def _prune_hashes(self):
+        """Chỉ giữ _hashes của 2 ngày gần nhất (đủ để chạy lại ngày cuối)"""
+        for day in self.snapshot_dates()[:-2]:
+            hash_dir = self.snapshot_path(day) / HASH_DIR
+            if hash_dir.is_dir():
+                shutil.rmtree(hash_dir)
+
+    def load_hashes(self, snapshot_date: str, table_name: str) -> pd.Series:
+        """
+        Hash (index=id) của table tại một ngày đã commit.
+
+        File _hashes/ của ngày cũ đã bị prune thì tính lại từ dữ liệu tái dựng.
+        """
+        import pyarrow.parquet as pq
+
+        hash_path = self.snapshot_path(snapshot_date) / HASH_DIR / f"{table_name}.parquet"
+        if hash_path.exists():
+            table = pq.read_table(hash_path)
+            ids = table.column(PRIMARY_KEY).to_numpy()
+            hashes = table.column('hash').to_numpy()
+        else:
+            state = self.read_arrow(table_name, date.fromisoformat(snapshot_date))
+            ids = state.column(PRIMARY_KEY).to_numpy()
+            hashes = row_hashes(state)
+        return pd.Series(hashes, index=pd.Index(ids, name=PRIMARY_KEY), name='hash')
+
+    def _chain_for(self, as_of: date) -> tuple:
+        """Chain chứa ngày gần nhất <= as_of và các ngày cần áp dụng"""
+        day = as_of.isoformat()
+        for chain in reversed(self.chains):
+            if chain['base'] <= day:
+                return chain, [chain['base']] + [d for d in chain['deltas'] if d <= day]
+        raise FileNotFoundError(f"No delta snapshot at or before {day} in {self.root}")
+
+    def read_arrow(self, table_name: str, as_of: date, columns: List[str] = None):
+        """
+        Tái dựng table tại ngày as_of (ngày gần nhất <= as_of đã commit).
+
+        💡 GIẢI THÍCH:
+        Đọc base rồi với mỗi delta: bỏ các id có trong delta (update/delete),
+        nối thêm rows insert/update. Kết quả sắp xếp theo id.
+
+        Args:
+            table_name: Tên table
+            as_of: Ngày cần tái dựng
+            columns: Chỉ đọc các cột này (luôn kèm id)
+
+        Returns:
+            pyarrow.Table
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        chain, days = self._chain_for(as_of)
+        if columns is not None and PRIMARY_KEY not in columns:
+            columns = [PRIMARY_KEY] + list(columns)
+
+        state = pq.read_table(self.snapshot_path(days[0]) / f"{table_name}.parquet", columns=columns)
+        for day in days[1:]:
+            delta_columns = None if columns is None else columns + [OP_COLUMN]
+            delta = pq.read_table(self.snapshot_path(day) / f"{table_name}.parquet", columns=delta_columns)
+            if delta.num_rows == 0:
+                continue
+
+            touched = pc.is_in(state.column(PRIMARY_KEY), value_set=delta.column(PRIMARY_KEY))
+            upserts = delta.filter(pc.not_equal(delta.column(OP_COLUMN), 'delete')).drop_columns([OP_COLUMN])
+            state = pa.concat_tables([state.filter(pc.invert(touched)), upserts.cast(state.schema)])
+
+        return state.sort_by(PRIMARY_KEY)
+
+    def read_table(self, table_name: str, as_of: date) -> pd.DataFrame:
+        """Tái dựng table tại ngày as_of thành DataFrame"""
+        return self.read_arrow(table_name, as_of).to_pandas()
+
+    def count_rows(self, table_name: str, as_of: date) -> Optional[int]:
+        """Số rows của table tại ngày as_of (chỉ đọc cột id), None nếu chưa có"""
+        try:
+            return self.read_arrow(table_name, as_of, columns=[PRIMARY_KEY]).num_rows
+        except FileNotFoundError:
+            return None
+
+    def view(self, as_of: date) -> 'DeltaSnapshotView':
+        """Đối tượng đọc giống StagingLayer (read_table / count_rows) tại một ngày"""
+        return DeltaSnapshotView(self, as_of)
+
+    def compact(self, as_of: date = None, drop_history: bool = False) -> Optional[str]:
+        """
+        Gộp base + các delta tới as_of thành base mới tại ngày as_of.
+
+        💡 GIẢI THÍCH:
+        Bản tái dựng được ghi vào thư mục tạm (.compact-<ngày>, cùng layout Parquet
+        với delta của table) rồi đổi chỗ với thư mục delta của ngày đó, bản cũ
+        giữ lại ở .old-<ngày>. Ghi _manifest.json (atomic) là commit point: dừng
+        trước đó thì lần mở store sau trả thư mục delta về, sau đó thì chỉ còn
+        xóa .old-<ngày> (xem _recover_compaction).
+        Chain được tách tại as_of: các ngày trước vẫn tái dựng được từ chain cũ,
+        các delta sau as_of áp dụng tiếp lên base mới.
+        drop_history=True xóa luôn các chain cũ hơn base mới (manifest được ghi
+        trước khi xóa thư mục, để không bao giờ trỏ tới ngày đã mất).
+
+        Args:
+            as_of: Ngày làm base mới (None = ngày cuối của chain mới nhất)
+            drop_history: Xóa dữ liệu trước base mới
+
+        Returns:
+            Ngày base mới (ISO), None nếu không có gì để gộp
+        """
+        import pyarrow.parquet as pq
+
+        if not self.chains:
+            return None
+
+        day = as_of.isoformat() if as_of else self.snapshot_dates()[-1]
+        chain, days = self._chain_for(date.fromisoformat(day))
+        if days[-1] != day:
+            raise ValueError(f"{day} is not a committed delta snapshot")
+
+        if day != chain['base']:
+            source_path = self.snapshot_path(day)
+            tmp_path = self.root / f".compact-{day}"
+            if tmp_path.exists():
+                shutil.rmtree(tmp_path)
+            shutil.copytree(source_path, tmp_path)
+
+            for file_path in sorted(source_path.glob('*.parquet')):
+                table_name = file_path.stem
+                options = self.parquet_options(table_name) if self.parquet_options else {}
+                state = self.read_arrow(table_name, date.fromisoformat(day))
+                pq.write_table(
+                    state, tmp_path / file_path.name,
+                    row_group_size=options.get('row_group_size'), **parquet_writer_options(options)
+                )
+                logger.info(f"Compacted {table_name} @ {day}: {state.num_rows:,} rows")
+
+            old_path = self.root / f".old-{day}"
+            source_path.rename(old_path)
+            tmp_path.rename(source_path)
+
+            position = chain['deltas'].index(day)
+            new_chain = {'base': day, 'deltas': chain['deltas'][position + 1:]}
+            chain['deltas'] = chain['deltas'][:position]
+            self.chains.insert(self.chains.index(chain) + 1, new_chain)
+            self._save()
+            shutil.rmtree(old_path)
+        else:
+            new_chain = chain
+
+        if drop_history:
+            position = self.chains.index(new_chain)
+            dropped = self.chains[:position]
+            del self.chains[:position]
+            self._save()
+            for old_chain in dropped:
+                for old_day in [old_chain['base']] + old_chain['deltas']:
+                    shutil.rmtree(self.snapshot_path(old_day), ignore_errors=True)
+
+        return day
+
+
+class DeltaSnapshotView:
+    """
+    💡 GIẢI THÍCH:
+    Bọc DeltaSnapshotStore tại một ngày với interface đọc của StagingLayer,
+    để DataValidator và downstream dùng như snapshot thường.
+    """
+
+    def __init__(self, store: DeltaSnapshotStore, as_of: date):
+        self.store = store
+        self.snapshot_date = as_of
+        self.snapshot_path = store.snapshot_path(as_of)
+
+    def read_table(self, table_name: str) -> pd.DataFrame:
+        return self.store.read_table(table_name, self.snapshot_date)
+
+    def count_rows(self, table_name: str) -> Optional[int]:
+        return self.store.count_rows(table_name, self.snapshot_date)
@@ -0,0 +1,228 @@
+"""
+===============================================================================
+FILE: memory_budget.py
+PURPOSE: Giới hạn memory của một lần export (--memory-budget): chunk size
+         theo độ rộng row và backpressure giữa các reader
+AUTHOR: Data Engineering Team
+VERSION: 1.0
+
+KIẾN TRÚC:
+    --memory-budget 512 (MB)
+        │
+        ├── chunk_rows(): rows mỗi chunk = phần budget của 1 reader / bytes mỗi row
+        │       bytes mỗi row = avg(pg_column_size) của source * hệ số của engine,
+        │       sau chunk đầu thì thay bằng bytes đo được trong memory
+        │
+        ├── row_group_rows(): row_group_size tối đa để buffer row group mà các
+        │       writer đang gom vừa phần budget còn lại ngoài chunk
+        │
+        └── reserve(): mỗi reader giữ chỗ cho chunk kế tiếp TRƯỚC khi fetch,
+                trả lại sau khi chunk đã ghi xuống file
+
+    reader 1 ──reserve──► fetch ──► write ──release──┐
+    reader 2 ──reserve──► (chờ: budget đã đầy) ◄─────┘
+    reader 3 ──reserve──► ...
+
+    Budget đầy -> reader chờ thay vì fetch thêm; chunk lớn hơn cả budget vẫn
+    được đọc khi không còn chunk nào khác đang giữ chỗ (chạy tuần tự, chậm
+    nhưng không vượt budget vì các reader khác).
+===============================================================================
+"""
+
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+class MemoryBudget:
+    """
+    💡 GIẢI THÍCH:
+    Bộ đếm bytes đang được giữ bởi các chunk (đã fetch, chưa ghi xong),
+    dùng chung cho mọi thread export của một run.
+
+    - acquire(nbytes) chờ tới khi bytes đang giữ + nbytes <= budget
+      (hoặc không còn ai giữ), release(nbytes) đánh thức các reader đang chờ.
+    - Số liệu của từng table (chunk_rows, bytes mỗi row, số lần phải chờ,
+      peak tracemalloc) được ghi vào _metadata.json. tracemalloc đo cả
+      process, nên với --workers > 1 peak của một table gồm cả các table
+      chạy song song với nó.
+
+    Các thread export dùng chung một Condition, nên mọi cập nhật đều thread-safe.
+    """
+
+    def __init__(self, budget_mb: float, chunk_fraction: float = 0.5, min_chunk_rows: int = 1_000):
+        """
+        Args:
+            budget_mb: Memory tối đa cho dữ liệu đang xử lý (MB)
+            chunk_fraction: Phần budget dành cho chunk đang giữ chỗ
+                            (phần còn lại cho writer, row group đang gom, baseline)
+            min_chunk_rows: Chunk không nhỏ hơn mức này (fetch quá nhỏ = quá nhiều round trip)
+        """
+        if budget_mb <= 0:
+            raise ValueError("memory budget must be > 0 MB")
+        if not 0 < chunk_fraction <= 1:
+            raise ValueError("chunk_fraction must be in (0, 1]")
+
+        self.budget_bytes = int(budget_mb * MB)
+        self.chunk_bytes = int(self.budget_bytes * chunk_fraction)
+        self.min_chunk_rows = min_chunk_rows
+        self.reserved = 0
+        self.peak_reserved = 0
+        self.tables: Dict[str, Dict] = {}
+        self._condition = threading.Condition()
+
+    def chunk_rows(self, table_name: str, row_bytes: float, readers: int, max_rows: int) -> int:
+        """
+        Số rows mỗi chunk để `readers` chunk cùng lúc vẫn nằm trong budget.
+
+        Args:
+            table_name: Tên table (số liệu ghi vào stats của table)
+            row_bytes: Bytes ước tính của một row trong memory
+            readers: Số reader có thể giữ chunk cùng lúc (workers * parts)
+            max_rows: Trần (--chunk-size)
+
+        Returns:
+            Rows mỗi chunk trong khoảng [min_chunk_rows, max_rows]
+        """
+        row_bytes = max(row_bytes, 1.0)
+        rows = int(self.chunk_bytes / (max(readers, 1) * row_bytes))
+        rows = max(min(rows, max_rows), min(self.min_chunk_rows, max_rows))
+
+        stats = self._table(table_name)
+        with self._condition:
+            stats.update({'chunk_rows': rows, 'row_bytes': round(row_bytes, 1), 'readers': readers})
+        return rows
+
+    def row_group_rows(self, table_name: str, row_bytes: float, writers: int, row_group_size: int) -> int:
+        """
+        Số rows tối đa của một row group để `writers` buffer đang gom vẫn nằm
+        trong phần budget ngoài chunk.
+
+        💡 GIẢI THÍCH:
+        Writer giữ rows tới khi đủ row_group_size mới ghi, sau khi chỗ giữ của
+        chunk đã được trả lại; buffer này không đi qua reserve() nên được giới
+        hạn trước bằng kích thước row group.
+
+        Args:
+            table_name: Tên table (số liệu ghi vào stats của table)
+            row_bytes: Bytes ước tính của một row trong memory
+            writers: Số writer có thể gom row group cùng lúc
+            row_group_size: row_group_size theo config (trần)
+
+        Returns:
+            Rows mỗi row group trong khoảng [min_chunk_rows, row_group_size]
+        """
+        row_bytes = max(row_bytes, 1.0)
+        rows = int((self.budget_bytes - self.chunk_bytes) / (max(writers, 1) * row_bytes))
+        rows = max(min(rows, row_group_size), min(self.min_chunk_rows, row_group_size))
+
+        stats = self._table(table_name)
+        with self._condition:
+            stats['row_group_rows'] = rows
+        return rows
+
+    def acquire(self, table_name: str, nbytes: int, blocking: bool = True) -> bool:
+        """
+        Giữ chỗ nbytes, chờ nếu budget đã đầy (trừ khi không còn ai đang giữ).
+
+        Args:
+            blocking: False = không chờ, trả False nếu chưa giữ được chỗ
+                      (event loop tự chờ bằng asyncio thay vì chặn thread)
+
+        Returns:
+            True nếu đã giữ chỗ
+        """
+        start = None
+        with self._condition:
+            while self.reserved > 0 and self.reserved + nbytes > self.budget_bytes:
+                if not blocking:
+                    return False
+                if start is None:
+                    start = time.monotonic()
+                self._condition.wait()
+            self.reserved += nbytes
+            self.peak_reserved = max(self.peak_reserved, self.reserved)
+        if start is not None:
+            self.record_wait(table_name, time.monotonic() - start)
+        return True
+
+    def record_wait(self, table_name: str, seconds: float):
+        """Một lần reader phải chờ budget (số lần + tổng thời gian chờ)"""
+        stats = self._table(table_name)
+        with self._condition:
+            stats['waits'] += 1
+            stats['wait_seconds'] += seconds
+
+    def release(self, nbytes: int):
+        """Trả lại chỗ của một chunk đã ghi xong (hoặc bị bỏ vì lỗi)"""
+        with self._condition:
+            self.reserved -= nbytes
+            self._condition.notify_all()
+
+    @contextmanager
+    def reserve(self, table_name: str, nbytes: int):
+        """acquire / release quanh một chunk"""
+        self.acquire(table_name, nbytes)
+        try:
+            yield
+        finally:
+            self.release(nbytes)
+
+    def observe(self, table_name: str, rows: int, nbytes: int) -> float:
+        """
+        Ghi nhận bytes thực tế của một chunk vừa đọc.
+
+        Returns:
+            Bytes mỗi row đo được (dùng cho lần giữ chỗ kế tiếp)
+        """
+        stats = self._table(table_name)
+        traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        with self._condition:
+            stats['peak_chunk_bytes'] = max(stats['peak_chunk_bytes'], nbytes)
+            stats['peak_traced_bytes'] = max(stats['peak_traced_bytes'], traced)
+        return nbytes / rows if rows else 0.0
+
+    def table_stats(self, table_name: str) -> Dict:
+        """Số liệu memory của table cho _metadata.json"""
+        stats = self._table(table_name)
+        with self._condition:
+            result = {
+                'chunk_rows': stats.get('chunk_rows'),
+                'row_bytes': stats.get('row_bytes'),
+                'readers': stats.get('readers'),
+                'row_group_rows': stats.get('row_group_rows'),
+                'peak_chunk_mb': round(stats['peak_chunk_bytes'] / MB, 1),
+                'waits': stats['waits'],
+                'wait_seconds': round(stats['wait_seconds'], 2),
+            }
+            if tracemalloc.is_tracing():
+                result['peak_traced_mb'] = round(stats['peak_traced_bytes'] / MB, 1)
+        return result
+
+    def summary(self) -> Dict:
+        """Số liệu của cả run cho _metadata.json"""
+        with self._condition:
+            result = {
+                'budget_mb': round(self.budget_bytes / MB, 1),
+                'peak_reserved_mb': round(self.peak_reserved / MB, 1),
+                'waits': sum(stats['waits'] for stats in self.tables.values()),
+            }
+        if tracemalloc.is_tracing():
+            result['peak_traced_mb'] = round(tracemalloc.get_traced_memory()[1] / MB, 1)
+        return result
+
+    def _table(self, table_name: str) -> Dict:
+        with self._condition:
+            return self.tables.setdefault(table_name, {
+                'peak_chunk_bytes': 0,
+                'peak_traced_bytes': 0,
+                'waits': 0,
+                'wait_seconds': 0.0,
+            })
@@ -0,0 +1,250 @@
+"""
+===============================================================================
+FILE: object_store.py
+PURPOSE: Ghi / đọc staging trên S3 hoặc MinIO (multipart upload song song)
+AUTHOR: Data Engineering Team
+VERSION: 1.0
+
+KIẾN TRÚC:
+    Chunk từ export ──► S3MultipartUpload ──► upload_part (thread pool) ──► s3://staging/
+                         (buffer 1 part)        tối đa max_concurrency part
+                                                 đang upload cùng lúc
+
+    s3://staging/
+        snapshot_date=2024-01-15/
+            customers.parquet
+            orders/order_date_month=2024-11/part-00000.parquet
+            _metadata.json
+            _SUCCESS             <- ghi cuối cùng
+
+    Object chỉ xuất hiện khi complete_multipart_upload thành công
+    (tương đương os.replace của file tạm trên local disk).
+===============================================================================
+"""
+
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+# S3 yêu cầu mọi part (trừ part cuối) >= 5 MiB
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+def create_s3_client(endpoint: str, access_key: str, secret_key: str, secure: bool = False):
+    """
+    Tạo boto3 S3 client cho MinIO / S3.
+
+    Args:
+        endpoint: host:port (MinIO, vd localhost:9000) hoặc URL đầy đủ;
+                  None = endpoint mặc định của AWS
+        access_key / secret_key: Credentials
+        secure: True = https khi endpoint không có scheme
+    """
+    import boto3
+    from botocore.config import Config
+
+    if endpoint and '://' not in endpoint:
+        endpoint = f"{'https' if secure else 'http'}://{endpoint}"
+
+    return boto3.client(
+        's3',
+        endpoint_url=endpoint or None,
+        aws_access_key_id=access_key,
+        aws_secret_access_key=secret_key,
+        # MinIO dùng path-style (http://host:9000/bucket/key)
+        config=Config(s3={'addressing_style': 'path'}, retries={'max_attempts': 5, 'mode': 'standard'}),
+    )
+
+
+class S3MultipartUpload(io.RawIOBase):
+    """
+    💡 GIẢI THÍCH:
+    File-like object (write / tell) ghi thẳng vào một object S3 bằng multipart upload.
+
+    - Dữ liệu được gom vào buffer, đủ part_size thì đẩy sang thread pool
+      upload_part; thread chính tiếp tục đọc source trong lúc part đang upload.
+    - Semaphore chặn số part đang chờ/đang upload ở max_concurrency, nên memory
+      tối đa ~ part_size * (max_concurrency + 1), không có file tạm trên disk.
+    - Object nhỏ hơn 1 part: chỉ một put_object, không mở multipart.
+    - close() = complete_multipart_upload (object xuất hiện nguyên vẹn),
+      abort() = abort_multipart_upload (không để lại gì, kể cả part đã upload).
+
+    pyarrow.parquet.ParquetWriter và COPY TO STDOUT ghi trực tiếp vào object này.
+    """
+
+    def __init__(self, client, bucket: str, key: str, part_size: int = 8 * 1024 * 1024,
+                 max_concurrency: int = 4):
+        """
+        Args:
+            client: boto3 S3 client (thread-safe, dùng chung được)
+            bucket: Bucket đích
+            key: Object key
+            part_size: Kích thước mỗi part (>= 5 MiB)
+            max_concurrency: Số part upload song song tối đa
+        """
+        super().__init__()
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size must be >= {MIN_PART_SIZE} bytes (S3 minimum)")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be >= 1")
+
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.max_concurrency = max_concurrency
+        self.size = 0
+        self.parts = 0
+        self.upload_id = None
+        self._buffer = bytearray()
+        self._futures = []
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.size
+
+    def write(self, data) -> int:
+        if self.closed:
+            raise ValueError(f"Upload already closed: {self.key}")
+        self._buffer += data
+        self.size += len(data)
+        while len(self._buffer) >= self.part_size:
+            self._submit(bytes(self._buffer[:self.part_size]))
+            del self._buffer[:self.part_size]
+        return len(data)
+
+    def _submit(self, body: bytes):
+        """Đẩy một part sang thread pool (chờ nếu đã đủ max_concurrency part)"""
+        if self.upload_id is None:
+            response = self.client.create_multipart_upload(Bucket=self.bucket, Key=self.key)
+            self.upload_id = response['UploadId']
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency, thread_name_prefix='s3-part'
+            )
+
+        # Part trước đã lỗi: dừng sớm thay vì tiếp tục đọc source
+        for future in self._futures:
+            if future.done() and future.exception() is not None:
+                raise future.exception()
+
+        self._slots.acquire()
+        self.parts += 1
+        future = self._executor.submit(self._upload_part, self.parts, body)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def _upload_part(self, part_number: int, body: bytes) -> dict:
+        response = self.client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            PartNumber=part_number, Body=body,
+        )
+        return {'PartNumber': part_number, 'ETag': response['ETag']}
+
+    def close(self):
+        """Upload phần còn lại rồi complete (object xuất hiện trên S3 từ lúc này)"""
+        if self.closed:
+            return
+        try:
+            if self.upload_id is None:
+                self.client.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self._buffer))
+            else:
+                if self._buffer:
+                    self._submit(bytes(self._buffer))
+                parts: List[dict] = [future.result() for future in self._futures]
+                self.client.complete_multipart_upload(
+                    Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+                    MultipartUpload={'Parts': parts},
+                )
+        except BaseException:
+            self.abort()
+            raise
+        self._buffer = bytearray()
+        self._shutdown()
+        super().close()
+
+    def abort(self):
+        """Hủy upload: xóa các part đã upload, object không được tạo"""
+        if self.closed:
+            return
+        for future in self._futures:
+            future.cancel()
+        self._shutdown()
+        if self.upload_id is not None:
+            try:
+                self.client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+            except Exception as e:
+                logger.warning(f"Failed to abort multipart upload {self.key}: {e}")
+        self._buffer = bytearray()
+        super().close()
+
+    def __del__(self):
+        # IOBase.__del__ sẽ gọi close() = publish object dở dang; hủy thay vì vậy
+        # (__init__ có thể đã raise trước khi tạo _futures)
+        if not self.closed and hasattr(self, '_futures'):
+            self.abort()
+
+    def _shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+class S3RangeReader(io.RawIOBase):
+    """
+    💡 GIẢI THÍCH:
+    File-like object chỉ đọc (seek / read) trên một object S3 bằng ranged GET.
+    pyarrow.parquet đọc footer (vài KB cuối file) qua object này, nên đếm
+    rows / đọc schema không phải tải cả file về.
+    """
+
+    def __init__(self, client, bucket: str, key: str, size: Optional[int] = None):
+        super().__init__()
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        if size is None:
+            size = client.head_object(Bucket=bucket, Key=key)['ContentLength']
+        self.size = size
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        else:
+            self._position = self.size + offset
+        return self._position
+
+    def read(self, size: int = -1) -> bytes:
+        end = self.size if size is None or size < 0 else min(self.size, self._position + size)
+        if self._position >= end:
+            return b''
+        response = self.client.get_object(
+            Bucket=self.bucket, Key=self.key, Range=f"bytes={self._position}-{end - 1}"
+        )
+        data = response['Body'].read()
+        self._position += len(data)
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
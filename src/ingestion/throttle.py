@@ -0,0 +1,254 @@
+"""
+===============================================================================
+FILE: throttle.py
+PURPOSE: Tự giảm tốc export khi OLTP nguồn đang tải cao (--throttle)
+AUTHOR: Data Engineering Team
+VERSION: 1.0
+
+KIẾN TRÚC:
+    Mỗi THROTTLE_SAMPLE_SECONDS (do reader nào tới lượt fetch thì lấy mẫu):
+
+        pg_stat_activity ──► active backends (trừ connection của export),
+                             backends đang chờ lock, latency của chính query đó
+                │
+                ▼
+        load = high | normal | idle
+                │
+                ▼
+        scale (AIMD):  high -> scale / 2      (giảm nhanh, tối thiểu MIN_SCALE)
+                       idle -> scale + 0.25   (tăng dần về 1.0)
+                       normal -> giữ nguyên
+                │
+                ├── fetch size  = chunk rows * scale
+                ├── readers     = max_readers * scale  (số FETCH / COPY cùng lúc)
+                └── pause       = PAUSE_SECONDS * (1 - scale) trước mỗi fetch
+
+    Với named cursor, PostgreSQL chỉ thực sự đọc rows khi client FETCH,
+    nên giới hạn FETCH cùng lúc + nghỉ giữa các FETCH là giảm tải trực tiếp
+    cho source. Mỗi lần scale đổi được ghi lại (decisions) vào _metadata.json.
+===============================================================================
+"""
+
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+class SourceThrottle:
+    """
+    💡 GIẢI THÍCH:
+    Bộ điều khiển tốc độ đọc source, dùng chung cho mọi reader của một run.
+
+    - probe(): hàm lấy mẫu tải của source, trả {'active', 'lock_waits', 'latency_ms'}
+      (SourceDatabase.sample_load)
+    - slot(): bọc một lần FETCH (hoặc cả một COPY): lấy mẫu nếu tới hạn,
+      nghỉ theo pause hiện tại, rồi chờ tới khi số reader đang đọc < readers cho phép
+    - fetch_rows(rows): rows của lần FETCH kế tiếp theo scale hiện tại
+
+    Lấy mẫu lỗi (vd: không có quyền đọc pg_stat_activity) không làm export
+    fail: lần lấy mẫu đó được bỏ qua, scale giữ nguyên.
+    """
+
+    def __init__(
+        self,
+        probe: Callable[[], Dict],
+        max_readers: int,
+        sample_seconds: float = 5.0,
+        max_active: int = 20,
+        idle_active: int = 5,
+        max_latency_ms: float = 50.0,
+        idle_latency_ms: float = 10.0,
+        max_lock_waits: int = 5,
+        min_scale: float = 0.125,
+        pause_seconds: float = 1.0,
+        max_decisions: int = 200,
+    ):
+        """
+        Args:
+            probe: Hàm lấy mẫu tải của source
+            max_readers: Số reader tối đa khi source rảnh (workers / parts)
+            sample_seconds: Khoảng cách tối thiểu giữa hai lần lấy mẫu
+            max_active / max_latency_ms: Vượt một trong hai -> load high
+            idle_active / idle_latency_ms: Dưới cả hai -> load idle
+            max_lock_waits: Số backend đang chờ lock vượt mức này -> load high
+            min_scale: Scale nhỏ nhất (fetch size / readers không về 0)
+            pause_seconds: Pause trước mỗi fetch = pause_seconds * (1 - scale)
+            max_decisions: Số quyết định tối đa giữ lại cho _metadata.json
+        """
+        if max_readers < 1:
+            raise ValueError("max_readers must be >= 1")
+        if not 0 < min_scale <= 1:
+            raise ValueError("min_scale must be in (0, 1]")
+
+        self.probe = probe
+        self.max_readers = max_readers
+        self.sample_seconds = sample_seconds
+        self.max_active = max_active
+        self.idle_active = idle_active
+        self.max_latency_ms = max_latency_ms
+        self.idle_latency_ms = idle_latency_ms
+        self.max_lock_waits = max_lock_waits
+        self.min_scale = min_scale
+        self.pause_max = pause_seconds
+        self.max_decisions = max_decisions
+
+        self.scale = 1.0
+        self.readers = 0
+        self.samples = 0
+        self.failed_samples = 0
+        self.paused_seconds = 0.0
+        self.decisions: List[Dict] = []
+        self.dropped_decisions = 0
+        self._last_sample = None
+        self._sampling = False
+        self._condition = threading.Condition()
+
+    # ------------------------------------------------------------------
+    # Giá trị điều khiển theo scale hiện tại
+    # ------------------------------------------------------------------
+
+    def fetch_rows(self, rows: int) -> int:
+        """Rows của lần FETCH kế tiếp (không nhỏ hơn 1)"""
+        return max(1, int(rows * self.scale))
+
+    def allowed_readers(self) -> int:
+        """Số reader được đọc source cùng lúc"""
+        return max(1, math.floor(self.max_readers * self.scale))
+
+    def pause(self) -> float:
+        """Số giây nghỉ trước mỗi FETCH"""
+        return round(self.pause_max * (1 - self.scale), 3)
+
+    # ------------------------------------------------------------------
+    # Lấy mẫu và quyết định
+    # ------------------------------------------------------------------
+
+    def sample_due(self) -> bool:
+        """Đã tới lúc lấy mẫu mới (và chưa có reader nào đang lấy)"""
+        with self._condition:
+            return not self._sampling and (
+                self._last_sample is None or time.monotonic() - self._last_sample >= self.sample_seconds
+            )
+
+    def maybe_sample(self):
+        """Lấy mẫu nếu tới hạn; chỉ một reader lấy mẫu tại một thời điểm"""
+        with self._condition:
+            if not self.sample_due():
+                return
+            self._sampling = True
+
+        try:
+            load = self.probe()
+        except Exception as e:
+            logger.warning(f"Throttle: failed to sample source load: {e}")
+            load = None
+
+        with self._condition:
+            self._sampling = False
+            self._last_sample = time.monotonic()
+            if load is None:
+                self.failed_samples += 1
+                return
+            self.samples += 1
+            self._decide(load)
+            self._condition.notify_all()
+
+    def _decide(self, load: Dict):
+        """AIMD: giảm một nửa khi source tải cao, tăng dần khi source rảnh"""
+        if (load['active'] > self.max_active or load['latency_ms'] > self.max_latency_ms
+                or load.get('lock_waits', 0) > self.max_lock_waits):
+            level = 'high'
+            scale = max(self.min_scale, self.scale / 2)
+        elif load['active'] <= self.idle_active and load['latency_ms'] <= self.idle_latency_ms:
+            level = 'idle'
+            scale = min(1.0, self.scale + 0.25)
+        else:
+            level = 'normal'
+            scale = self.scale
+
+        if scale == self.scale:
+            return
+        self.scale = scale
+        decision = {
+            'at': datetime.now().isoformat(timespec='seconds'),
+            'load': level,
+            **load,
+            'scale': scale,
+            'readers': self.allowed_readers(),
+            'pause_seconds': self.pause(),
+        }
+        logger.info(
+            f"Throttle: source {level} (active={load['active']}, latency={load['latency_ms']:.1f} ms) "
+            f"-> scale={scale:g}, readers={decision['readers']}, pause={decision['pause_seconds']}s"
+        )
+        if len(self.decisions) < self.max_decisions:
+            self.decisions.append(decision)
+        else:
+            self.dropped_decisions += 1
+
+    # ------------------------------------------------------------------
+    # Slot đọc
+    # ------------------------------------------------------------------
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """
+        Giữ một slot đọc, chờ khi đã đủ số reader cho phép.
+
+        Args:
+            blocking: False = không chờ, trả False nếu chưa có slot (engine async)
+        """
+        with self._condition:
+            # release() hoặc scale tăng lại (maybe_sample) đánh thức reader đang chờ
+            while self.readers >= self.allowed_readers():
+                if not blocking:
+                    return False
+                self._condition.wait()
+            self.readers += 1
+            return True
+
+    def release(self):
+        """Trả slot đọc"""
+        with self._condition:
+            self.readers -= 1
+            self._condition.notify_all()
+
+    def wait_pause(self):
+        """Nghỉ theo scale hiện tại trước một lần FETCH"""
+        pause = self.pause()
+        if pause > 0:
+            time.sleep(pause)
+            self.record_pause(pause)
+
+    def record_pause(self, seconds: float):
+        with self._condition:
+            self.paused_seconds += seconds
+
+    @contextmanager
+    def slot(self):
+        """Bọc một lần FETCH / COPY: lấy mẫu nếu tới hạn, pause, giữ slot"""
+        self.maybe_sample()
+        self.wait_pause()
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def summary(self) -> Dict:
+        """Số liệu của throttle cho _metadata.json"""
+        with self._condition:
+            return {
+                'max_readers': self.max_readers,
+                'final_scale': self.scale,
+                'samples': self.samples,
+                'failed_samples': self.failed_samples,
+                'paused_seconds': round(self.paused_seconds, 2),
+                'decisions': list(self.decisions),
+                'dropped_decisions': self.dropped_decisions,
+            }
@@ -0,0 +1,205 @@
+"""
+===============================================================================
+FILE: watermark.py
+PURPOSE: Lưu high-water mark cho incremental ingestion
+AUTHOR: Data Engineering Team
+VERSION: 1.0
+
+KIẾN TRÚC:
+    data/staging/
+        _state/
+            watermarks.json      <- file này
+        incremental/
+            snapshot_date=2024-01-15/
+                orders.parquet   <- chỉ các rows thay đổi (delta)
+                ...
+
+    watermarks.json:
+    {
+        "orders": {
+            "watermark": {"updated_at": "2024-01-15T23:59:58.123456", "id": 98765},
+            "previous_watermark": {"updated_at": "...", "id": ...},
+            "snapshot_date": "2024-01-15",
+            "rows": 1234
+        },
+        "order_items:created_at": {      <- watermark riêng của child table
+            "watermark": {"created_at": "2024-01-15T23:59:50", "id": 43210},
+            ...
+        },
+        ...
+    }
+===============================================================================
+"""
+
+import os
+import json
+import logging
+import tempfile
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def write_json_atomic(file_path: Path, data: Dict):
+    """
+    Ghi JSON an toàn: ghi ra file tạm cùng thư mục rồi os.replace().
+
+    💡 GIẢI THÍCH:
+    os.replace() là atomic trên cùng filesystem, nên người đọc chỉ thấy
+    file cũ hoặc file mới hoàn chỉnh, không bao giờ thấy file ghi dở
+    (vd: process bị kill giữa chừng).
+    """
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=file_path.parent, prefix=f".{file_path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except Exception:
+        Path(tmp_path).unlink(missing_ok=True)
+        raise
+
+
+class WatermarkStore:
+    """
+    💡 GIẢI THÍCH:
+    Quản lý high-water mark (updated_at, id) của từng table.
+
+    - updated_at: cột thời gian được trigger trg_*_updated_at cập nhật
+    - id: tie-breaker khi nhiều rows có cùng updated_at
+
+    Mỗi table lưu cả watermark trước đó (previous_watermark). Nếu chạy lại
+    cùng snapshot_date, lower bound là previous_watermark nên delta partition
+    của ngày đó được tạo lại đầy đủ thay vì bị ghi đè bằng dữ liệu rỗng.
+    """
+
+    def __init__(self, state_path: Path):
+        """
+        Args:
+            state_path: Đường dẫn file watermarks.json
+        """
+        self.state_path = Path(state_path)
+        self.state = self._load()
+
+    def _load(self) -> Dict:
+        if not self.state_path.exists():
+            return {}
+        with open(self.state_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def get_lower_bound(self, table_name: str, snapshot_date: date) -> Optional[Dict]:
+        """
+        Watermark dùng làm lower bound cho lần chạy snapshot_date.
+
+        Returns:
+            Dict {'updated_at': iso, 'id': int} hoặc None (chưa từng chạy = full)
+
+        Raises:
+            ValueError: Nếu snapshot_date cũ hơn lần chạy gần nhất
+        """
+        entry = self.state.get(table_name)
+        if entry is None:
+            return None
+
+        last_date = date.fromisoformat(entry['snapshot_date'])
+        if snapshot_date < last_date:
+            raise ValueError(
+                f"{table_name}: snapshot_date {snapshot_date} is older than "
+                f"last incremental run {last_date}"
+            )
+        if snapshot_date == last_date:
+            return entry.get('previous_watermark')
+        return entry.get('watermark')
+
+    def update(self, table_name: str, snapshot_date: date,
+               lower: Optional[Dict], upper: Optional[Dict], rows: int):
+        """Ghi nhận watermark mới (chưa persist, gọi save() sau khi run thành công)"""
+        self.state[table_name] = {
+            'watermark': upper or lower,
+            'previous_watermark': lower,
+            'snapshot_date': snapshot_date.isoformat(),
+            'rows': rows,
+            'updated_at': datetime.now().isoformat(),
+        }
+
+    def save(self):
+        """Persist state (atomic)"""
+        write_json_atomic(self.state_path, self.state)
+        logger.info(f"Saved watermarks: {self.state_path}")
+
+
+def _timestamp_literal(value: str) -> str:
+    """Chuyển ISO string trong state file thành literal SQL an toàn"""
+    return f"TIMESTAMP '{datetime.fromisoformat(value).isoformat(sep=' ')}'"
+
+
+def watermark_key(watermark: Optional[Dict], column: str = 'updated_at') -> tuple:
+    """Khóa so sánh (updated_at, id) của watermark; None nhỏ hơn mọi watermark"""
+    if watermark is None:
+        return (0,)
+    return (1, datetime.fromisoformat(watermark[column]), int(watermark['id']))
+
+
+def build_high_water_mark_query(table_name: str, column: str = 'updated_at',
+                                schema: str = 'ecommerce', lag_seconds: float = 0) -> str:
+    """
+    SQL lấy (updated_at, id) lớn nhất của table làm upper bound.
+
+    💡 GIẢI THÍCH:
+    Trigger ghi updated_at = NOW(), tức lúc transaction BẮT ĐẦU. Transaction
+    bắt đầu trước upper nhưng commit sau khi lần chạy này đọc sẽ không có
+    trong lần này, còn lần sau lower bound (= upper này) đã vượt qua nó ->
+    row bị bỏ sót vĩnh viễn. Bỏ qua rows có updated_at trong lag_seconds gần
+    nhất theo đồng hồ của source (LOCALTIMESTAMP, cùng múi giờ với NOW() ghi
+    vào cột TIMESTAMP): mọi transaction ngắn hơn lag đã commit trước khi
+    rows của nó nằm dưới upper.
+
+    Args:
+        lag_seconds: Độ lùi an toàn (0 = không lùi)
+    """
+    cutoff = ''
+    if lag_seconds > 0:
+        cutoff = f" AND {column} <= LOCALTIMESTAMP - INTERVAL '{float(lag_seconds)} seconds'"
+    return (
+        f"SELECT {column}, id FROM {schema}.{table_name} "
+        f"WHERE {column} IS NOT NULL{cutoff} "
+        f"ORDER BY {column} DESC, id DESC LIMIT 1"
+    )
+
+
+def build_watermark_filter(lower: Optional[Dict], upper: Optional[Dict],
+                           column: str = 'updated_at') -> Optional[str]:
+    """
+    Tạo điều kiện WHERE lấy rows có (column, id) trong (lower, upper].
+
+    💡 GIẢI THÍCH:
+    So sánh row-value (updated_at, id) > (ts, id) dùng được index btree
+    (updated_at, id), nên chỉ quét phần rows thay đổi thay vì cả table.
+    Upper bound được chốt trước khi đọc để các table/worker dùng cùng mốc
+    và rows thay đổi trong lúc export sẽ vào lần chạy sau (upper đã lùi một
+    khoảng lag, xem build_high_water_mark_query).
+
+    Returns:
+        Điều kiện SQL, hoặc None nếu cần đọc toàn bộ
+    """
+    if upper is None:
+        # Không có row nào có updated_at: lần đầu đọc hết, các lần sau không có gì mới
+        return None if lower is None else 'FALSE'
+
+    upper_condition = (
+        f"({column}, id) <= ({_timestamp_literal(upper[column])}, {int(upper['id'])})"
+    )
+    if lower is None:
+        # Lần đầu: lấy hết tới upper, kể cả rows chưa có updated_at
+        return f"({upper_condition} OR {column} IS NULL)"
+
+    lower_condition = (
+        f"({column}, id) > ({_timestamp_literal(lower[column])}, {int(lower['id'])})"
+    )
+    return f"{lower_condition} AND {upper_condition}"
@@ -0,0 +1,601 @@
+"""
+===============================================================================
+FILE: test_export_pipeline.py
+PURPOSE: Integration tests cho IngestPipeline với các chế độ export mới
+AUTHOR: QC/QA Team
+VERSION: 1.0
+
+HƯỚNG DẪN SỬ DỤNG:
+    # Cần PostgreSQL nguồn đang chạy và đã có dữ liệu (generate_data.py)
+    pytest tests/integration/test_export_pipeline.py -v
+
+CÁC LOẠI TEST:
+    1. Engine Tests - pandas / streaming / COPY / arrow / async cho cùng kết quả
+    2. Parallel Tests - workers, partitions, consistent snapshot
+    3. Incremental Tests - watermark updated_at, parent-driven child tables
+    4. CDC Tests - logical replication slot (cần wal_level=logical + publication)
+===============================================================================
+"""
+
+import json
+import threading
+from datetime import date, timedelta
+
+import pytest
+import psycopg2
+from sqlalchemy import text
+
+from src.ingestion.async_engine import AsyncIngestPipeline
+from src.ingestion.backfill import BackfillPipeline
+from src.ingestion.cdc import LogicalReplicationReader
+from src.ingestion.export_to_staging import IngestConfig, IngestPipeline, SourceDatabase, StagingLayer
+
+
+SNAPSHOT_DATE = date(2024, 12, 31)
+
+# Tables nhỏ + 1 fact table để test chạy nhanh
+TEST_TABLES = ['categories', 'products', 'orders']
+
+
+# ============================================================================
+# FIXTURES
+# ============================================================================
+
+@pytest.fixture(scope="module")
+def source_db():
+    """SourceDatabase đã connect, dùng chung cho cả module"""
+    db = SourceDatabase()
+    db.connect()
+    yield db
+    db.close()
+
+
+@pytest.fixture(scope="module")
+def source_counts(source_db):
+    """Row count của các table test trong source"""
+    return {table: source_db.get_row_count(table) for table in TEST_TABLES}
+
+
+def run_pipeline(staging_path, **kwargs) -> dict:
+    """Chạy pipeline vào thư mục tạm và trả về kết quả"""
+    pipeline = IngestPipeline(
+        tables=TEST_TABLES,
+        snapshot_date=SNAPSHOT_DATE,
+        staging_path=str(staging_path),
+        **kwargs
+    )
+    result = pipeline.run()
+    assert result['success'], result.get('error')
+    return result
+
+
+def staging_for(staging_path) -> StagingLayer:
+    return StagingLayer(str(staging_path), SNAPSHOT_DATE)
+
+
+# ============================================================================
+# TEST CLASS 1: ENGINES
+# ============================================================================
+
+class TestExportEngines:
+    """
+    💡 GIẢI THÍCH:
+    Mọi engine phải export đủ số rows như source.
+    """
+
+    @pytest.mark.parametrize("kwargs", [
+        {'output_format': 'csv'},
+        {'output_format': 'parquet', 'stream': True, 'chunk_size': 7_000},
+        {'output_format': 'csv', 'engine': 'copy'},
+        {'output_format': 'parquet', 'engine': 'copy', 'chunk_size': 7_000},
+        {'output_format': 'parquet', 'engine': 'arrow', 'chunk_size': 7_000},
+        {'output_format': 'csv', 'engine': 'arrow'},
+    ])
+    def test_row_counts_match_source(self, tmp_path, source_counts, kwargs):
+        """IT-001: Row count staging = source cho mọi engine"""
+        run_pipeline(tmp_path, **kwargs)
+        staging = staging_for(tmp_path)
+
+        for table, expected in source_counts.items():
+            assert staging.count_rows(table) == expected, f"Mismatch for {table} with {kwargs}"
+
+    def test_metadata_has_throughput(self, tmp_path):
+        """IT-002: _metadata.json có rows/sec và peak memory mỗi table"""
+        run_pipeline(tmp_path, output_format='parquet', stream=True)
+        metadata = json.loads((staging_for(tmp_path).snapshot_path / "_metadata.json").read_text())
+
+        for table in metadata['tables']:
+            assert table['rows_per_second'] is not None
+            assert table['peak_rss_mb'] > 0
+
+    def test_copy_parquet_equals_pandas(self, tmp_path):
+        """IT-003: COPY + Arrow cho cùng dữ liệu với pandas streaming"""
+        run_pipeline(tmp_path / "pandas", output_format='parquet', stream=True)
+        run_pipeline(tmp_path / "copy", output_format='parquet', engine='copy')
+
+        expected = staging_for(tmp_path / "pandas").read_table('orders')
+        actual = staging_for(tmp_path / "copy").read_table('orders')
+        assert expected.equals(actual)
+
+    def test_arrow_engine_keeps_exact_types(self, tmp_path):
+        """IT-004: Engine arrow ghi DECIMAL/DATE đúng kiểu, không qua float"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        run_pipeline(tmp_path, output_format='parquet', engine='arrow')
+        schema = pq.read_schema(staging_for(tmp_path).get_table_path('orders', 'parquet'))
+
+        assert schema.field('total_amount').type == pa.decimal128(15, 2)
+        assert schema.field('order_date').type == pa.date32()
+        assert schema.field('order_timestamp').type == pa.timestamp('us')
+
+    def test_metadata_records_parquet_layout(self, tmp_path):
+        """IT-005: _metadata.json ghi codec, row groups, tỉ lệ nén của từng table"""
+        run_pipeline(tmp_path, output_format='parquet', engine='arrow',
+                     parquet_compression='zstd', row_group_size=5_000)
+        metadata = json.loads((staging_for(tmp_path).snapshot_path / "_metadata.json").read_text())
+
+        for table in metadata['tables']:
+            layout = table['parquet']
+            assert layout['compression'] == 'zstd'
+            assert layout['row_group_size'] == 5_000
+            assert layout['row_groups'] == max(1, -(-table['rows'] // 5_000))
+            assert layout['compression_ratio'] > 0
+
+    def test_delta_storage_reconstructs_snapshot(self, tmp_path, source_db):
+        """IT-006: Ngày 2 chỉ ghi rows đã UPDATE, tái dựng lại đủ rows như source"""
+        def run_delta(snapshot_date):
+            pipeline = IngestPipeline(snapshot_date=snapshot_date, staging_path=str(tmp_path),
+                                      output_format='parquet', storage='delta')
+            result = pipeline.run()
+            assert result['success'], result.get('error')
+            return pipeline, {t['table']: t for t in result['tables']}
+
+        _, first = run_delta(SNAPSHOT_DATE)
+        assert first['orders']['delta']['kind'] == 'base'
+
+        execute_on_source(source_db, "UPDATE ecommerce.orders SET customer_note = 'it_006' WHERE id = 1")
+        next_date = SNAPSHOT_DATE + timedelta(days=1)
+        pipeline, second = run_delta(next_date)
+
+        assert second['orders']['delta']['kind'] == 'delta'
+        assert second['orders']['delta']['update'] == 1
+        assert second['products']['delta']['update'] == 0
+        view = pipeline.delta_store.view(next_date)
+        assert view.count_rows('orders') == source_db.get_row_count('orders')
+        assert pipeline.delta_store.read_table('orders', SNAPSHOT_DATE)['customer_note'].ne('it_006').all()
+
+    def test_skip_unchanged_links_tables(self, tmp_path, source_db, source_counts):
+        """IT-007: Ngày 2 chỉ export table có fingerprint đổi, table khác được hardlink"""
+        run_pipeline(tmp_path, output_format='parquet', skip_unchanged=True)
+
+        execute_on_source(source_db, "UPDATE ecommerce.categories SET description = description WHERE id = 1")
+        next_date = SNAPSHOT_DATE + timedelta(days=1)
+        pipeline = IngestPipeline(tables=TEST_TABLES, snapshot_date=next_date, staging_path=str(tmp_path),
+                                  output_format='parquet', skip_unchanged=True)
+        result = pipeline.run()
+        assert result['success'], result.get('error')
+        tables = {t['table']: t for t in result['tables']}
+
+        # UPDATE không đổi giá trị nhưng trigger đổi updated_at -> export lại
+        assert 'skipped' not in tables['categories']
+        assert tables['products']['skipped']['source_snapshot'] == SNAPSHOT_DATE.isoformat()
+        assert pipeline.staging.count_rows('products') == source_counts['products']
+
+        metadata = pipeline.staging.read_metadata()
+        assert 'products' in metadata['skip_unchanged']['skipped_tables']
+
+    @pytest.mark.parametrize("kwargs", [
+        {'output_format': 'csv'},
+        {'output_format': 'parquet', 'chunk_size': 7_000},
+        {'output_format': 'parquet', 'chunk_size': 7_000, 'workers': 3, 'partitions': 3},
+        {'output_format': 'csv', 'workers': 3, 'partitions': 3, 'consistent': True},
+    ])
+    def test_async_engine_row_counts(self, tmp_path, source_counts, kwargs):
+        """IT-008: Engine async export đủ rows, metadata cùng format với engine đồng bộ"""
+        pipeline = AsyncIngestPipeline(tables=TEST_TABLES, snapshot_date=SNAPSHOT_DATE,
+                                       staging_path=str(tmp_path), **kwargs)
+        result = pipeline.run()
+        assert result['success'], result.get('error')
+
+        staging = staging_for(tmp_path)
+        metadata = staging.read_metadata()
+        assert metadata['engine'] == 'async'
+        assert [t['table'] for t in metadata['tables']] == TEST_TABLES
+        for table, expected in source_counts.items():
+            assert staging.count_rows(table) == expected, f"Mismatch for {table} with {kwargs}"
+
+    def test_async_parquet_equals_arrow_engine(self, tmp_path):
+        """IT-009: Engine async ghi Parquet cùng kiểu và cùng dữ liệu với engine arrow"""
+        import pyarrow.parquet as pq
+
+        run_pipeline(tmp_path / "arrow", output_format='parquet', engine='arrow')
+        result = AsyncIngestPipeline(tables=TEST_TABLES, snapshot_date=SNAPSHOT_DATE,
+                                     staging_path=str(tmp_path / "async"), output_format='parquet').run()
+        assert result['success'], result.get('error')
+
+        expected = pq.read_table(staging_for(tmp_path / "arrow").get_table_path('orders', 'parquet'))
+        actual = pq.read_table(staging_for(tmp_path / "async").get_table_path('orders', 'parquet'))
+        assert actual.schema == expected.schema
+        assert actual.sort_by('id').equals(expected.sort_by('id'))
+
+    @pytest.mark.parametrize("engine", ['pandas', 'copy', 'arrow'])
+    def test_profile_and_lite_variants(self, tmp_path, source_counts, engine):
+        """IT-016: --profile lite không SELECT cột nặng; --lite-variants ghi orders__lite cạnh orders"""
+        lite = run_pipeline(tmp_path / "lite", output_format='parquet', engine=engine, profile='lite')
+        orders = next(t for t in lite['tables'] if t['table'] == 'orders')
+        assert 'shipping_address' in orders['projection']['excluded']
+        assert 'shipping_address' not in staging_for(tmp_path / "lite").read_table('orders').columns
+
+        result = run_pipeline(tmp_path / "variants", output_format='parquet', engine=engine,
+                              partitions=2, lite_variants=True)
+        staging = staging_for(tmp_path / "variants")
+        orders = next(t for t in result['tables'] if t['table'] == 'orders')
+
+        assert orders['variants']['orders__lite']['files'] == 2
+        assert 'shipping_address' in staging.read_table('orders').columns
+        assert 'shipping_address' not in staging.read_table('orders__lite').columns
+        assert staging.count_rows('orders__lite') == source_counts['orders']
+
+
+# ============================================================================
+# TEST CLASS 2: PARALLEL EXPORT
+# ============================================================================
+
+class TestParallelExport:
+    """
+    💡 GIẢI THÍCH:
+    Export song song (workers / partitions) phải cho kết quả giống tuần tự,
+    với thứ tự metadata cố định và snapshot nhất quán khi --consistent.
+    """
+
+    def test_workers_keep_table_order(self, tmp_path):
+        """IT-010: Kết quả theo đúng thứ tự tables dù chạy song song"""
+        result = run_pipeline(tmp_path, engine='copy', workers=3)
+        assert [t['table'] for t in result['tables']] == TEST_TABLES
+
+    def test_failed_table_cancels_run(self, tmp_path):
+        """IT-011: Một table lỗi -> run fail, không có _SUCCESS"""
+        pipeline = IngestPipeline(
+            tables=['categories', 'missing_table', 'orders'],
+            snapshot_date=SNAPSHOT_DATE,
+            staging_path=str(tmp_path),
+            workers=2,
+        )
+        result = pipeline.run()
+
+        assert not result['success']
+        assert not (staging_for(tmp_path).snapshot_path / "_SUCCESS").exists()
+        statuses = {t['table']: t['status'] for t in result['tables']}
+        assert statuses['missing_table'] == 'failed'
+
+    def test_partitions_write_part_files(self, tmp_path, source_counts):
+        """IT-012: --partitions ghi part files, đọc lại đủ rows"""
+        result = run_pipeline(tmp_path, output_format='parquet', engine='copy', partitions=3)
+        staging = staging_for(tmp_path)
+
+        orders = next(t for t in result['tables'] if t['table'] == 'orders')
+        assert len(orders['parts']) == 3
+        assert len(staging.get_table_files('orders')) == 3
+        assert staging.count_rows('orders') == source_counts['orders']
+
+    @pytest.mark.parametrize("engine", ['pandas', 'copy', 'arrow'])
+    def test_memory_budget_limits_chunks(self, tmp_path, source_counts, engine):
+        """IT-017: --memory-budget nhỏ -> chunk nhỏ hơn --chunk-size, đủ rows, số liệu memory trong metadata"""
+        result = run_pipeline(tmp_path, output_format='parquet', engine=engine, workers=2,
+                              partitions=2, memory_budget=8)
+        staging = staging_for(tmp_path)
+
+        orders = next(t for t in result['tables'] if t['table'] == 'orders')
+        assert orders['memory']['chunk_rows'] < 50_000
+        assert orders['memory']['peak_traced_mb'] > 0
+        assert staging.read_metadata()['memory_budget']['budget_mb'] == 8
+        for table, expected in source_counts.items():
+            assert staging.count_rows(table) == expected
+
+    def test_throttle_samples_source_load(self, tmp_path, source_db, source_counts):
+        """IT-018: --throttle lấy mẫu pg_stat_activity (không đếm connection của export), đủ rows"""
+        load = source_db.sample_load()
+        assert load['active'] >= 0 and load['latency_ms'] > 0
+
+        result = run_pipeline(tmp_path, output_format='parquet', engine='arrow', workers=2,
+                              partitions=2, throttle=True)
+        staging = staging_for(tmp_path)
+
+        throttle = staging.read_metadata()['throttle']
+        assert throttle['samples'] >= 1
+        assert throttle['max_readers'] == 3
+        for table, expected in source_counts.items():
+            assert staging.count_rows(table) == expected
+        assert result['success']
+
+    def test_backfill_routes_rows_by_created_at(self, tmp_path, source_db):
+        """IT-019: --backfill đọc orders một lần, mỗi ngày có đúng số orders tạo tới hết ngày đó"""
+        start = date(2024, 11, 1)
+        end = start + timedelta(days=6)
+        pipeline = BackfillPipeline(start, end, tables=['orders'], staging_path=str(tmp_path), writers=3)
+        result = pipeline.run()
+        assert result['success'], result.get('error')
+
+        for staging in pipeline.stagings:
+            next_day = staging.snapshot_date + timedelta(days=1)
+            with source_db.engine.connect() as conn:
+                expected = conn.execute(text(
+                    "SELECT count(*) FROM ecommerce.orders WHERE created_at IS NULL OR created_at < :day"
+                ), {'day': next_day}).scalar()
+            assert staging.count_rows('orders') == expected
+            assert (staging.snapshot_path / '_SUCCESS').exists()
+
+    @pytest.mark.parametrize("engine", ['pandas', 'copy', 'arrow'])
+    def test_sharded_sources_fan_in(self, tmp_path, source_counts, engine):
+        """IT-020: Hai shard (cùng database) -> mỗi table 2 part file, rows gấp đôi, _shard đúng tên"""
+        url = SourceDatabase().connection_string
+        result = run_pipeline(tmp_path, output_format='parquet', engine=engine, workers=2,
+                              sources=[f'a={url}', f'b={url}'])
+        staging = staging_for(tmp_path)
+
+        orders = staging.read_table('orders')
+        assert orders[IngestConfig.SHARD_COLUMN].value_counts().to_dict() == {
+            'a': source_counts['orders'], 'b': source_counts['orders']
+        }
+        shards = staging.read_metadata()['source']['shards']
+        assert [s['rows'] for s in shards] == [sum(source_counts.values())] * 2
+        assert all(len(t['parts']) == 2 for t in result['tables'])
+
+    def test_resume_skips_completed_work(self, tmp_path, source_counts, monkeypatch):
+        """IT-015: Part cuối của orders lỗi -> --resume chỉ ghi lại part đó rồi mới có _SUCCESS"""
+        original = IngestPipeline._export_table_streaming
+        first_part_done = threading.Event()
+
+        def fail_last_part(self, table_name, where=None, part=None):
+            if table_name == 'orders' and part == 1:
+                # Chờ part 0 checkpoint xong rồi mới lỗi
+                first_part_done.wait(timeout=60)
+                raise RuntimeError("simulated crash")
+            stats = original(self, table_name, where, part)
+            if table_name == 'orders':
+                first_part_done.set()
+            return stats
+
+        with monkeypatch.context() as m:
+            m.setattr(IngestPipeline, '_export_table_streaming', fail_last_part)
+            pipeline = IngestPipeline(tables=TEST_TABLES, snapshot_date=SNAPSHOT_DATE,
+                                      staging_path=str(tmp_path), output_format='parquet', partitions=2)
+            assert not pipeline.run()['success']
+
+        staging = staging_for(tmp_path)
+        assert not (staging.snapshot_path / "_SUCCESS").exists()
+        first_part = staging.get_part_files('orders', 0)[0]
+        inode = first_part.stat().st_ino
+
+        result = run_pipeline(tmp_path, output_format='parquet', partitions=2, resume=True)
+        tables = {t['table']: t for t in result['tables']}
+
+        assert tables['categories']['resumed']
+        assert first_part.stat().st_ino == inode
+        assert staging.count_rows('orders') == source_counts['orders']
+        assert (staging.snapshot_path / "_SUCCESS").exists()
+
+    @pytest.mark.parametrize("engine", ['pandas', 'copy', 'arrow'])
+    def test_hive_partitions_by_order_month(self, tmp_path, source_counts, engine):
+        """IT-014: --hive-partitions chia orders theo tháng, kết hợp được với --partitions"""
+        result = run_pipeline(tmp_path, output_format='parquet', engine=engine,
+                              partitions=2, hive_partitions=True)
+        staging = staging_for(tmp_path)
+
+        orders = next(t for t in result['tables'] if t['table'] == 'orders')
+        months = orders['hive_partitions']['values']
+        assert months
+        assert all((staging.snapshot_path / 'orders' / f'order_date_month={m}').is_dir() for m in months)
+        assert staging.count_rows('orders') == source_counts['orders']
+
+        # Table không khai báo trong HIVE_PARTITIONS vẫn là 1 file
+        assert staging.get_table_files('products') == [staging.get_table_path('products', 'parquet')]
+
+    def test_consistent_snapshot_hides_new_rows(self, source_db):
+        """IT-013: Rows insert sau pg_export_snapshot() không được đọc"""
+        other = psycopg2.connect(source_db.engine.url.render_as_string(hide_password=False))
+        other.autocommit = True
+        try:
+            with source_db.exported_snapshot() as info:
+                before = sum(len(c) for c in source_db.iter_table_chunks('categories'))
+                other.cursor().execute(
+                    "INSERT INTO ecommerce.categories (name) VALUES ('it_013_snapshot')"
+                )
+                during = sum(len(c) for c in source_db.iter_table_chunks('categories'))
+
+            assert info['snapshot_id']
+            assert info['wal_lsn']
+            assert during == before
+        finally:
+            other.cursor().execute("DELETE FROM ecommerce.categories WHERE name = 'it_013_snapshot'")
+            other.close()
+
+
+# ============================================================================
+# TEST CLASS 3: INCREMENTAL
+# ============================================================================
+
+class TestIncrementalExport:
+    """
+    💡 GIẢI THÍCH:
+    Lần đầu incremental = full, các lần sau chỉ lấy rows có updated_at mới
+    cùng với order_items của các orders đó.
+    """
+
+    TABLES = ['orders', 'order_items']
+
+    def run_incremental(self, staging_path, snapshot_date, **kwargs) -> dict:
+        pipeline = IngestPipeline(
+            tables=self.TABLES,
+            snapshot_date=snapshot_date,
+            staging_path=str(staging_path),
+            mode='incremental',
+            **kwargs
+        )
+        result = pipeline.run()
+        assert result['success'], result.get('error')
+        return {t['table']: t for t in result['tables']}
+
+    @pytest.fixture(autouse=True)
+    def no_lag(self, monkeypatch):
+        """Rows vừa UPDATE trong test phải nằm dưới upper ngay (lag có test riêng)"""
+        monkeypatch.setattr(IngestConfig, 'WATERMARK_LAG_SECONDS', 0)
+
+    @pytest.mark.parametrize("engine", ['pandas', 'copy'])
+    def test_only_changed_rows_exported(self, tmp_path, source_db, engine):
+        """IT-020: Lần 2 chỉ export orders đã UPDATE và items của chúng"""
+        first = self.run_incremental(tmp_path, SNAPSHOT_DATE, engine=engine)
+        assert first['orders']['rows'] == source_db.get_row_count('orders')
+
+        other = psycopg2.connect(source_db.engine.url.render_as_string(hide_password=False))
+        other.autocommit = True
+        try:
+            other.cursor().execute("UPDATE ecommerce.orders SET status = status WHERE id IN (1, 2)")
+        finally:
+            other.close()
+
+        next_date = SNAPSHOT_DATE + timedelta(days=1)
+        second = self.run_incremental(tmp_path, next_date, engine=engine, partitions=2)
+        expected_items = sum(
+            len(c) for c in source_db.iter_table_chunks('order_items', where='order_id IN (1, 2)')
+        )
+
+        assert second['orders']['rows'] == 2
+        assert second['order_items']['rows'] == expected_items
+        assert second['order_items']['incremental']['strategy'] == 'parent'
+
+        state = json.loads((tmp_path / '_state' / 'watermarks.json').read_text())
+        assert state['orders']['snapshot_date'] == next_date.isoformat()
+        assert (tmp_path / 'incremental' / f'snapshot_date={next_date}' / '_SUCCESS').exists()
+
+    def test_late_child_under_unchanged_parent(self, tmp_path, source_db):
+        """IT-021: order_item thêm vào order không đổi -> lần sau vẫn được export"""
+        self.run_incremental(tmp_path, SNAPSHOT_DATE)
+        execute_on_source(
+            source_db,
+            "INSERT INTO ecommerce.order_items (order_id, product_id, quantity, unit_price, line_total) "
+            "SELECT order_id, product_id, 1, unit_price, unit_price FROM ecommerce.order_items "
+            "ORDER BY id LIMIT 1",
+        )
+        try:
+            second = self.run_incremental(tmp_path, SNAPSHOT_DATE + timedelta(days=1))
+        finally:
+            execute_on_source(
+                source_db, "DELETE FROM ecommerce.order_items WHERE id = (SELECT MAX(id) FROM ecommerce.order_items)"
+            )
+
+        assert second['orders']['rows'] == 0
+        assert second['order_items']['rows'] == 1
+
+
+# ============================================================================
+# TEST CLASS 4: CDC
+# ============================================================================
+
+CDC_TEST_SLOT = 'it_cdc_staging'
+
+
+@pytest.fixture
+def cdc_slot(source_db, monkeypatch):
+    """Slot riêng cho test, xóa sau khi test xong"""
+    monkeypatch.setattr(IngestConfig, 'CDC_SLOT_NAME', CDC_TEST_SLOT)
+    reader = LogicalReplicationReader(source_db.engine, CDC_TEST_SLOT, IngestConfig.CDC_PUBLICATION)
+    try:
+        reader.ensure_slot()
+    except RuntimeError as e:
+        pytest.skip(f"CDC not available: {e}")
+    yield reader
+    reader.drop_slot()
+
+
+def execute_on_source(source_db, *statements):
+    """Chạy câu lệnh trên connection riêng (autocommit, mỗi câu 1 transaction)"""
+    conn = psycopg2.connect(source_db.engine.url.render_as_string(hide_password=False))
+    conn.autocommit = True
+    try:
+        for statement in statements:
+            conn.cursor().execute(statement)
+    finally:
+        conn.close()
+
+
+class TestCDCExport:
+    """
+    💡 GIẢI THÍCH:
+    CDC ghi insert/update/delete thành file riêng và resume theo LSN đã lưu.
+    """
+
+    def run_cdc(self, staging_path, **kwargs) -> dict:
+        pipeline = IngestPipeline(
+            snapshot_date=SNAPSHOT_DATE,
+            staging_path=str(staging_path),
+            output_format='parquet',
+            mode='cdc',
+            **kwargs
+        )
+        result = pipeline.run()
+        assert result['success'], result.get('error')
+        return {t['table']: t for t in result['tables']}
+
+    def test_changes_split_by_operation(self, tmp_path, source_db, cdc_slot):
+        """IT-030: INSERT/UPDATE/DELETE vào file riêng, kể cả hard delete"""
+        try:
+            execute_on_source(
+                source_db,
+                "INSERT INTO ecommerce.categories (name) VALUES ('it_030_a'), ('it_030_b')",
+                "UPDATE ecommerce.categories SET description = 'cdc' WHERE name = 'it_030_a'",
+                "DELETE FROM ecommerce.categories WHERE name = 'it_030_b'",
+            )
+            results = self.run_cdc(tmp_path, chunk_size=1)
+        finally:
+            execute_on_source(source_db, "DELETE FROM ecommerce.categories WHERE name = 'it_030_a'")
+
+        staging = StagingLayer(str(tmp_path / 'cdc'), SNAPSHOT_DATE)
+        assert results['categories']['changes'] == {'insert': 2, 'update': 1, 'delete': 1}
+        assert staging.read_table('categories/update')['description'].tolist() == ['cdc']
+        assert staging.read_table('categories/delete')['id'].notna().all()
+
+        state = json.loads((tmp_path / '_state' / 'cdc.json').read_text())
+        assert state['confirmed_lsn'] == cdc_slot.get_confirmed_lsn()
+
+    def test_resume_after_crash_before_advance(self, tmp_path, source_db, cdc_slot, monkeypatch):
+        """IT-031: State đã lưu nhưng slot chưa advance -> lần sau không ghi trùng"""
+        execute_on_source(source_db, "UPDATE ecommerce.orders SET status = status WHERE id = 1")
+
+        def crash(self, lsn):
+            raise RuntimeError("simulated crash before advance")
+
+        with monkeypatch.context() as m:
+            m.setattr(LogicalReplicationReader, 'advance', crash)
+            pipeline = IngestPipeline(
+                snapshot_date=SNAPSHOT_DATE, staging_path=str(tmp_path), mode='cdc'
+            )
+            assert not pipeline.run()['success']
+
+        second = self.run_cdc(tmp_path)
+        staging = StagingLayer(str(tmp_path / 'cdc'), SNAPSHOT_DATE)
+
+        assert second['orders']['rows'] == 0
+        assert staging.count_rows('orders/update') == 1
+        assert cdc_slot.get_confirmed_lsn() == json.loads(
+            (tmp_path / '_state' / 'cdc.json').read_text()
+        )['confirmed_lsn']
+
+    def test_stops_at_start_lsn_under_write_load(self, tmp_path, source_db, cdc_slot, monkeypatch):
+        """IT-032: Source ghi liên tục trong lúc đọc -> lần chạy dừng ở LSN lúc bắt đầu"""
+        execute_on_source(source_db, "UPDATE ecommerce.orders SET status = status WHERE id = 1")
+        read_batch = LogicalReplicationReader.read_batch
+
+        def read_under_load(self, max_changes, upto_lsn=None):
+            # Mỗi lần đọc lại có thêm một transaction mới trên source
+            execute_on_source(source_db, "UPDATE ecommerce.orders SET status = status WHERE id = 1")
+            return read_batch(self, max_changes, upto_lsn)
+
+        monkeypatch.setattr(LogicalReplicationReader, 'read_batch', read_under_load)
+        first = self.run_cdc(tmp_path, chunk_size=1)
+        monkeypatch.undo()
+
+        assert first['orders']['changes']['update'] == 1
+        second = self.run_cdc(tmp_path, chunk_size=1)
+        assert second['orders']['changes']['update'] >= 1
@@ -31,6 +31,8 @@ import pandas as pd
 from sqlalchemy import create_engine, text, inspect
 from dotenv import load_dotenv
 
+from src.ingestion.export_to_staging import StagingLayer
+
 # Load environment
 load_dotenv()
 
@@ -320,6 +322,15 @@ class TestStaging:
             pytest.skip("No staging snapshots found")
         return snapshots[-1]
     
+    @pytest.fixture
+    def latest_staging(self, latest_snapshot):
+        """
+        StagingLayer của snapshot mới nhất: đọc table qua cùng reader với pipeline
+        (file đơn, part files hoặc Hive key=value/part-*).
+        """
+        snapshot_date = date.fromisoformat(latest_snapshot.name.split('=', 1)[1])
+        return StagingLayer(str(latest_snapshot.parent), snapshot_date)
+    
     def test_staging_directory_exists(self, staging_path):
         """TC-050: Staging directory phải tồn tại"""
         assert staging_path.exists(), f"Staging path not found: {staging_path}"
@@ -329,13 +340,10 @@ class TestStaging:
         snapshots = list(staging_path.glob("snapshot_date=*"))
         assert len(snapshots) > 0, "No snapshots found in staging"
     
-    def test_all_tables_exported(self, latest_snapshot):
+    def test_all_tables_exported(self, latest_staging):
         """TC-052: Tất cả tables phải được export"""
         for table in self.EXPECTED_TABLES:
-            csv_file = latest_snapshot / f"{table}.csv"
-            parquet_file = latest_snapshot / f"{table}.parquet"
-            
-            assert csv_file.exists() or parquet_file.exists(), f"Missing export for: {table}"
+            assert latest_staging.get_table_files(table), f"Missing export for: {table}"
     
     def test_success_marker_exists(self, latest_snapshot):
         """TC-053: _SUCCESS marker phải tồn tại"""
@@ -347,7 +355,7 @@ class TestStaging:
         metadata_file = latest_snapshot / "_metadata.json"
         assert metadata_file.exists(), f"Missing _metadata.json in {latest_snapshot}"
     
-    def test_row_count_customers(self, db_engine, latest_snapshot):
+    def test_row_count_customers(self, db_engine, latest_staging):
         """TC-060: Row count customers staging = source"""
         # Source count
         source_count = pd.read_sql(
@@ -356,28 +364,18 @@ class TestStaging:
         )['cnt'][0]
         
         # Staging count
-        staging_file = latest_snapshot / "customers.csv"
-        if staging_file.exists():
-            staging_count = len(pd.read_csv(staging_file))
-        else:
-            staging_file = latest_snapshot / "customers.parquet"
-            staging_count = len(pd.read_parquet(staging_file))
+        staging_count = len(latest_staging.read_table("customers"))
         
         assert source_count == staging_count, f"Mismatch: source={source_count}, staging={staging_count}"
     
-    def test_row_count_orders(self, db_engine, latest_snapshot):
+    def test_row_count_orders(self, db_engine, latest_staging):
         """TC-061: Row count orders staging = source"""
         source_count = pd.read_sql(
             "SELECT COUNT(*) as cnt FROM ecommerce.orders", 
             db_engine
         )['cnt'][0]
         
-        staging_file = latest_snapshot / "orders.csv"
-        if staging_file.exists():
-            staging_count = len(pd.read_csv(staging_file))
-        else:
-            staging_file = latest_snapshot / "orders.parquet"
-            staging_count = len(pd.read_parquet(staging_file))
+        staging_count = len(latest_staging.read_table("orders"))
         
         assert source_count == staging_count, f"Mismatch: source={source_count}, staging={staging_count}"
     
@@ -0,0 +1,178 @@
+"""
+===============================================================================
+FILE: test_arrow_reader.py
+PURPOSE: Unit tests cho Arrow read path (type mapping + rows -> RecordBatch)
+AUTHOR: QC/QA Team
+VERSION: 1.0
+
+HƯỚNG DẪN SỬ DỤNG:
+    pytest tests/unit/test_arrow_reader.py -v
+===============================================================================
+"""
+
+from datetime import date, datetime
+from decimal import Decimal
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.ingestion.export_to_staging import StagingLayer, pg_type_to_arrow, rows_to_record_batch
+
+
+ORDERS_SCHEMA = pa.schema([
+    ('id', pa.int32()),
+    ('order_date', pa.date32()),
+    ('status', pa.dictionary(pa.int32(), pa.string())),
+    ('total_amount', pa.decimal128(15, 2)),
+    ('customer_note', pa.string()),
+    ('created_at', pa.timestamp('us')),
+])
+
+
+def make_rows(start_id: int, size: int) -> list:
+    """Rows giống kết quả fetchmany của psycopg2 cho bảng orders"""
+    return [
+        (
+            i,
+            date(2024, 1, 1),
+            'Delivered' if i % 2 else 'Pending',
+            Decimal('100.50') + i,
+            None if i % 3 == 0 else f'note {i}',
+            datetime(2024, 1, 1, 10, 0, 0),
+        )
+        for i in range(start_id, start_id + size)
+    ]
+
+
+# ============================================================================
+# TEST CLASS 1: TYPE MAPPING
+# ============================================================================
+
+class TestPgTypeToArrow:
+    """
+    💡 GIẢI THÍCH:
+    Kiểu PostgreSQL được map sang kiểu Arrow giữ nguyên giá trị.
+    """
+
+    def test_numeric_keeps_precision(self):
+        """TC-140: DECIMAL(15,2) -> decimal128(15,2)"""
+        assert pg_type_to_arrow('numeric', 15, 2) == pa.decimal128(15, 2)
+
+    def test_unconstrained_numeric_is_string(self):
+        """TC-141: NUMERIC không precision không vừa decimal128 -> string"""
+        assert pg_type_to_arrow('numeric') == pa.string()
+
+    @pytest.mark.parametrize("data_type,expected", [
+        ('integer', pa.int32()),
+        ('date', pa.date32()),
+        ('timestamp without time zone', pa.timestamp('us')),
+        ('character varying', pa.string()),
+    ])
+    def test_basic_types(self, data_type, expected):
+        """TC-142: int / date / timestamp / varchar"""
+        assert pg_type_to_arrow(data_type) == expected
+
+    def test_low_cardinality_text_is_dictionary(self):
+        """TC-143: Cột text low-cardinality -> dictionary(int32, string)"""
+        assert pg_type_to_arrow('character varying', dictionary=True) == pa.dictionary(pa.int32(), pa.string())
+        # dictionary chỉ áp dụng cho text
+        assert pg_type_to_arrow('integer', dictionary=True) == pa.int32()
+
+
+# ============================================================================
+# TEST CLASS 2: RECORD BATCHES
+# ============================================================================
+
+class TestRowsToRecordBatch:
+    """
+    💡 GIẢI THÍCH:
+    Rows từ cursor được build thẳng thành RecordBatch đúng schema
+    và ghi Parquet không qua DataFrame.
+    """
+
+    def test_values_and_types(self):
+        """TC-144: Decimal giữ đúng giá trị, NULL giữ nguyên"""
+        batch = rows_to_record_batch(make_rows(1, 3), ORDERS_SCHEMA)
+
+        assert batch.schema == ORDERS_SCHEMA
+        assert batch.column(3).to_pylist() == [Decimal('101.50'), Decimal('102.50'), Decimal('103.50')]
+        assert batch.column(2).to_pylist() == ['Delivered', 'Pending', 'Delivered']
+        assert batch.column(4).to_pylist() == ['note 1', 'note 2', None]
+
+    def test_empty_rows(self):
+        """TC-145: Không có rows -> batch rỗng cùng schema"""
+        batch = rows_to_record_batch([], ORDERS_SCHEMA)
+        assert batch.num_rows == 0
+        assert batch.schema == ORDERS_SCHEMA
+
+    def test_non_string_text_value(self):
+        """TC-146: Giá trị json (dict) trong cột text được str() hóa"""
+        schema = pa.schema([('gateway_response', pa.string())])
+        batch = rows_to_record_batch([({'code': 0},), (None,)], schema)
+        assert batch.column(0).to_pylist() == ["{'code': 0}", None]
+
+    def test_parquet_batches_keep_exact_types(self, tmp_path):
+        """TC-147: Mỗi batch = 1 row group, decimal/dictionary giữ nguyên khi đọc lại"""
+        staging = StagingLayer(str(tmp_path), date(2024, 1, 15))
+        staging.setup()
+
+        with staging.open_writer('orders', 'parquet', ORDERS_SCHEMA) as writer:
+            writer.write_arrow(rows_to_record_batch(make_rows(1, 4), ORDERS_SCHEMA))
+            writer.write_arrow(rows_to_record_batch(make_rows(5, 2), ORDERS_SCHEMA))
+
+        parquet_file = pq.ParquetFile(writer.file_path)
+        assert parquet_file.metadata.num_row_groups == 2
+
+        table = parquet_file.read()
+        assert table.schema.field('total_amount').type == pa.decimal128(15, 2)
+        assert pa.types.is_dictionary(table.schema.field('status').type)
+        assert table.num_rows == 6
+
+
+# ============================================================================
+# TEST CLASS 3: COPY -> ARROW STREAM
+# ============================================================================
+
+class TestIterCopyBatches:
+    """
+    💡 GIẢI THÍCH:
+    COPY ghi vào pipe trong thread riêng; khi pyarrow lỗi giữa chừng
+    thread đó không được block mãi trên pipe đầy.
+    """
+
+    def test_unparseable_value_fails_instead_of_blocking(self, monkeypatch):
+        """TC-287: Giá trị không parse được giữa stream -> raise, không treo"""
+        import threading
+
+        from src.ingestion.export_to_staging import SourceDatabase
+
+        schema = pa.schema([('id', pa.int32()), ('note', pa.string())])
+
+        def fake_copy(file_obj, table_name, schema_name, where):
+            file_obj.write(b'id,note\n')
+            file_obj.write(b''.join(b'%d,ok\n' % i for i in range(50_000)))
+            file_obj.write(b'not-a-number,bad\n')
+            # Nhiều hơn hẳn dung lượng pipe: không đóng đầu đọc thì write() block
+            for _ in range(200):
+                file_obj.write(b''.join(b'%d,%s\n' % (i, b'x' * 40) for i in range(1_000)))
+            return 0
+
+        db = SourceDatabase()
+        monkeypatch.setattr(db, 'copy_table_to', fake_copy)
+
+        outcome = {}
+
+        def consume():
+            try:
+                for _ in db.iter_copy_batches('orders', schema):
+                    pass
+            except Exception as e:
+                outcome['error'] = e
+
+        consumer = threading.Thread(target=consume, daemon=True)
+        consumer.start()
+        consumer.join(timeout=30)
+
+        assert not consumer.is_alive(), 'iter_copy_batches bị treo khi parse lỗi'
+        assert isinstance(outcome.get('error'), pa.ArrowInvalid)
@@ -0,0 +1,105 @@
+"""
+===============================================================================
+FILE: test_async_engine.py
+PURPOSE: Unit tests cho engine async (điều phối stage, chọn engine)
+AUTHOR: QC/QA Team
+VERSION: 1.0
+
+HƯỚNG DẪN SỬ DỤNG:
+    pytest tests/unit/test_async_engine.py -v
+===============================================================================
+"""
+
+import asyncio
+
+import pytest
+
+from src.ingestion.async_engine import AsyncIngestPipeline, run_stages
+from src.ingestion.export_to_staging import IngestPipeline
+
+
+# ============================================================================
+# TEST CLASS 1: STAGES
+# ============================================================================
+
+class TestRunStages:
+    """
+    💡 GIẢI THÍCH:
+    Các stage nối bằng Queue có giới hạn; một stage lỗi không được để
+    stage khác treo trên Queue đầy.
+    """
+
+    def test_bounded_queue_pipeline(self):
+        """TC-210: Producer chờ khi Queue đầy, consumer nhận đủ theo thứ tự"""
+        queue = asyncio.Queue(maxsize=2)
+        high_water = []
+
+        async def produce():
+            for i in range(10):
+                await queue.put(i)
+                high_water.append(queue.qsize())
+            await queue.put(None)
+            return 'done'
+
+        async def consume():
+            received = []
+            while (item := await queue.get()) is not None:
+                await asyncio.sleep(0)
+                received.append(item)
+            return received
+
+        produced, received = asyncio.run(run_stages(produce(), consume()))
+
+        assert produced == 'done'
+        assert received == list(range(10))
+        assert max(high_water) <= 2
+
+    def test_failed_stage_cancels_others(self):
+        """TC-211: Consumer lỗi -> producer đang chờ Queue đầy bị cancel, lỗi gốc được raise"""
+        queue = asyncio.Queue(maxsize=1)
+        producer_cancelled = asyncio.Event()
+
+        async def produce():
+            try:
+                for i in range(100):
+                    await queue.put(i)
+            except asyncio.CancelledError:
+                producer_cancelled.set()
+                raise
+
+        async def consume():
+            await queue.get()
+            raise RuntimeError("disk full")
+
+        async def scenario():
+            with pytest.raises(RuntimeError, match="disk full"):
+                await run_stages(produce(), consume())
+            return producer_cancelled.is_set()
+
+        assert asyncio.run(scenario())
+
+
+# ============================================================================
+# TEST CLASS 2: ENGINE SELECTION
+# ============================================================================
+
+class TestEngineSelection:
+    """
+    💡 GIẢI THÍCH:
+    --engine async do AsyncIngestPipeline chạy; pipeline đồng bộ từ chối engine này.
+    """
+
+    def test_sync_pipeline_rejects_async(self, tmp_path):
+        """TC-212: IngestPipeline(engine='async') báo lỗi rõ ràng"""
+        with pytest.raises(ValueError, match="IngestPipeline"):
+            IngestPipeline(engine='async', staging_path=str(tmp_path))
+
+    def test_async_pipeline_keeps_options(self, tmp_path):
+        """TC-213: AsyncIngestPipeline nhận cùng option, engine ghi vào metadata là 'async'"""
+        pipeline = AsyncIngestPipeline(staging_path=str(tmp_path), output_format='parquet',
+                                       workers=4, partitions=2, hive_partitions=True)
+
+        assert pipeline.engine == 'async'
+        assert pipeline._create_metadata(0.0)['engine'] == 'async'
+        with pytest.raises(ValueError):
+            AsyncIngestPipeline(staging_path=str(tmp_path), engine='copy')
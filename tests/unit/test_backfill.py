@@ -0,0 +1,237 @@
+"""
+===============================================================================
+FILE: test_backfill.py
+PURPOSE: Unit tests cho backfill nhiều snapshot từ một lần đọc (route theo created_at)
+AUTHOR: QC/QA Team
+VERSION: 1.0
+
+HƯỚNG DẪN SỬ DỤNG:
+    pytest tests/unit/test_backfill.py -v
+===============================================================================
+"""
+
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.ingestion.backfill import BackfillPipeline, route_by_date, snapshot_dates, snapshot_kinds
+from src.ingestion.delta_store import HASH_DIR, OP_COLUMN
+from src.ingestion.export_to_staging import IngestPipeline, SourceDatabase
+
+
+SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('status', pa.string()),
+    ('created_at', pa.timestamp('us')),
+])
+
+DAYS = [date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 3)]
+
+# id 1: trước backfill, id 2/3: ngày 2, id 4: ngày 3, id 5: sau ngày cuối, id 6: NULL
+ROWS = [
+    (4, 'Pending', datetime(2024, 1, 3, 23, 59)),
+    (1, 'Delivered', datetime(2023, 12, 30, 8, 0)),
+    (2, 'Pending', datetime(2024, 1, 2, 0, 0)),
+    (5, 'Pending', datetime(2024, 1, 4, 0, 1)),
+    (3, 'Cancelled', datetime(2024, 1, 2, 12, 0)),
+    (6, 'Pending', None),
+]
+
+
+def make_batch(rows) -> pa.RecordBatch:
+    ids, statuses, created = zip(*rows) if rows else ([], [], [])
+    return pa.RecordBatch.from_arrays(
+        [pa.array(ids, pa.int64()), pa.array(statuses, pa.string()), pa.array(created, pa.timestamp('us'))],
+        schema=SCHEMA,
+    )
+
+
+class FakeSource:
+    """SourceDatabase tối thiểu: trả ROWS theo chunk, ghi lại số lần scan"""
+
+    host = 'localhost'
+    database = 'ecommerce'
+
+    def __init__(self, rows=ROWS, chunk_rows: int = 2):
+        self.rows = rows
+        self.chunk_rows = chunk_rows
+        self.scans = []
+
+    def connect(self):
+        pass
+
+    def close(self):
+        pass
+
+    @contextmanager
+    def exported_snapshot(self):
+        yield {'snapshot_id': 'fake', 'exported_at': '2024-06-01T00:00:00'}
+
+    def get_table_schema(self, table_name, schema='ecommerce', exact=False):
+        return SCHEMA
+
+    def iter_arrow_batches(self, table_name, arrow_schema, schema='ecommerce', chunk_size=None, where=None):
+        self.scans.append((table_name, where))
+        for start in range(0, len(self.rows), self.chunk_rows):
+            yield make_batch(self.rows[start:start + self.chunk_rows])
+
+    def iter_table_chunks(self, table_name, schema='ecommerce', chunk_size=None, where=None):
+        for batch in self.iter_arrow_batches(table_name, SCHEMA, schema, chunk_size, where):
+            yield batch.to_pandas()
+
+
+def run_backfill(tmp_path, tables, **kwargs) -> BackfillPipeline:
+    pipeline = BackfillPipeline(DAYS[0], DAYS[-1], tables=tables, staging_path=str(tmp_path), **kwargs)
+    pipeline.db = FakeSource()
+    result = pipeline.run()
+    assert result['success'], result.get('error')
+    return pipeline
+
+
+# ============================================================================
+# TEST CLASS 1: ROUTING
+# ============================================================================
+
+class TestRouteByDate:
+    """
+    💡 GIẢI THÍCH:
+    Row thuộc mọi ngày >= ngày tạo; chunk được sắp xếp để phần của mỗi ngày
+    là một slice liền.
+    """
+
+    def test_ends_are_cumulative_counts(self):
+        """TC-250: ends[i] = số rows tạo tới hết ngày i (NULL thuộc mọi ngày, sau ngày cuối bị loại)"""
+        table, ends = route_by_date(make_batch(ROWS), 'created_at', DAYS)
+
+        assert ends.tolist() == [2, 4, 5]
+        ids = table.column('id').to_pylist()
+        assert sorted(ids[:2]) == [1, 6]
+        assert sorted(ids[2:4]) == [2, 3]
+        assert ids[4] == 4
+        assert ids[5] == 5
+
+    def test_without_column_every_row_everywhere(self):
+        """TC-251: Table không có cột created_at -> mọi row thuộc mọi ngày"""
+        table, ends = route_by_date(make_batch(ROWS), None, DAYS)
+
+        assert ends.tolist() == [len(ROWS)] * len(DAYS)
+        assert table.num_rows == len(ROWS)
+
+    def test_dates_and_kinds(self):
+        """TC-252: Dãy ngày gồm cả hai đầu; layout delta chèn base mới sau compact_every delta"""
+        assert snapshot_dates(DAYS[0], DAYS[-1]) == DAYS
+        with pytest.raises(ValueError):
+            snapshot_dates(DAYS[-1], DAYS[0])
+
+        assert snapshot_kinds(3, 'full') == ['base'] * 3
+        assert snapshot_kinds(6, 'delta', compact_every=2) == ['base', 'delta', 'delta', 'base', 'delta', 'delta']
+
+
+# ============================================================================
+# TEST CLASS 2: PIPELINE
+# ============================================================================
+
+class TestBackfillPipeline:
+    """
+    💡 GIẢI THÍCH:
+    Mỗi table chỉ được scan một lần nhưng mọi ngày đều có snapshot riêng
+    (_metadata.json, _SUCCESS hoặc commit vào delta store).
+    """
+
+    def test_full_layout_one_scan_many_snapshots(self, tmp_path):
+        """TC-253: Layout full: mỗi ngày một snapshot đầy đủ, source chỉ scan một lần"""
+        pipeline = run_backfill(tmp_path, ['orders'], writers=2)
+
+        assert len(pipeline.db.scans) == 1
+        assert "created_at < DATE '2024-01-04'" in pipeline.db.scans[0][1]
+        expected = {DAYS[0]: {1, 6}, DAYS[1]: {1, 2, 3, 6}, DAYS[2]: {1, 2, 3, 4, 6}}
+        for staging in pipeline.stagings:
+            ids = set(pq.read_table(staging.get_table_path('orders', 'parquet')).column('id').to_pylist())
+            assert ids == expected[staging.snapshot_date]
+            assert (staging.snapshot_path / '_SUCCESS').exists()
+            metadata = staging.read_metadata()
+            assert metadata['mode'] == 'backfill'
+            assert metadata['tables'][0]['rows'] == len(expected[staging.snapshot_date])
+
+        # FakeSource bỏ qua WHERE: id 5 (sau ngày cuối) vẫn được đọc nhưng không vào ngày nào
+        assert pipeline.results[0]['rows'] == len(ROWS)
+        assert pipeline.results[0]['rows_written'] == 2 + 4 + 5
+
+    def test_delta_layout_reconstructs_each_day(self, tmp_path, monkeypatch):
+        """TC-254: Layout delta: base + rows insert mỗi ngày, tái dựng mỗi ngày đúng như layout full"""
+        monkeypatch.setattr('src.ingestion.backfill.IngestConfig.TABLES', ['orders'])
+        pipeline = run_backfill(tmp_path, None, layout='delta')
+
+        store = pipeline.delta_store
+        assert store.chains == [{'base': '2024-01-01', 'deltas': ['2024-01-02', '2024-01-03']}]
+        delta = pq.read_table(store.snapshot_path(DAYS[1]) / 'orders.parquet')
+        assert sorted(delta.column('id').to_pylist()) == [2, 3]
+        assert set(delta.column(OP_COLUMN).to_pylist()) == {'insert'}
+        assert store.read_arrow('orders', DAYS[2]).column('id').to_pylist() == [1, 2, 3, 4, 6]
+
+    def test_delta_layout_matches_delta_storage(self, tmp_path, monkeypatch):
+        """TC-292: Backfill delta rồi --storage delta ngày sau: cùng schema, không row nào bị coi là update"""
+        monkeypatch.setattr('src.ingestion.backfill.IngestConfig.TABLES', ['orders'])
+        exact = pa.schema([
+            ('id', pa.int32()),
+            ('status', pa.dictionary(pa.int32(), pa.string())),
+            ('total_amount', pa.decimal128(15, 2)),
+            ('created_at', pa.timestamp('us')),
+        ])
+        loose = pa.schema([
+            ('id', pa.int64()),
+            ('status', pa.string()),
+            ('total_amount', pa.float64()),
+            ('created_at', pa.timestamp('us')),
+        ])
+        schemas = {True: exact, False: loose}
+        rows = [(id_, status, Decimal('19.99') * id_, created) for id_, status, created in ROWS]
+
+        # SourceDatabase thật (iter_arrow_batches / iter_table_chunks), chỉ thay phần đọc từ PostgreSQL
+        db = SourceDatabase()
+        monkeypatch.setattr(db, 'connect', lambda: None)
+        monkeypatch.setattr(db, 'close', lambda: None)
+        monkeypatch.setattr(db, 'exported_snapshot', FakeSource().exported_snapshot)
+        monkeypatch.setattr(db, 'get_table_schema', lambda table, schema='ecommerce', exact=False: schemas[exact])
+        monkeypatch.setattr(db, '_iter_cursor_rows', lambda table, schema, chunk_size, where=None: iter([
+            (exact.names, rows[start:start + 2]) for start in range(0, len(rows), 2)
+        ]))
+
+        backfill = BackfillPipeline(DAYS[0], DAYS[-1], staging_path=str(tmp_path), layout='delta')
+        backfill.db = db
+        assert backfill.run()['success']
+        assert (backfill.delta_store.snapshot_path(DAYS[-1]) / HASH_DIR / 'orders.parquet').exists()
+
+        next_day = date(2024, 1, 4)
+        pipeline = IngestPipeline(
+            tables=['orders'], output_format='parquet', snapshot_date=next_day,
+            staging_path=str(tmp_path), storage='delta',
+        )
+        pipeline.db = db
+        pipeline.staging.setup()
+        pipeline.delta_plan = pipeline.delta_store.plan(next_day)
+        stats = pipeline._export_table_delta('orders')
+        pipeline.delta_store.commit(next_day, pipeline.delta_plan['kind'])
+
+        # Chỉ id 5 (tạo ngày 2024-01-04) là mới; không row backfill nào bị coi là đổi
+        assert stats['delta']['kind'] == 'delta'
+        assert stats['delta']['insert'] == 1
+        assert stats['delta']['update'] == 0
+        assert stats['delta']['delete'] == 0
+
+        state = pipeline.delta_store.read_arrow('orders', next_day)
+        assert state.schema == loose
+        assert state.column('id').to_pylist() == [1, 2, 3, 4, 5, 6]
+
+    def test_rejects_invalid_options(self, tmp_path):
+        """TC-255: Layout delta cần Parquet + mọi table; khoảng ngày quá dài bị từ chối"""
+        with pytest.raises(ValueError, match="parquet"):
+            BackfillPipeline(DAYS[0], DAYS[-1], staging_path=str(tmp_path), layout='delta', output_format='csv')
+        with pytest.raises(ValueError, match="--table"):
+            BackfillPipeline(DAYS[0], DAYS[-1], tables=['orders'], staging_path=str(tmp_path), layout='delta')
+        with pytest.raises(ValueError, match="split the range"):
+            BackfillPipeline(date(2020, 1, 1), date(2024, 1, 1), staging_path=str(tmp_path))
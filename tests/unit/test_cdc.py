@@ -0,0 +1,158 @@
+"""
+===============================================================================
+FILE: test_cdc.py
+PURPOSE: Unit tests cho pgoutput decoder và chuyển đổi CDC rows sang Arrow
+AUTHOR: QC/QA Team
+VERSION: 1.0
+
+HƯỚNG DẪN SỬ DỤNG:
+    pytest tests/unit/test_cdc.py -v
+===============================================================================
+"""
+
+import struct
+from datetime import datetime
+
+import pyarrow as pa
+
+from src.ingestion.cdc import UNCHANGED_TOAST, PgOutputDecoder, changes_to_arrow, lsn_to_int, lsn_to_str
+
+
+# ============================================================================
+# HELPERS - dựng message pgoutput (protocol v1)
+# ============================================================================
+
+def pg_string(value: str) -> bytes:
+    return value.encode('utf-8') + b'\x00'
+
+
+def tuple_data(values) -> bytes:
+    data = struct.pack('>h', len(values))
+    for value in values:
+        if value is None:
+            data += b'n'
+        elif value is UNCHANGED_TOAST:
+            data += b'u'
+        else:
+            encoded = value.encode('utf-8')
+            data += b't' + struct.pack('>i', len(encoded)) + encoded
+    return data
+
+
+def relation_message(relation_id: int, table: str, columns) -> bytes:
+    data = b'R' + struct.pack('>i', relation_id) + pg_string('ecommerce') + pg_string(table)
+    data += b'd' + struct.pack('>h', len(columns))
+    for name in columns:
+        data += b'\x00' + pg_string(name) + struct.pack('>ii', 23, -1)
+    return data
+
+
+BEGIN = b'B' + struct.pack('>qqi', 0x100, 0, 777)
+COMMIT = b'C' + struct.pack('>bqqq', 0, 0x100, 0x1_0000_0200, 0)
+
+
+# ============================================================================
+# TEST CLASS 1: DECODER
+# ============================================================================
+
+class TestPgOutputDecoder:
+    """
+    💡 GIẢI THÍCH:
+    Decoder phải nhận đúng table/op/giá trị cột từ message nhị phân.
+    """
+
+    def setup_method(self):
+        self.decoder = PgOutputDecoder()
+        self.decoder.decode(BEGIN)
+        self.decoder.decode(relation_message(16390, 'categories', ['id', 'name', 'is_active']))
+
+    def test_insert(self):
+        """TC-130: INSERT -> dict cột -> text, NULL -> None"""
+        change = self.decoder.decode(
+            b'I' + struct.pack('>i', 16390) + b'N' + tuple_data(['1', 'Books', None])
+        )
+        assert change['op'] == 'insert'
+        assert change['table'] == 'categories'
+        assert change['xid'] == 777
+        assert change['commit_ts'] == datetime(2000, 1, 1)
+        assert change['values'] == {'id': '1', 'name': 'Books', 'is_active': None}
+
+    def test_update_with_old_key(self):
+        """TC-131: UPDATE có old key ('K') -> lấy new tuple"""
+        change = self.decoder.decode(
+            b'U' + struct.pack('>i', 16390)
+            + b'K' + tuple_data(['1', None, None])
+            + b'N' + tuple_data(['2', 'Toys', 't'])
+        )
+        assert change['op'] == 'update'
+        assert change['values']['id'] == '2'
+
+    def test_update_unchanged_toast_is_not_null(self):
+        """TC-288: Cột TOAST không đổi ('u') -> UNCHANGED_TOAST, không phải NULL"""
+        change = self.decoder.decode(
+            b'U' + struct.pack('>i', 16390) + b'N' + tuple_data(['3', UNCHANGED_TOAST, None])
+        )
+        assert change['values']['name'] is UNCHANGED_TOAST
+        assert change['values']['is_active'] is None
+
+    def test_delete_carries_key(self):
+        """TC-132: DELETE chỉ mang cột replica identity"""
+        change = self.decoder.decode(
+            b'D' + struct.pack('>i', 16390) + b'K' + tuple_data(['5', None, None])
+        )
+        assert change['op'] == 'delete'
+        assert change['values'] == {'id': '5', 'name': None, 'is_active': None}
+
+    def test_commit_end_lsn(self):
+        """TC-133: COMMIT trả về end LSN để advance slot"""
+        commit = self.decoder.decode(COMMIT)
+        assert commit['type'] == 'commit'
+        assert lsn_to_str(commit['end_lsn']) == '1/200'
+        assert lsn_to_int('1/200') == commit['end_lsn']
+
+
+# ============================================================================
+# TEST CLASS 2: ARROW CONVERSION
+# ============================================================================
+
+class TestChangesToArrow:
+    """
+    💡 GIẢI THÍCH:
+    Giá trị text từ WAL được cast theo schema của table nguồn.
+    """
+
+    def test_cast_by_table_schema(self):
+        """TC-134: int/bool/timestamp được cast đúng kiểu, thêm cột _lsn/_xid"""
+        schema = pa.schema([
+            ('id', pa.int64()),
+            ('is_active', pa.bool_()),
+            ('created_at', pa.timestamp('us')),
+        ])
+        rows = [
+            {'_lsn': '0/10', '_xid': 1, '_commit_ts': datetime(2024, 1, 1),
+             'id': '7', 'is_active': 'f', 'created_at': '2024-01-01 10:00:00.5'},
+            {'_lsn': '0/10', '_xid': 1, '_commit_ts': datetime(2024, 1, 1),
+             'id': '8', 'is_active': None, 'created_at': None},
+        ]
+
+        table = changes_to_arrow(rows, schema)
+
+        assert table.schema.names == ['_lsn', '_xid', '_commit_ts', '_unchanged', 'id', 'is_active', 'created_at']
+        assert table.column('id').to_pylist() == [7, 8]
+        assert table.column('is_active').to_pylist() == [False, None]
+        assert table.column('created_at')[0].as_py() == datetime(2024, 1, 1, 10, 0, 0, 500000)
+
+    def test_unchanged_toast_mask(self):
+        """TC-289: Cột TOAST không đổi ghi NULL kèm tên trong _unchanged, NULL thật thì không"""
+        schema = pa.schema([('id', pa.int64()), ('description', pa.string())])
+        rows = [
+            {'_lsn': '0/10', '_xid': 1, '_commit_ts': datetime(2024, 1, 1),
+             'id': '7', 'description': UNCHANGED_TOAST},
+            {'_lsn': '0/10', '_xid': 1, '_commit_ts': datetime(2024, 1, 1),
+             'id': '8', 'description': None},
+        ]
+
+        table = changes_to_arrow(rows, schema)
+
+        assert table.column('description').to_pylist() == [None, None]
+        assert table.column('_unchanged').to_pylist() == [['description'], []]
@@ -0,0 +1,166 @@
+"""
+===============================================================================
+FILE: test_checkpoint.py
+PURPOSE: Unit tests cho progress manifest (--resume) và ghi file atomic
+AUTHOR: QC/QA Team
+VERSION: 1.0
+
+HƯỚNG DẪN SỬ DỤNG:
+    pytest tests/unit/test_checkpoint.py -v
+===============================================================================
+"""
+
+import json
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from src.ingestion.checkpoint import PROGRESS_FILE, ProgressManifest
+from src.ingestion.export_to_staging import IngestPipeline, StagingLayer
+
+
+CONFIG = {'output_format': 'parquet', 'engine': 'pandas', 'partitions': 2}
+
+
+@pytest.fixture
+def staging(tmp_path):
+    layer = StagingLayer(str(tmp_path), date(2024, 1, 15))
+    layer.setup()
+    return layer
+
+
+def write_table(staging: StagingLayer, table_name: str, rows: int = 3, part: int = None):
+    df = pd.DataFrame({'id': range(1, rows + 1), 'name': [f'row {i}' for i in range(rows)]})
+    with staging.open_writer(table_name, 'parquet', part=part) as writer:
+        writer.write(df)
+    return writer.file_path
+
+
+def reopen(staging: StagingLayer, config: dict = None) -> ProgressManifest:
+    """Giả lập lần chạy --resume sau khi process cũ chết"""
+    manifest = ProgressManifest(staging.snapshot_path, config or CONFIG)
+    manifest.begin(resume=True)
+    return manifest
+
+
+# ============================================================================
+# TEST CLASS 1: TABLE CHECKPOINT
+# ============================================================================
+
+class TestTableCheckpoint:
+    """
+    💡 GIẢI THÍCH:
+    Table đã xong được ghi vào _progress.json kèm checksum; --resume chỉ
+    bỏ qua table nếu file vẫn đúng checksum.
+    """
+
+    def test_completed_table_is_resumed(self, staging):
+        """TC-190: Table đã ghi xong -> lần resume trả lại kết quả cũ"""
+        manifest = ProgressManifest(staging.snapshot_path, CONFIG)
+        manifest.begin()
+        file_path = write_table(staging, 'categories')
+        manifest.record_table('categories', {'table': 'categories', 'rows': 3, 'file': file_path}, [file_path])
+
+        resumed = reopen(staging).completed_table('categories')
+        assert resumed['rows'] == 3
+        assert resumed['file'] == str(file_path)
+
+    def test_checksum_mismatch_reexports(self, staging):
+        """TC-191: File bị sửa sau checkpoint -> table phải export lại"""
+        manifest = ProgressManifest(staging.snapshot_path, CONFIG)
+        manifest.begin()
+        file_path = write_table(staging, 'categories')
+        manifest.record_table('categories', {'table': 'categories', 'rows': 3}, [file_path])
+
+        write_table(staging, 'categories', rows=2)
+        resumed = reopen(staging)
+
+        assert resumed.completed_table('categories') is None
+        assert 'categories' not in json.loads((staging.snapshot_path / PROGRESS_FILE).read_text())['tables']
+
+    def test_other_options_start_over(self, staging):
+        """TC-192: Resume với option khác (vd: format) không dùng manifest cũ"""
+        manifest = ProgressManifest(staging.snapshot_path, CONFIG)
+        manifest.begin()
+        file_path = write_table(staging, 'categories')
+        manifest.record_table('categories', {'table': 'categories', 'rows': 3}, [file_path])
+
+        assert reopen(staging, {**CONFIG, 'output_format': 'csv'}).completed_table('categories') is None
+
+    def test_consistent_snapshot_not_mixed(self, tmp_path):
+        """TC-296: --resume không nối tiếp snapshot --consistent, config ghi lại consistent"""
+        with pytest.raises(ValueError, match="--consistent"):
+            IngestPipeline(staging_path=str(tmp_path), consistent=True, resume=True)
+
+        consistent = IngestPipeline(staging_path=str(tmp_path), consistent=True)
+        plain = IngestPipeline(staging_path=str(tmp_path), resume=True)
+        assert consistent.progress.config['consistent'] is True
+        assert consistent.progress.config != plain.progress.config
+
+    def test_fresh_run_discards_manifest(self, staging):
+        """TC-193: Chạy lại không có --resume -> export lại mọi table"""
+        manifest = ProgressManifest(staging.snapshot_path, CONFIG)
+        manifest.begin()
+        file_path = write_table(staging, 'categories')
+        manifest.record_table('categories', {'table': 'categories', 'rows': 3}, [file_path])
+
+        fresh = ProgressManifest(staging.snapshot_path, CONFIG)
+        fresh.begin(resume=False)
+        assert fresh.completed_table('categories') is None
+
+
+# ============================================================================
+# TEST CLASS 2: PART CHECKPOINT
+# ============================================================================
+
+class TestPartCheckpoint:
+    """
+    💡 GIẢI THÍCH:
+    Table chia khoảng id được checkpoint theo từng part, resume giữ nguyên
+    id_ranges để part đã xong vẫn khớp.
+    """
+
+    def test_parts_and_ranges_survive_restart(self, staging):
+        """TC-194: Part 0 xong, part 1 dở -> resume giữ part 0 và id_ranges"""
+        manifest = ProgressManifest(staging.snapshot_path, CONFIG)
+        manifest.begin()
+        manifest.start_table('orders', [(1, 100), (101, None)])
+        part_file = write_table(staging, 'orders', part=0)
+        manifest.record_part('orders', 0, {'rows': 3, 'file': part_file}, staging.get_part_files('orders', 0))
+
+        resumed = reopen(staging)
+        assert resumed.has_parts('orders')
+        assert resumed.table_ranges('orders') == [[1, 100], [101, None]]
+        assert resumed.completed_part('orders', 0)['rows'] == 3
+        assert resumed.completed_part('orders', 1) is None
+
+        # Cùng id_ranges -> không mất part đã xong
+        resumed.start_table('orders', [[1, 100], [101, None]])
+        assert resumed.completed_part('orders', 0) is not None
+
+    def test_clear_part_keeps_other_parts(self, staging):
+        """TC-195: clear_part chỉ xóa file (và file tạm) của đúng part đó"""
+        write_table(staging, 'orders', part=0)
+        write_table(staging, 'orders', part=1)
+        (staging.snapshot_path / 'orders' / '.part-00001.parquet.tmp').write_bytes(b'partial')
+
+        staging.clear_part('orders', 1)
+
+        assert [f.name for f in (staging.snapshot_path / 'orders').iterdir()] == ['part-00000.parquet']
+
+    def test_writer_only_publishes_on_close(self, staging):
+        """TC-196: File đích chỉ xuất hiện sau close(), lỗi giữa chừng không để lại gì"""
+        df = pd.DataFrame({'id': [1, 2]})
+        writer = staging.open_writer('orders', 'csv')
+        writer.write(df)
+        assert not writer.file_path.exists()
+        assert staging.get_table_files('orders') == []
+        writer.close()
+        assert staging.count_rows('orders') == 2
+
+        with pytest.raises(RuntimeError):
+            with staging.open_writer('customers', 'parquet') as failing:
+                failing.write(df)
+                raise RuntimeError("simulated crash")
+        assert list(staging.snapshot_path.glob('*customers*')) == []
@@ -0,0 +1,200 @@
+"""
+===============================================================================
+FILE: test_delta_store.py
+PURPOSE: Unit tests cho delta snapshot storage (base + delta, tái dựng, compaction)
+AUTHOR: QC/QA Team
+VERSION: 1.0
+
+HƯỚNG DẪN SỬ DỤNG:
+    pytest tests/unit/test_delta_store.py -v
+===============================================================================
+"""
+
+from datetime import date
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.ingestion.delta_store import DeltaSnapshotStore, DeltaTableWriter, OP_COLUMN
+
+
+SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('status', pa.string()),
+    ('total_amount', pa.float64()),
+])
+
+DAY_1, DAY_2, DAY_3 = date(2024, 1, 1), date(2024, 1, 2), date(2024, 1, 3)
+
+
+def make_orders(rows) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=['id', 'status', 'total_amount'])
+
+
+def write_day(store: DeltaSnapshotStore, day: date, df: pd.DataFrame, chunk_size: int = 2) -> dict:
+    """Ghi một ngày (base hoặc delta tùy plan) theo chunk và commit"""
+    plan = store.plan(day)
+    previous = store.load_hashes(plan['previous'], 'orders') if plan['kind'] == 'delta' else None
+    snapshot_path = store.snapshot_path(day)
+    snapshot_path.mkdir(parents=True, exist_ok=True)
+
+    with DeltaTableWriter(snapshot_path, 'orders', SCHEMA, previous) as writer:
+        for start in range(0, len(df), chunk_size):
+            writer.write(df.iloc[start:start + chunk_size])
+
+    store.commit(day, plan['kind'])
+    return writer.stats
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DeltaSnapshotStore(tmp_path / 'delta')
+
+
+DAY_1_ROWS = make_orders([(1, 'Pending', 10.0), (2, 'Pending', 20.0), (3, 'Pending', 30.0)])
+# Ngày 2: order 2 đổi status, order 3 bị xóa, order 4 mới
+DAY_2_ROWS = make_orders([(1, 'Pending', 10.0), (2, 'Delivered', 20.0), (4, 'Pending', 40.0)])
+
+
+# ============================================================================
+# TEST CLASS 1: BASE + DELTA
+# ============================================================================
+
+class TestDeltaWrite:
+    """
+    💡 GIẢI THÍCH:
+    Ngày đầu ghi base, các ngày sau chỉ ghi rows thay đổi theo id.
+    """
+
+    def test_first_day_is_base(self, store):
+        """TC-170: Chưa có gì -> base chứa toàn bộ rows"""
+        stats = write_day(store, DAY_1, DAY_1_ROWS)
+
+        assert stats['insert'] == 3
+        assert store.chains == [{'base': '2024-01-01', 'deltas': []}]
+        assert pq.read_table(store.snapshot_path(DAY_1) / 'orders.parquet').num_rows == 3
+
+    def test_delta_keeps_only_changes(self, store):
+        """TC-171: Delta chỉ chứa insert/update/delete"""
+        write_day(store, DAY_1, DAY_1_ROWS)
+        stats = write_day(store, DAY_2, DAY_2_ROWS)
+
+        assert stats == {'insert': 1, 'update': 1, 'delete': 1, 'unchanged': 1}
+        delta = pq.read_table(store.snapshot_path(DAY_2) / 'orders.parquet').to_pandas()
+        assert dict(zip(delta['id'], delta[OP_COLUMN])) == {2: 'update', 4: 'insert', 3: 'delete'}
+
+    def test_reconstruct_any_date(self, store):
+        """TC-172: Tái dựng ngày 1 và ngày 2 đúng như source"""
+        write_day(store, DAY_1, DAY_1_ROWS)
+        write_day(store, DAY_2, DAY_2_ROWS)
+
+        pd.testing.assert_frame_equal(store.read_table('orders', DAY_1), DAY_1_ROWS)
+        pd.testing.assert_frame_equal(store.read_table('orders', DAY_2), DAY_2_ROWS)
+        # Ngày chưa có snapshot: lấy ngày gần nhất trước đó
+        assert store.count_rows('orders', DAY_3) == 3
+        assert store.count_rows('orders', date(2023, 12, 31)) is None
+
+    def test_rerun_latest_day_diffs_against_previous(self, store):
+        """TC-173: Chạy lại ngày cuối vẫn so với ngày trước, ngày cũ hơn bị từ chối"""
+        write_day(store, DAY_1, DAY_1_ROWS)
+        write_day(store, DAY_2, DAY_2_ROWS)
+
+        assert store.plan(DAY_2) == {'kind': 'delta', 'previous': '2024-01-01'}
+        stats = write_day(store, DAY_2, DAY_2_ROWS)
+        assert stats['delete'] == 1
+        assert store.chains[-1]['deltas'] == ['2024-01-02']
+
+        with pytest.raises(ValueError):
+            store.plan(DAY_1)
+
+    def test_new_base_after_compact_every(self, tmp_path):
+        """TC-174: Chain đủ compact_every delta -> lần sau ghi base mới"""
+        store = DeltaSnapshotStore(tmp_path / 'delta', compact_every=1)
+        write_day(store, DAY_1, DAY_1_ROWS)
+        write_day(store, DAY_2, DAY_2_ROWS)
+
+        assert store.plan(DAY_3) == {'kind': 'base', 'previous': None}
+
+
+# ============================================================================
+# TEST CLASS 2: COMPACTION
+# ============================================================================
+
+class TestCompaction:
+    """
+    💡 GIẢI THÍCH:
+    compact() gộp base + delta thành base mới mà không đổi dữ liệu tái dựng.
+    """
+
+    def test_compact_latest_into_base(self, store):
+        """TC-175: Ngày cuối thành base, ngày cũ vẫn tái dựng được"""
+        write_day(store, DAY_1, DAY_1_ROWS)
+        write_day(store, DAY_2, DAY_2_ROWS)
+
+        assert store.compact() == '2024-01-02'
+        assert store.chains == [
+            {'base': '2024-01-01', 'deltas': []},
+            {'base': '2024-01-02', 'deltas': []},
+        ]
+        base = pq.read_table(store.snapshot_path(DAY_2) / 'orders.parquet')
+        assert OP_COLUMN not in base.schema.names
+        pd.testing.assert_frame_equal(store.read_table('orders', DAY_2), DAY_2_ROWS)
+        pd.testing.assert_frame_equal(store.read_table('orders', DAY_1), DAY_1_ROWS)
+
+    def test_deltas_after_new_base_still_apply(self, store):
+        """TC-176: Compact giữa chain, delta sau đó áp lên base mới; drop_history xóa chain cũ"""
+        day_3_rows = make_orders([(1, 'Cancelled', 10.0), (4, 'Pending', 40.0)])
+        write_day(store, DAY_1, DAY_1_ROWS)
+        write_day(store, DAY_2, DAY_2_ROWS)
+        write_day(store, DAY_3, day_3_rows)
+
+        store.compact(DAY_2, drop_history=True)
+
+        assert store.chains == [{'base': '2024-01-02', 'deltas': ['2024-01-03']}]
+        assert not store.snapshot_path(DAY_1).exists()
+        pd.testing.assert_frame_equal(store.read_table('orders', DAY_3), day_3_rows)
+        # Delta tiếp theo vẫn so được với ngày cuối
+        assert store.plan(date(2024, 1, 4)) == {'kind': 'delta', 'previous': '2024-01-03'}
+
+    def test_compact_uses_table_parquet_options(self, tmp_path):
+        """TC-301: Base sau compact dùng layout Parquet của table, không hard-code zstd"""
+        options = {'compression': 'lz4', 'compression_level': None, 'use_dictionary': False}
+        store = DeltaSnapshotStore(tmp_path / 'delta', parquet_options=lambda table: options)
+        write_day(store, DAY_1, DAY_1_ROWS)
+        write_day(store, DAY_2, DAY_2_ROWS)
+
+        store.compact()
+
+        column = pq.ParquetFile(store.snapshot_path(DAY_2) / 'orders.parquet').metadata.row_group(0).column(1)
+        assert column.compression == 'LZ4'
+        assert not column.has_dictionary_page
+
+    @pytest.mark.parametrize('crash_after', ['rename', 'save'])
+    def test_interrupted_compact_recovers_on_open(self, tmp_path, monkeypatch, crash_after):
+        """TC-302: Compact dừng trước / sau khi ghi manifest -> mở lại store vẫn đọc đúng, không còn thư mục tạm"""
+        store = DeltaSnapshotStore(tmp_path / 'delta')
+        write_day(store, DAY_1, DAY_1_ROWS)
+        write_day(store, DAY_2, DAY_2_ROWS)
+
+        def crash(*args, **kwargs):
+            raise KeyboardInterrupt
+        if crash_after == 'rename':
+            monkeypatch.setattr(store, '_save', crash)
+        else:
+            monkeypatch.setattr('src.ingestion.delta_store.shutil.rmtree', crash)
+        with pytest.raises(KeyboardInterrupt):
+            store.compact()
+        monkeypatch.undo()
+        assert (tmp_path / 'delta' / '.old-2024-01-02').exists()
+
+        reopened = DeltaSnapshotStore(tmp_path / 'delta')
+        expected_chains = {
+            'rename': [{'base': '2024-01-01', 'deltas': ['2024-01-02']}],
+            'save': [{'base': '2024-01-01', 'deltas': []}, {'base': '2024-01-02', 'deltas': []}],
+        }[crash_after]
+        assert reopened.chains == expected_chains
+        assert not list((tmp_path / 'delta').glob('.*-2024-01-02'))
+        pd.testing.assert_frame_equal(reopened.read_table('orders', DAY_2), DAY_2_ROWS)
+        pd.testing.assert_frame_equal(reopened.read_table('orders', DAY_1), DAY_1_ROWS)
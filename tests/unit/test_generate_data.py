@@ -0,0 +1,455 @@
+"""
+===============================================================================
+FILE: test_generate_data.py
+PURPOSE: Unit tests cho các generator vectorized, Faker value pool, sinh sharded và COPY loader - không cần database
+AUTHOR: QC/QA Team
+VERSION: 1.0
+
+HƯỚNG DẪN SỬ DỤNG:
+    pytest tests/unit/test_generate_data.py -v
+===============================================================================
+"""
+
+import csv
+import io
+import sys
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / 'scripts' / 'data_generation'))
+
+from generate_data import (  # noqa: E402
+    BaseGenerator, CustomerGenerator, DataConfig, DatabaseConnection, DataFrameCsvStream, InvoiceGenerator,
+    OrderGenerator, PaymentGenerator, ProductGenerator, ShardedGeneration, shard_ranges, shard_seed,
+)
+
+
+CUSTOMER_IDS = list(range(1, 501))
+PRODUCT_DATA = pd.DataFrame({
+    'id': np.arange(101, 151),
+    'unit_price': np.arange(1, 51) * 10_000.0,
+})
+
+# Các cột phụ thuộc datetime.now() không so sánh được giữa 2 lần chạy
+VOLATILE_COLUMNS = ['updated_at', 'created_at']
+
+
+def make_config(num_orders: int, pool_cache_dir: str = '') -> DataConfig:
+    config = DataConfig()
+    config.NUM_ORDERS = num_orders
+    config.FAKER_POOL_SIZE = 50
+    config.FAKER_POOL_CACHE_DIR = pool_cache_dir  # Mặc định tắt cache trên đĩa
+    return config
+
+
+def generate(num_orders: int, engine: str = 'numpy', seed: int = 42) -> tuple:
+    generator = OrderGenerator(make_config(num_orders), CUSTOMER_IDS, PRODUCT_DATA, seed=seed, engine=engine)
+    return generator.generate()
+
+
+# ============================================================================
+# TEST CLASS 1: NUMPY ENGINE
+# ============================================================================
+
+class TestNumpyOrderEngine:
+    """
+    💡 GIẢI THÍCH:
+    Engine numpy phải cho cùng schema, cùng phân bố với engine python
+    và reproduce được theo seed.
+    """
+
+    def test_same_seed_same_data(self):
+        """TC-270: Cùng seed -> cùng dữ liệu; khác seed -> khác dữ liệu"""
+        orders_a, items_a = generate(2000)
+        orders_b, items_b = generate(2000)
+        orders_c, _ = generate(2000, seed=7)
+
+        pd.testing.assert_frame_equal(orders_a.drop(columns=VOLATILE_COLUMNS), orders_b.drop(columns=VOLATILE_COLUMNS))
+        pd.testing.assert_frame_equal(items_a.drop(columns='created_at'), items_b.drop(columns='created_at'))
+        assert not orders_a['customer_id'].equals(orders_c['customer_id'])
+
+    def test_schema_matches_python_engine(self):
+        """TC-271: Cùng tên cột, thứ tự cột và kiểu order_date (date) với engine python"""
+        orders_py, items_py = generate(200, engine='python')
+        orders_np, items_np = generate(200)
+
+        assert list(orders_np.columns) == list(orders_py.columns)
+        assert list(items_np.columns) == list(items_py.columns)
+        assert isinstance(orders_np['order_date'].iloc[0], date)
+        assert orders_np['order_number'].iloc[0] == 'ORD-2024-000001'
+        assert orders_np['created_at'].equals(orders_np['order_timestamp'])
+
+    def test_items_unique_and_totals_consistent(self):
+        """TC-272: Không trùng product trong một order; subtotal/total khớp với items"""
+        orders, items = generate(5000)
+
+        assert not items.duplicated(['order_id', 'product_id']).any()
+        assert items['product_id'].isin(PRODUCT_DATA['id']).all()
+        assert items.groupby('order_id').size().between(1, 5).all()
+
+        subtotals = items.groupby('order_id')['line_total'].sum().round(2)
+        np.testing.assert_allclose(orders['subtotal'].to_numpy(), subtotals.to_numpy(), atol=0.01)
+        expected_total = (
+            orders['subtotal'] - orders['discount_amount'] + orders['tax_amount'] + orders['shipping_fee']
+        )
+        np.testing.assert_allclose(orders['total_amount'], expected_total, atol=0.05)
+
+    def test_distributions_follow_config(self):
+        """TC-273: Status, channel, số items, Pareto và seasonality bám theo DataConfig"""
+        orders, items = generate(40_000)
+
+        status_share = orders['status'].value_counts(normalize=True)
+        for status, weight in OrderGenerator.STATUS_WEIGHTS.items():
+            assert status_share[status] == pytest.approx(weight, abs=0.01)
+
+        channel_share = orders['channel'].value_counts(normalize=True)
+        for channel, weight in DataConfig.SALES_CHANNELS.items():
+            assert channel_share[channel] == pytest.approx(weight, abs=0.01)
+
+        expected_items = sum(k * w for k, w in OrderGenerator.ITEM_COUNT_WEIGHTS.items())
+        assert len(items) / len(orders) == pytest.approx(expected_items, rel=0.02)
+
+        # Pareto: product đầu danh sách được bán nhiều nhất
+        assert items['product_id'].value_counts().index[0] == PRODUCT_DATA['id'].iloc[0]
+
+        # Seasonality: tháng 12 (1.8) nhiều đơn hơn tháng 1 (0.7)
+        months = pd.Series([d.month for d in orders['order_date']]).value_counts()
+        assert months[12] > 2 * months[1]
+
+    def test_rejects_unknown_engine(self):
+        """TC-274: Engine không hỗ trợ -> ValueError"""
+        with pytest.raises(ValueError, match="Unsupported order engine"):
+            OrderGenerator(make_config(10), CUSTOMER_IDS, PRODUCT_DATA, engine='polars')
+
+
+# ============================================================================
+# TEST CLASS 2: PAYMENTS & INVOICES
+# ============================================================================
+
+class TestPaymentInvoiceGenerators:
+    """
+    💡 GIẢI THÍCH:
+    Payments/invoices được sinh bằng mask theo status và merge theo order_id
+    (không iterrows); quy tắc nghiệp vụ và tỷ lệ sai lệch giữ nguyên.
+    """
+
+    @pytest.fixture(scope='class')
+    def orders(self):
+        return generate(20_000)
+
+    def test_payment_status_rules(self, orders):
+        """TC-275: Payment status và việc có/không có payment theo order status"""
+        orders_df, _ = orders
+        payments = PaymentGenerator(make_config(0), orders_df).generate()
+        order_status = orders_df['status'].to_numpy()[payments['order_id'] - 1]
+
+        expected = {
+            'Completed': {'Completed'}, 'Delivered': {'Completed'}, 'Shipped': {'Completed'},
+            'Processing': {'Completed', 'Processing'}, 'Pending': {'Pending'},
+            'Cancelled': {'Failed'}, 'Refunded': {'Refunded'},
+        }
+        for status, allowed in expected.items():
+            assert set(payments['status'][order_status == status]) == allowed
+
+        # Pending: ~50% có payment, Cancelled: ~70% có payment
+        counts = orders_df['status'].value_counts()
+        paid = pd.Series(order_status).value_counts()
+        assert paid['Pending'] / counts['Pending'] == pytest.approx(0.5, abs=0.05)
+        assert paid['Cancelled'] / counts['Cancelled'] == pytest.approx(0.7, abs=0.05)
+
+        # Chỉ payment Completed có paid_at; COD không có gateway/transaction_ref
+        assert payments['paid_at'].notna().equals(payments['status'] == 'Completed')
+        cod = payments['payment_method'] == 'COD'
+        assert payments.loc[cod, 'transaction_ref'].isna().all()
+        assert payments.loc[~cod, 'transaction_ref'].str.len().eq(20).all()
+
+    def test_payment_amount_variance(self, orders):
+        """TC-276: ~5% payments lệch order total trong khoảng ±10%"""
+        orders_df, _ = orders
+        payments = PaymentGenerator(make_config(0), orders_df).generate()
+        order_total = orders_df['total_amount'].to_numpy()[payments['order_id'] - 1]
+
+        differs = payments['amount'].to_numpy() != order_total
+        assert differs.mean() == pytest.approx(PaymentGenerator.AMOUNT_VARIANCE_RATE, abs=0.01)
+        ratio = payments['amount'].to_numpy()[differs] / order_total[differs]
+        assert ((ratio > 0.899) & (ratio < 1.101)).all()
+
+    def test_invoices_join_order_items(self, orders):
+        """TC-277: Invoice cho order Completed/Delivered; items khớp order_items; ~3% adjustment"""
+        orders_df, items_df = orders
+        invoices, invoice_items = InvoiceGenerator(make_config(0), orders_df, items_df).generate()
+
+        completed = orders_df['status'].isin(['Completed', 'Delivered'])
+        assert invoices['order_id'].tolist() == (orders_df.index[completed] + 1).tolist()
+        assert invoices['accounting_period'].tolist() == [d.strftime('%Y-%m') for d in invoices['invoice_date']]
+
+        # Mỗi invoice có đúng các items của order tương ứng, cùng thứ tự
+        expected = items_df[items_df['order_id'].isin(invoices['order_id'])]
+        assert len(invoice_items) == len(expected)
+        assert invoice_items['product_id'].tolist() == expected['product_id'].tolist()
+        invoice_order = invoices['order_id'].to_numpy()[invoice_items['invoice_id'] - 1]
+        assert (invoice_order == expected['order_id'].to_numpy()).all()
+
+        adjusted = invoices['subtotal'].to_numpy() != orders_df['subtotal'].to_numpy()[invoices['order_id'] - 1]
+        assert adjusted.mean() == pytest.approx(InvoiceGenerator.ADJUSTMENT_RATE, abs=0.01)
+        np.testing.assert_allclose(
+            invoices['tax_amount'][adjusted], (invoices['subtotal'][adjusted] * 0.10).round(2)
+        )
+
+
+# ============================================================================
+# TEST CLASS 3: FAKER VALUE POOLS
+# ============================================================================
+
+class TestFakerValuePools:
+    """
+    💡 GIẢI THÍCH:
+    Pool là hàm thuần của (locale, seed, provider, size): cache trên đĩa
+    chỉ được sinh một lần và dùng lại; cột unique vẫn unique.
+    """
+
+    def test_pool_unique_and_deterministic(self):
+        """TC-278: Pool không có giá trị trùng; cùng seed -> cùng pool, khác seed -> khác pool"""
+        pool = BaseGenerator(make_config(0)).value_pool('phone_number')
+        assert len(pool) == 50
+        assert len(set(pool)) == len(pool)
+
+        assert list(BaseGenerator(make_config(0)).value_pool('phone_number')) == list(pool)
+        assert list(BaseGenerator(make_config(0), seed=7).value_pool('phone_number')) != list(pool)
+
+        # Provider ít giá trị khác nhau -> pool nhỏ hơn size, không lặp vô hạn
+        domains = BaseGenerator(make_config(0)).value_pool('free_email_domain')
+        assert 0 < len(domains) < 50
+        assert len(set(domains)) == len(domains)
+
+    def test_pool_cached_on_disk(self, tmp_path, monkeypatch):
+        """TC-279: Pool được ghi cache theo locale + seed và load lại không cần gọi Faker"""
+        config = make_config(0, pool_cache_dir=str(tmp_path))
+        pool = BaseGenerator(config).value_pool('text', max_nb_chars=200)
+
+        cache_files = [p.name for p in tmp_path.iterdir()]
+        assert cache_files == ['vi_VN+en_US_seed42_text_max_nb_chars=200_50.json']
+
+        def no_faker(*args, **kwargs):
+            raise AssertionError("pool should come from the disk cache")
+
+        # Xóa pool đã load trong process để buộc đọc lại từ cache trên đĩa
+        monkeypatch.setattr(BaseGenerator, '_pool_cache', {})
+        monkeypatch.setattr(BaseGenerator, '_build_pool', no_faker)
+        assert list(BaseGenerator(config).value_pool('text', max_nb_chars=200)) == list(pool)
+
+    def test_customers_and_products_from_pools(self):
+        """TC-280: email/customer_code/sku unique; dữ liệu reproduce theo seed"""
+        config = make_config(0)
+        config.NUM_CUSTOMERS = 3000
+        config.NUM_PRODUCTS = 500
+
+        customers = CustomerGenerator(config).generate()
+        assert customers['email'].is_unique
+        assert customers['customer_code'].is_unique
+        assert customers['email'].iloc[0].startswith('customer1@')
+        assert customers['phone'].str.len().le(20).all()
+        assert CustomerGenerator(config).generate()['last_name'].equals(customers['last_name'])
+
+        products = ProductGenerator(config, [1, 2, 3]).generate()
+        assert products['sku'].is_unique
+        assert products['sku'].iloc[0] == 'SKU-000001'
+        assert products['unit_price'].between(50_000, 50_000_000).all()
+        assert (products['cost_price'] < products['unit_price']).all()
+
+
+# ============================================================================
+# TEST CLASS 4: SHARDED GENERATION
+# ============================================================================
+
+def run_sharded(workers: int, engine: str = 'numpy') -> list:
+    """Sinh mọi bảng sharded, trả về list DataFrame (bỏ các cột datetime.now())"""
+    config = make_config(2_500)
+    config.NUM_CUSTOMERS = 1_200
+    config.SHARD_SIZE = 500
+
+    with ShardedGeneration(config, seed=42, workers=workers, order_engine=engine) as sharded:
+        customers = sharded.customers()
+        orders, items = sharded.orders(CUSTOMER_IDS, PRODUCT_DATA)
+        payments = sharded.payments(orders)
+        invoices, invoice_items = sharded.invoices(orders, items)
+
+    return [
+        customers.drop(columns='updated_at'),
+        orders.drop(columns='updated_at'),
+        items.drop(columns='created_at'),
+        payments.drop(columns='updated_at'),
+        invoices.drop(columns='updated_at'),
+        invoice_items.drop(columns='created_at'),
+    ]
+
+
+class TestShardedGeneration:
+    """
+    💡 GIẢI THÍCH:
+    Layout shard chỉ phụ thuộc SHARD_SIZE và seed, nên output phải giống
+    hệt nhau dù chạy tuần tự hay trên process pool.
+    """
+
+    def test_shard_ranges_and_seeds(self):
+        """TC-281: Shard liên tiếp phủ đủ range; seed khác nhau theo bảng và shard, cố định theo base seed"""
+        assert shard_ranges(5, 2) == [(0, 2), (2, 4), (4, 5)]
+        assert shard_ranges(0, 2) == []
+
+        seeds = {shard_seed(42, table, index) for table in ['customers', 'orders'] for index in range(3)}
+        assert len(seeds) == 6
+        assert shard_seed(42, 'orders', 1) == shard_seed(42, 'orders', 1)
+        assert shard_seed(42, 'orders', 1) != shard_seed(43, 'orders', 1)
+
+    def test_output_independent_of_workers(self):
+        """TC-282: --workers 1 và --workers 3 cho output giống hệt nhau"""
+        for sequential, parallel in zip(run_sharded(workers=1), run_sharded(workers=3)):
+            pd.testing.assert_frame_equal(sequential, parallel)
+
+    def test_ids_continuous_across_shards(self):
+        """TC-283: ID/mã liên tục và unique qua các shard; invoice_items trỏ đúng invoice"""
+        customers, orders, items, payments, invoices, invoice_items = run_sharded(workers=1)
+
+        assert customers['customer_code'].tolist()[-1] == 'CUST-2024-001200'
+        assert customers['email'].is_unique
+        assert orders['order_number'].tolist() == [f'ORD-2024-{i:06d}' for i in range(1, len(orders) + 1)]
+        assert items['order_id'].between(1, len(orders)).all()
+        assert payments['payment_code'].is_unique
+        assert invoices['invoice_number'].tolist()[-1] == f'INV-2024-{len(invoices):06d}'
+
+        # Tổng số orders không bị hụt vì chia shard (ngày được phân bổ một lần)
+        assert len(orders) == 2_500
+
+        expected = items[items['order_id'].isin(invoices['order_id'])]
+        invoice_order = invoices['order_id'].to_numpy()[invoice_items['invoice_id'] - 1]
+        assert (invoice_order == expected['order_id'].to_numpy()).all()
+
+
+# ============================================================================
+# TEST CLASS 5: COPY LOADER
+# ============================================================================
+
+class FakeCursor:
+    """Cursor psycopg2 tối thiểu: trả index/trigger từ catalog, đọc hết stream COPY"""
+
+    def __init__(self, indexes, triggers, fail_copy=False):
+        self.catalog = [indexes, triggers]
+        self.fail_copy = fail_copy
+        self.statements = []
+        self.copied = None
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+    def fetchall(self):
+        return self.catalog.pop(0)
+
+    def copy_expert(self, sql, file_obj):
+        self.statements.append(sql)
+        if self.fail_copy:
+            raise RuntimeError("COPY failed")
+        chunks = []
+        while True:
+            data = file_obj.read(8)
+            if not data:
+                break
+            chunks.append(data)
+        self.copied = ''.join(chunks)
+
+    def close(self):
+        pass
+
+
+class FakeRawConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.committed = False
+        self.rolled_back = False
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        self.rolled_back = True
+
+    def close(self):
+        pass
+
+
+def fake_db(cursor, **kwargs) -> tuple:
+    db = DatabaseConnection(loader='copy', **kwargs)
+    conn = FakeRawConnection(cursor)
+    db.engine = type('FakeEngine', (), {'raw_connection': lambda self: conn})()
+    return db, conn
+
+
+LOAD_DF = pd.DataFrame({
+    'id': [1, 2, 3],
+    'note': ['multi\nline, "quoted"', None, ''],
+    'amount': [1.5, np.nan, 2.0],
+    'paid_at': [pd.Timestamp('2024-01-01 10:00:00'), pd.NaT, pd.Timestamp('2024-01-02 11:30:00')],
+})
+
+
+class TestCopyLoader:
+    """
+    💡 GIẢI THÍCH:
+    COPY loader stream DataFrame dạng CSV theo chunk; NULL (NaN/NaT/None)
+    thành COPY_NULL, chuỗi rỗng giữ nguyên; index/trigger được tạo lại sau COPY.
+    """
+
+    def test_csv_stream_nulls_and_chunks(self):
+        """TC-284: NaN/NaT/None -> \\N, chuỗi rỗng/xuống dòng/quote giữ nguyên; chia chunk không đổi nội dung"""
+        chunked = DataFrameCsvStream(LOAD_DF, chunk_rows=1)
+        parts = []
+        while True:
+            data = chunked.read(5)
+            if not data:
+                break
+            parts.append(data)
+        text = ''.join(parts)
+
+        assert text == DataFrameCsvStream(LOAD_DF, chunk_rows=100).read()
+        rows = list(csv.reader(io.StringIO(text)))
+        assert rows[0][1] == 'multi\nline, "quoted"'
+        assert rows[1] == ['2', DataConfig.COPY_NULL, DataConfig.COPY_NULL, DataConfig.COPY_NULL]
+        assert rows[2][1] == ''
+        assert DataFrameCsvStream(LOAD_DF.head(0)).read() == ''
+
+    def test_copy_rebuilds_indexes_and_triggers(self):
+        """TC-285: Drop index/trigger -> COPY -> tạo lại, trong cùng một transaction"""
+        indexes = [('idx_orders_status', 'CREATE INDEX idx_orders_status ON ecommerce.orders USING btree (status)')]
+        triggers = [('trg_orders_updated_at', 'CREATE TRIGGER trg_orders_updated_at BEFORE UPDATE ON ecommerce.orders')]
+        cursor = FakeCursor(indexes, triggers)
+        db, conn = fake_db(cursor, rebuild_indexes=True)
+
+        db.load_dataframe(LOAD_DF, 'orders')
+
+        ddl = [sql for sql in cursor.statements if not sql.lstrip().startswith('SELECT')]
+        assert ddl[0] == 'DROP INDEX ecommerce."idx_orders_status"'
+        assert ddl[1] == 'DROP TRIGGER "trg_orders_updated_at" ON ecommerce.orders'
+        assert ddl[2].startswith('COPY ecommerce.orders ("id", "note", "amount", "paid_at") FROM STDIN')
+        assert ddl[3:] == [indexes[0][1], triggers[0][1]]
+        assert cursor.copied.count('\n') >= len(LOAD_DF)
+        assert conn.committed and not conn.rolled_back
+
+    def test_copy_failure_rolls_back(self):
+        """TC-286: COPY lỗi -> rollback (index/trigger đã drop được khôi phục), không tạo lại thủ công"""
+        cursor = FakeCursor([('idx_a', 'CREATE INDEX idx_a ON ecommerce.orders (a)')], [], fail_copy=True)
+        db, conn = fake_db(cursor, rebuild_indexes=True)
+
+        with pytest.raises(RuntimeError, match="COPY failed"):
+            db.copy_dataframe(LOAD_DF, 'orders', rebuild_indexes=True)
+
+        assert conn.rolled_back and not conn.committed
+        assert 'CREATE INDEX idx_a ON ecommerce.orders (a)' not in cursor.statements
+
+        with pytest.raises(ValueError, match="Unsupported loader"):
+            DatabaseConnection(loader='bulk')
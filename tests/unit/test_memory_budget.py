@@ -0,0 +1,246 @@
+"""
+===============================================================================
+FILE: test_memory_budget.py
+PURPOSE: Unit tests cho --memory-budget (chunk size theo độ rộng row, backpressure)
+AUTHOR: QC/QA Team
+VERSION: 1.0
+
+HƯỚNG DẪN SỬ DỤNG:
+    pytest tests/unit/test_memory_budget.py -v
+===============================================================================
+"""
+
+import threading
+import tracemalloc
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from src.ingestion.export_to_staging import IngestPipeline, chunk_nbytes, get_rss_mb, group_batches
+from src.ingestion.memory_budget import MB, MemoryBudget
+
+
+# ============================================================================
+# TEST CLASS 1: CHUNK SIZE
+# ============================================================================
+
+class TestChunkRows:
+    """
+    💡 GIẢI THÍCH:
+    Chunk rows = phần budget của một reader / bytes mỗi row, kẹp trong
+    [min_chunk_rows, --chunk-size].
+    """
+
+    def test_scales_with_width_and_readers(self):
+        """TC-230: Row rộng gấp đôi hoặc reader gấp đôi -> chunk còn một nửa"""
+        budget = MemoryBudget(100, chunk_fraction=0.5, min_chunk_rows=10)
+
+        base = budget.chunk_rows('orders', 1_000, readers=1, max_rows=10**9)
+        assert base == int(50 * MB / 1_000)
+        assert budget.chunk_rows('orders', 2_000, readers=1, max_rows=10**9) == base // 2
+        assert budget.chunk_rows('orders', 1_000, readers=2, max_rows=10**9) == base // 2
+
+    def test_clamped(self):
+        """TC-231: Không vượt --chunk-size, không nhỏ hơn min_chunk_rows"""
+        budget = MemoryBudget(1, min_chunk_rows=1_000)
+
+        assert budget.chunk_rows('orders', 1, readers=1, max_rows=50_000) == 50_000
+        assert budget.chunk_rows('orders', 10 * MB, readers=8, max_rows=50_000) == 1_000
+        assert budget.table_stats('orders')['chunk_rows'] == 1_000
+
+    def test_invalid_budget(self):
+        """TC-232: Budget <= 0 bị từ chối"""
+        with pytest.raises(ValueError):
+            MemoryBudget(0)
+
+
+# ============================================================================
+# TEST CLASS 2: BACKPRESSURE
+# ============================================================================
+
+class TestBackpressure:
+    """
+    💡 GIẢI THÍCH:
+    Reader giữ chỗ trước khi fetch; budget đầy -> chờ tới khi reader khác trả chỗ.
+    """
+
+    def test_reader_waits_until_release(self):
+        """TC-233: Chunk thứ hai chờ tới khi chunk đầu được release"""
+        budget = MemoryBudget(1)
+        budget.acquire('orders', int(0.8 * MB))
+        acquired = threading.Event()
+
+        def second_reader():
+            budget.acquire('customers', int(0.5 * MB))
+            acquired.set()
+
+        thread = threading.Thread(target=second_reader)
+        thread.start()
+        assert not acquired.wait(0.2)
+
+        budget.release(int(0.8 * MB))
+        assert acquired.wait(5)
+        thread.join()
+
+        stats = budget.table_stats('customers')
+        assert stats['waits'] == 1
+        assert stats['wait_seconds'] > 0
+        assert budget.summary()['peak_reserved_mb'] == 0.8
+
+    def test_oversized_chunk_runs_alone(self):
+        """TC-234: Chunk lớn hơn cả budget vẫn chạy khi không ai giữ chỗ, non-blocking thì không"""
+        budget = MemoryBudget(1)
+
+        with budget.reserve('orders', 3 * MB):
+            assert not budget.acquire('customers', 1, blocking=False)
+        assert budget.reserved == 0
+        assert budget.acquire('customers', 1, blocking=False)
+
+    def test_budgeted_releases_on_error(self, tmp_path):
+        """TC-235: Chunk lỗi khi ghi -> chỗ đã giữ được trả lại, không kẹt reader khác"""
+        pipeline = IngestPipeline(staging_path=str(tmp_path), memory_budget=1)
+        pipeline.row_bytes['orders'] = 100.0
+        pipeline.chunk_rows['orders'] = 1_000
+        chunks = (pd.DataFrame({'id': range(start, start + 1_000)}) for start in range(0, 5_000, 1_000))
+
+        reserved = []
+        with pytest.raises(RuntimeError):
+            for chunk in pipeline._budgeted('orders', chunks):
+                reserved.append(pipeline.memory.reserved)
+                if len(reserved) == 3:
+                    raise RuntimeError("disk full")
+
+        # Chunk đầu giữ chỗ theo ước tính, các chunk sau theo bytes đo được (int64 = 8 bytes/row)
+        assert reserved[0] == 100_000
+        assert reserved[1] == reserved[2] < 100_000
+        assert pipeline.memory.reserved == 0
+        assert pipeline.memory.tables['orders']['peak_chunk_bytes'] > 0
+
+
+# ============================================================================
+# TEST CLASS 3: PIPELINE
+# ============================================================================
+
+class TestPipelineBudget:
+    """
+    💡 GIẢI THÍCH:
+    --memory-budget bật streaming, ghi số liệu vào metadata, và gom batch COPY theo chunk rows.
+    """
+
+    def test_options_and_metadata(self, tmp_path):
+        """TC-236: CDC bị từ chối; metadata có budget, export_mode là streaming"""
+        with pytest.raises(ValueError, match="memory-budget"):
+            IngestPipeline(staging_path=str(tmp_path), mode='cdc', memory_budget=256)
+
+        pipeline = IngestPipeline(staging_path=str(tmp_path), memory_budget=256)
+        metadata = pipeline._create_metadata(0.0)
+        assert metadata['memory_budget']['budget_mb'] == 256
+        assert metadata['export_mode'] == 'streaming'
+        assert IngestPipeline(staging_path=str(tmp_path))._create_metadata(0.0)['memory_budget'] is None
+
+    def test_group_batches_and_nbytes(self):
+        """TC-237: Batch nhỏ được gom thành Table ~rows rows; nbytes tính cả object str"""
+        batches = [pa.RecordBatch.from_pydict({'id': list(range(i * 10, i * 10 + 10))}) for i in range(5)]
+
+        grouped = list(group_batches(batches, 25))
+        assert [t.num_rows for t in grouped] == [30, 20]
+        assert pa.concat_tables(grouped).column('id').to_pylist() == list(range(50))
+
+        df = pd.DataFrame({'note': ['x' * 1_000] * 10})
+        assert chunk_nbytes(df) > 10_000
+        assert chunk_nbytes(grouped[0]) == grouped[0].nbytes
+
+    def test_rss_without_proc_or_resource(self, monkeypatch):
+        """TC-298: Không có /proc lẫn module resource (Windows) -> không lỗi, dùng tracemalloc"""
+        import builtins
+        import sys
+
+        real_open = builtins.open
+
+        def no_proc(file, *args, **kwargs):
+            if str(file).startswith('/proc/'):
+                raise OSError(file)
+            return real_open(file, *args, **kwargs)
+
+        monkeypatch.setattr(builtins, 'open', no_proc)
+        monkeypatch.setitem(sys.modules, 'resource', None)
+
+        assert get_rss_mb() == 0.0
+        tracemalloc.start()
+        try:
+            assert get_rss_mb() > 0
+        finally:
+            tracemalloc.stop()
+
+
+# ============================================================================
+# TEST CLASS 4: ROW GROUP BUFFER
+# ============================================================================
+
+class TestRowGroupBudget:
+    """
+    💡 GIẢI THÍCH:
+    Writer gom rows tới row_group_size sau khi chunk đã trả chỗ, nên
+    row_group_size bị giới hạn để buffer đang gom vừa phần budget ngoài chunk.
+    """
+
+    def test_row_group_rows(self):
+        """TC-290: Row group rows = phần budget ngoài chunk / (writers * bytes mỗi row), kẹp theo config"""
+        budget = MemoryBudget(100, chunk_fraction=0.5, min_chunk_rows=10)
+
+        assert budget.row_group_rows('orders', 1_000, writers=1, row_group_size=10**9) == int(50 * MB / 1_000)
+        assert budget.row_group_rows('orders', 1_000, writers=2, row_group_size=10**9) == int(25 * MB / 1_000)
+        assert budget.row_group_rows('orders', 1, writers=1, row_group_size=250_000) == 250_000
+        assert budget.table_stats('orders')['row_group_rows'] == 250_000
+
+    def test_pending_row_groups_fit_budget(self, tmp_path, monkeypatch):
+        """TC-291: Buffer của mọi Hive partition (row_group_size 250k) không vượt budget"""
+        pipeline = IngestPipeline(
+            tables=['orders'], output_format='parquet', staging_path=str(tmp_path),
+            workers=1, hive_partitions=True, memory_budget=1,
+        )
+        monkeypatch.setattr(pipeline.db, 'get_row_width', lambda *args, **kwargs: 100.0)
+        pipeline._plan_memory('orders')
+        pipeline.staging.setup()
+
+        options = pipeline._parquet_options('orders')
+        row_bytes = pipeline.row_bytes['orders']
+        writer_share = pipeline.memory.budget_bytes - pipeline.memory.chunk_bytes
+        # Không giới hạn: 12 tháng x 250k rows đang gom, vượt budget rất xa
+        assert 12 * 250_000 * row_bytes > pipeline.memory.budget_bytes
+        assert options['row_group_size'] < 250_000
+
+        schema = pa.schema([('id', pa.int64()), ('order_date', pa.date32())])
+        total = 0
+        with pipeline.staging.open_writer('orders', 'parquet', schema, None, options) as writer:
+            for chunk in range(30):
+                ids = list(range(total, total + 1_200))
+                dates = [pd.Timestamp(2024, i % 12 + 1, 10).date() for i in ids]
+                writer.write_arrow(pa.table({'id': ids, 'order_date': dates}, schema=schema))
+                total += len(ids)
+
+                pending = sum(w.pending_rows for w in writer._writers.values())
+                assert pending * row_bytes <= writer_share
+
+        assert len(writer._writers) == 12
+        assert sum(w.rows for w in writer._writers.values()) == total
+
+    def test_fingerprint_ignores_budget_sizes(self, tmp_path, monkeypatch):
+        """TC-299: Hai lần chạy có budget, row width đo khác nhau -> fingerprint (layout) không đổi"""
+        fingerprints = []
+        for width in (100.0, 140.0):
+            pipeline = IngestPipeline(
+                tables=['orders'], output_format='parquet', staging_path=str(tmp_path),
+                workers=1, memory_budget=1,
+            )
+            monkeypatch.setattr(pipeline.db, 'get_row_width', lambda *args, width=width, **kwargs: width)
+            monkeypatch.setattr(pipeline.db, 'get_table_fingerprint',
+                                lambda *args, **kwargs: {'rows': 10, 'max_updated_at': None, 'hash': '1'})
+            pipeline._plan_memory('orders')
+            fingerprints.append((pipeline._parquet_options('orders'), pipeline._table_fingerprint('orders')))
+
+        (first_options, first), (second_options, second) = fingerprints
+        assert first_options['row_group_size'] != second_options['row_group_size']
+        assert first == second
+        assert 'max_pending_rows' not in first['layout']['parquet']
@@ -0,0 +1,157 @@
+"""
+===============================================================================
+FILE: test_object_store.py
+PURPOSE: Unit tests cho S3/MinIO staging sink (multipart upload, key layout)
+AUTHOR: QC/QA Team
+VERSION: 1.0
+
+HƯỚNG DẪN SỬ DỤNG:
+    # Dùng moto giả lập S3 trong process, không cần MinIO
+    pytest tests/unit/test_object_store.py -v
+===============================================================================
+"""
+
+import os
+from datetime import date
+
+import pandas as pd
+import pytest
+
+moto = pytest.importorskip("moto")
+
+from src.ingestion.export_to_staging import IngestConfig, S3StagingLayer  # noqa: E402
+from src.ingestion.object_store import MIN_PART_SIZE, S3MultipartUpload, create_s3_client  # noqa: E402
+
+
+BUCKET = 'staging'
+
+
+@pytest.fixture
+def s3_client(monkeypatch):
+    """S3 client trỏ vào moto (in-process), bucket staging đã tạo sẵn"""
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    with moto.mock_aws():
+        client = create_s3_client(None, 'testing', 'testing')
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+@pytest.fixture
+def s3_staging(s3_client):
+    layer = S3StagingLayer(s3_client, BUCKET, date(2024, 1, 15), IngestConfig.HIVE_PARTITIONS, prefix='lake')
+    layer.setup()
+    return layer
+
+
+def make_orders(start_id: int, months) -> pd.DataFrame:
+    ids = list(range(start_id, start_id + len(months)))
+    return pd.DataFrame({
+        'id': ids,
+        'order_date': [date(2024, month, 10) for month in months],
+        'total_amount': [100.5 + i for i in ids],
+    })
+
+
+def keys(client, prefix: str = '') -> list:
+    return sorted(obj['Key'] for obj in client.list_objects_v2(Bucket=BUCKET, Prefix=prefix).get('Contents', []))
+
+
+# ============================================================================
+# TEST CLASS 1: MULTIPART UPLOAD
+# ============================================================================
+
+class TestMultipartUpload:
+    """
+    💡 GIẢI THÍCH:
+    Dữ liệu được chia part và upload song song; object chỉ xuất hiện khi complete.
+    """
+
+    def test_large_object_uses_parts(self, s3_client):
+        """TC-200: > part_size -> nhiều part, nội dung ghép đúng thứ tự"""
+        data = os.urandom(MIN_PART_SIZE * 2 + 123)
+        upload = S3MultipartUpload(s3_client, BUCKET, 'big.bin', MIN_PART_SIZE, max_concurrency=2)
+        for start in range(0, len(data), 1_000_000):
+            upload.write(data[start:start + 1_000_000])
+
+        assert keys(s3_client) == []
+        upload.close()
+
+        assert upload.parts == 3
+        assert s3_client.get_object(Bucket=BUCKET, Key='big.bin')['Body'].read() == data
+
+    def test_small_object_single_put(self, s3_client):
+        """TC-201: Nhỏ hơn 1 part -> put_object, không mở multipart"""
+        upload = S3MultipartUpload(s3_client, BUCKET, 'small.csv')
+        upload.write(b'id\n1\n')
+        upload.close()
+
+        assert upload.upload_id is None
+        assert s3_client.get_object(Bucket=BUCKET, Key='small.csv')['Body'].read() == b'id\n1\n'
+
+    def test_abort_leaves_nothing(self, s3_client):
+        """TC-202: abort() -> không có object, không còn multipart upload dở"""
+        upload = S3MultipartUpload(s3_client, BUCKET, 'aborted.bin', MIN_PART_SIZE)
+        upload.write(os.urandom(MIN_PART_SIZE + 1))
+        upload.abort()
+
+        assert keys(s3_client) == []
+        assert s3_client.list_multipart_uploads(Bucket=BUCKET).get('Uploads', []) == []
+
+    def test_part_size_minimum(self, s3_client):
+        """TC-203: part_size < 5 MiB bị từ chối"""
+        with pytest.raises(ValueError):
+            S3MultipartUpload(s3_client, BUCKET, 'x', part_size=1024)
+
+
+# ============================================================================
+# TEST CLASS 2: S3 STAGING LAYER
+# ============================================================================
+
+class TestS3StagingLayer:
+    """
+    💡 GIẢI THÍCH:
+    S3StagingLayer giữ nguyên key layout của local staging và interface đọc/ghi.
+    """
+
+    def test_hive_layout_keys(self, s3_client, s3_staging):
+        """TC-204: Hive partitions + part file cùng layout với local"""
+        with s3_staging.open_writer('orders', 'parquet', part=1) as writer:
+            writer.write(make_orders(1, [11, 11, 12]))
+
+        assert keys(s3_client) == [
+            'lake/snapshot_date=2024-01-15/orders/order_date_month=2024-11/part-00001.parquet',
+            'lake/snapshot_date=2024-01-15/orders/order_date_month=2024-12/part-00001.parquet',
+        ]
+        assert s3_staging.count_rows('orders') == 3
+        assert sorted(s3_staging.read_table('orders')['id']) == [1, 2, 3]
+        assert writer.parquet_layout()['row_groups'] == 2
+
+    def test_csv_and_single_file(self, s3_staging):
+        """TC-205: CSV streaming ghi header 1 lần, đọc lại như local"""
+        with s3_staging.open_writer('customers', 'csv') as writer:
+            writer.write(pd.DataFrame({'id': [1, 2], 'name': ['a', 'b']}))
+            writer.write(pd.DataFrame({'id': [3], 'name': ['c']}))
+
+        assert s3_staging.get_table_files('customers') == [s3_staging.get_table_path('customers', 'csv')]
+        assert s3_staging.read_table('customers')['id'].tolist() == [1, 2, 3]
+
+    def test_failed_writer_publishes_nothing(self, s3_client, s3_staging):
+        """TC-206: Lỗi giữa chừng -> không có object nào của table"""
+        with pytest.raises(RuntimeError):
+            with s3_staging.open_writer('orders', 'parquet') as writer:
+                writer.write(make_orders(1, [11]))
+                raise RuntimeError("simulated crash")
+
+        assert keys(s3_client) == []
+
+    def test_clear_table_and_success_marker(self, s3_client, s3_staging):
+        """TC-207: clear_table xóa part files; _SUCCESS ghi/xóa được"""
+        with s3_staging.open_writer('orders', 'parquet') as writer:
+            writer.write(make_orders(1, [11, 12]))
+        s3_staging.write_metadata({'tables': []})
+        s3_staging.write_success_marker()
+
+        s3_staging.clear_table('orders')
+        s3_staging.clear_success_marker()
+
+        assert keys(s3_client) == ['lake/snapshot_date=2024-01-15/_metadata.json']
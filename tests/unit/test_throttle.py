@@ -0,0 +1,146 @@
+"""
+===============================================================================
+FILE: test_throttle.py
+PURPOSE: Unit tests cho --throttle (giảm tốc export theo tải của source)
+AUTHOR: QC/QA Team
+VERSION: 1.0
+
+HƯỚNG DẪN SỬ DỤNG:
+    pytest tests/unit/test_throttle.py -v
+===============================================================================
+"""
+
+import threading
+
+import pytest
+
+from src.ingestion.export_to_staging import IngestPipeline
+from src.ingestion.throttle import SourceThrottle
+
+
+HIGH = {'active': 40, 'lock_waits': 0, 'latency_ms': 120.0}
+NORMAL = {'active': 10, 'lock_waits': 0, 'latency_ms': 20.0}
+IDLE = {'active': 1, 'lock_waits': 0, 'latency_ms': 2.0}
+
+
+def make_throttle(loads, **kwargs) -> SourceThrottle:
+    """Throttle lấy mẫu lần lượt từ `loads`, không chờ giữa hai lần lấy mẫu"""
+    samples = iter(loads)
+    kwargs.setdefault('max_readers', 8)
+    return SourceThrottle(lambda: next(samples), sample_seconds=0, pause_seconds=2.0, **kwargs)
+
+
+# ============================================================================
+# TEST CLASS 1: QUYẾT ĐỊNH (AIMD)
+# ============================================================================
+
+class TestThrottleDecisions:
+    """
+    💡 GIẢI THÍCH:
+    Source bận -> scale giảm một nửa (tối thiểu min_scale); rảnh -> tăng dần; bình thường -> giữ.
+    """
+
+    def test_backs_off_and_ramps_up(self):
+        """TC-240: high x4 chạm min_scale, normal giữ nguyên, idle tăng dần về 1.0"""
+        throttle = make_throttle([HIGH] * 4 + [NORMAL] + [IDLE] * 4, min_scale=0.125)
+        scales = []
+        for _ in range(9):
+            throttle.maybe_sample()
+            scales.append(throttle.scale)
+
+        assert scales == [0.5, 0.25, 0.125, 0.125, 0.125, 0.375, 0.625, 0.875, 1.0]
+        # Chỉ lần đổi scale mới được ghi vào decisions
+        assert [d['load'] for d in throttle.decisions] == ['high'] * 3 + ['idle'] * 4
+        assert throttle.summary()['samples'] == 9
+
+    def test_controls_follow_scale(self):
+        """TC-241: fetch size, số reader và pause theo scale hiện tại"""
+        throttle = make_throttle([HIGH, HIGH])
+        assert (throttle.fetch_rows(50_000), throttle.allowed_readers(), throttle.pause()) == (50_000, 8, 0)
+
+        throttle.maybe_sample()
+        throttle.maybe_sample()
+        assert throttle.fetch_rows(50_000) == 12_500
+        assert throttle.allowed_readers() == 2
+        assert throttle.pause() == 1.5
+        assert throttle.decisions[-1]['readers'] == 2
+
+    def test_lock_waits_and_failed_probe(self):
+        """TC-242: Nhiều backend chờ lock = source bận; probe lỗi không đổi scale, không raise"""
+        throttle = make_throttle([{**IDLE, 'lock_waits': 10}], max_lock_waits=5)
+        throttle.maybe_sample()
+        assert throttle.scale == 0.5
+
+        def broken_probe():
+            raise PermissionError("permission denied for pg_stat_activity")
+
+        throttle.probe = broken_probe
+        throttle.maybe_sample()
+        assert throttle.scale == 0.5
+        assert throttle.summary()['failed_samples'] == 1
+
+    def test_sample_interval(self):
+        """TC-243: Không lấy mẫu lại trước sample_seconds"""
+        calls = []
+        throttle = SourceThrottle(lambda: calls.append(1) or IDLE, max_readers=1, sample_seconds=3600)
+
+        throttle.maybe_sample()
+        throttle.maybe_sample()
+        assert len(calls) == 1
+        assert not throttle.sample_due()
+
+
+# ============================================================================
+# TEST CLASS 2: SLOT ĐỌC
+# ============================================================================
+
+class TestReaderSlots:
+    """
+    💡 GIẢI THÍCH:
+    Số FETCH cùng lúc bị giới hạn ở allowed_readers(); reader thừa chờ tới khi có slot.
+    """
+
+    def test_reader_waits_for_slot(self):
+        """TC-244: Scale thấp -> 1 slot; reader thứ hai chờ tới khi reader đầu trả slot"""
+        throttle = make_throttle([HIGH, HIGH, HIGH], max_readers=4)
+        for _ in range(3):
+            throttle.maybe_sample()
+        assert throttle.allowed_readers() == 1
+
+        assert throttle.acquire()
+        assert not throttle.acquire(blocking=False)
+
+        acquired = threading.Event()
+        thread = threading.Thread(target=lambda: throttle.acquire() and acquired.set())
+        thread.start()
+        assert not acquired.wait(0.2)
+
+        throttle.release()
+        assert acquired.wait(5)
+        thread.join()
+        throttle.release()
+        assert throttle.readers == 0
+
+
+# ============================================================================
+# TEST CLASS 3: PIPELINE
+# ============================================================================
+
+class TestPipelineThrottle:
+    """
+    💡 GIẢI THÍCH:
+    --throttle gắn SourceThrottle vào SourceDatabase và ghi quyết định vào _metadata.json.
+    """
+
+    def test_options_and_metadata(self, tmp_path):
+        """TC-245: Số reader tối đa theo workers / partitions; CDC bị từ chối"""
+        with pytest.raises(ValueError, match="throttle"):
+            IngestPipeline(staging_path=str(tmp_path), mode='cdc', throttle=True)
+
+        pipeline = IngestPipeline(staging_path=str(tmp_path), workers=3, partitions=4, throttle=True)
+        assert pipeline.db.throttle.max_readers == 6
+
+        metadata = pipeline._create_metadata(0.0)
+        assert metadata['throttle']['decisions'] == []
+        assert metadata['export_mode'] == 'streaming'
+        assert IngestPipeline(staging_path=str(tmp_path))._create_metadata(0.0)['throttle'] is None
@@ -0,0 +1,248 @@
+"""
+===============================================================================
+FILE: test_watermark.py
+PURPOSE: Unit tests cho watermark state và điều kiện lọc incremental
+AUTHOR: QC/QA Team
+VERSION: 1.0
+
+HƯỚNG DẪN SỬ DỤNG:
+    pytest tests/unit/test_watermark.py -v
+===============================================================================
+"""
+
+import json
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from src.ingestion.export_to_staging import IngestConfig, IngestPipeline
+from src.ingestion.watermark import (
+    WatermarkStore,
+    build_high_water_mark_query,
+    build_watermark_filter,
+    watermark_key,
+    write_json_atomic,
+)
+
+
+WM_1 = {'updated_at': '2024-01-15T10:00:00.123456', 'id': 100}
+WM_2 = {'updated_at': '2024-01-16T09:30:00', 'id': 250}
+
+
+# ============================================================================
+# TEST CLASS 1: WATERMARK STORE
+# ============================================================================
+
+class TestWatermarkStore:
+    """
+    💡 GIẢI THÍCH:
+    State file quyết định lower bound của lần chạy tiếp theo.
+    Chạy lại cùng ngày phải dùng watermark trước đó để tạo lại đủ delta.
+    """
+
+    def test_first_run_has_no_lower_bound(self, tmp_path):
+        """TC-120: Chưa có state -> lower bound None (initial load)"""
+        store = WatermarkStore(tmp_path / '_state' / 'watermarks.json')
+        assert store.get_lower_bound('orders', date(2024, 1, 15)) is None
+
+    def test_next_day_uses_saved_watermark(self, tmp_path):
+        """TC-121: Lưu xong, ngày kế tiếp dùng watermark mới"""
+        path = tmp_path / '_state' / 'watermarks.json'
+        store = WatermarkStore(path)
+        store.update('orders', date(2024, 1, 15), None, WM_1, rows=10)
+        store.save()
+
+        reloaded = WatermarkStore(path)
+        assert reloaded.get_lower_bound('orders', date(2024, 1, 16)) == WM_1
+
+    def test_rerun_same_day_uses_previous(self, tmp_path):
+        """TC-122: Chạy lại cùng snapshot_date dùng previous_watermark"""
+        store = WatermarkStore(tmp_path / 'watermarks.json')
+        store.update('orders', date(2024, 1, 16), WM_1, WM_2, rows=5)
+        assert store.get_lower_bound('orders', date(2024, 1, 16)) == WM_1
+
+    def test_older_date_rejected(self, tmp_path):
+        """TC-123: snapshot_date cũ hơn lần chạy gần nhất -> ValueError"""
+        store = WatermarkStore(tmp_path / 'watermarks.json')
+        store.update('orders', date(2024, 1, 16), WM_1, WM_2, rows=5)
+        with pytest.raises(ValueError):
+            store.get_lower_bound('orders', date(2024, 1, 15))
+
+    def test_atomic_write_leaves_no_temp_files(self, tmp_path):
+        """TC-124: Ghi atomic không để lại file tạm"""
+        path = tmp_path / 'watermarks.json'
+        write_json_atomic(path, {'orders': WM_1})
+
+        assert json.loads(path.read_text()) == {'orders': WM_1}
+        assert [p.name for p in tmp_path.iterdir()] == ['watermarks.json']
+
+
+# ============================================================================
+# TEST CLASS 2: FILTER
+# ============================================================================
+
+class TestWatermarkFilter:
+    """
+    💡 GIẢI THÍCH:
+    Điều kiện lọc lấy rows có (updated_at, id) trong khoảng (lower, upper].
+    """
+
+    def test_initial_load_includes_null_updated_at(self):
+        """TC-125: Lần đầu lấy tới upper và cả rows updated_at NULL"""
+        condition = build_watermark_filter(None, WM_1)
+        assert "(updated_at, id) <= (TIMESTAMP '2024-01-15 10:00:00.123456', 100)" in condition
+        assert 'updated_at IS NULL' in condition
+
+    def test_delta_range(self):
+        """TC-126: Có lower và upper -> khoảng nửa mở"""
+        condition = build_watermark_filter(WM_1, WM_2)
+        assert condition == (
+            "(updated_at, id) > (TIMESTAMP '2024-01-15 10:00:00.123456', 100) AND "
+            "(updated_at, id) <= (TIMESTAMP '2024-01-16 09:30:00', 250)"
+        )
+
+    def test_empty_source(self):
+        """TC-127: Source chưa có row nào -> đọc hết lần đầu, lần sau không có gì"""
+        assert build_watermark_filter(None, None) is None
+        assert build_watermark_filter(WM_1, None) == 'FALSE'
+
+
+# ============================================================================
+# TEST CLASS 3: LAG MARGIN
+# ============================================================================
+
+class SimulatedSource:
+    """
+    Source giả lập: row chỉ thấy được sau khi transaction commit,
+    updated_at = lúc transaction bắt đầu (NOW() của trigger).
+    """
+
+    def __init__(self, rows):
+        # (id, updated_at, committed_at)
+        self.rows = rows
+        self.now = None
+
+    def visible(self):
+        return [r for r in self.rows if r[2] <= self.now]
+
+    def get_high_water_mark(self, table_name, column='updated_at', schema='ecommerce', lag_seconds=0):
+        cutoff = self.now - timedelta(seconds=lag_seconds)
+        candidates = [(r[1], r[0]) for r in self.visible() if r[1] <= cutoff]
+        if not candidates:
+            return None
+        updated_at, id_ = max(candidates)
+        return {'updated_at': updated_at.isoformat(), 'id': id_}
+
+    def read(self, lower, upper):
+        """Rows trong (lower, upper] như build_watermark_filter"""
+        return {
+            r[0] for r in self.visible()
+            if watermark_key(lower) < watermark_key({'updated_at': r[1].isoformat(), 'id': r[0]})
+            <= watermark_key(upper)
+        }
+
+
+class TestWatermarkLag:
+    """
+    💡 GIẢI THÍCH:
+    Upper bound lùi lại một khoảng lag để transaction bắt đầu trước upper
+    nhưng commit sau lần đọc không bị bỏ sót ở cả hai lần chạy.
+    """
+
+    def test_query_applies_lag(self):
+        """TC-293: Lag > 0 -> bỏ qua rows có updated_at gần hơn lag theo đồng hồ source"""
+        query = build_high_water_mark_query('orders', lag_seconds=300)
+        assert "updated_at <= LOCALTIMESTAMP - INTERVAL '300.0 seconds'" in query
+        assert 'ORDER BY updated_at DESC, id DESC LIMIT 1' in query
+        assert 'LOCALTIMESTAMP' not in build_high_water_mark_query('orders')
+
+    @pytest.mark.parametrize('lag_seconds, exported', [(0, {1, 2, 3}), (60, {1, 2, 3, 4})])
+    def test_late_commit_not_skipped(self, tmp_path, monkeypatch, lag_seconds, exported):
+        """TC-294: Transaction bắt đầu trước upper, commit sau lần đọc -> lần sau vẫn lấy được (khi có lag)"""
+        monkeypatch.setattr(IngestConfig, 'WATERMARK_LAG_SECONDS', lag_seconds)
+        run_1 = datetime(2024, 1, 15, 12, 0, 0)
+        source = SimulatedSource([
+            (1, run_1 - timedelta(hours=1), run_1 - timedelta(hours=1)),
+            (2, run_1 - timedelta(seconds=30), run_1 - timedelta(seconds=29)),
+            # Bắt đầu trước row 2 nhưng commit sau lần chạy 1
+            (4, run_1 - timedelta(seconds=40), run_1 + timedelta(seconds=5)),
+            (3, run_1 + timedelta(hours=1), run_1 + timedelta(hours=1)),
+        ])
+
+        seen = set()
+        for day, now in [(date(2024, 1, 15), run_1), (date(2024, 1, 16), run_1 + timedelta(days=1))]:
+            source.now = now
+            pipeline = IngestPipeline(
+                tables=['orders'], snapshot_date=day, staging_path=str(tmp_path), mode='incremental'
+            )
+            pipeline.db = source
+            pipeline._plan_incremental()
+            plan = pipeline.incremental_plan['orders']
+            assert plan['lag_seconds'] == lag_seconds
+
+            rows = source.read(plan['watermark_from'], plan['watermark_to'])
+            seen |= rows
+            pipeline.results = [{'table': 'orders', 'status': 'success', 'rows': len(rows)}]
+            pipeline._commit_watermarks()
+
+        assert seen == exported
+
+    def test_upper_never_below_lower(self, tmp_path, monkeypatch):
+        """TC-295: Mọi row mới còn trong khoảng lag -> khoảng rỗng, watermark không lùi"""
+        store = WatermarkStore(tmp_path / '_state' / 'watermarks.json')
+        store.update('orders', date(2024, 1, 15), None, WM_2, 10)
+        store.save()
+
+        pipeline = IngestPipeline(
+            tables=['orders'], snapshot_date=date(2024, 1, 16), staging_path=str(tmp_path), mode='incremental'
+        )
+        monkeypatch.setattr(pipeline.db, 'get_high_water_mark', lambda *args: WM_1)
+        pipeline._plan_incremental()
+
+        plan = pipeline.incremental_plan['orders']
+        assert plan['watermark_to'] == WM_2
+        assert plan['where'] == build_watermark_filter(WM_2, WM_2)
+
+
+class TestChildWatermark:
+    """
+    💡 GIẢI THÍCH:
+    order_items / invoice_items không có updated_at: ngoài rows của parent
+    thay đổi, rows mới của child lấy theo watermark (created_at, id) riêng.
+    """
+
+    OWN_1 = {'created_at': '2024-01-15T09:00:00', 'id': 500}
+    OWN_2 = {'created_at': '2024-01-16T08:00:00', 'id': 510}
+
+    def test_filter_uses_column_key(self):
+        """TC-303: Watermark theo created_at -> lọc theo created_at"""
+        assert build_watermark_filter(self.OWN_1, self.OWN_2, 'created_at') == (
+            "(created_at, id) > (TIMESTAMP '2024-01-15 09:00:00', 500) AND "
+            "(created_at, id) <= (TIMESTAMP '2024-01-16 08:00:00', 510)"
+        )
+
+    def test_late_child_under_unchanged_parent(self, tmp_path, monkeypatch):
+        """TC-304: Parent không đổi, child thêm muộn -> vẫn được lấy; watermark child được lưu"""
+        store = WatermarkStore(tmp_path / '_state' / 'watermarks.json')
+        store.update('order_items', date(2024, 1, 15), None, WM_2, 10)
+        store.update('order_items:created_at', date(2024, 1, 15), None, self.OWN_1, 10)
+        store.save()
+
+        pipeline = IngestPipeline(
+            tables=['order_items'], snapshot_date=date(2024, 1, 16), staging_path=str(tmp_path),
+            mode='incremental'
+        )
+        marks = {('orders', 'updated_at'): WM_2, ('order_items', 'created_at'): self.OWN_2}
+        monkeypatch.setattr(pipeline.db, 'get_high_water_mark', lambda table, column, *args: marks[(table, column)])
+        pipeline._plan_incremental()
+
+        plan = pipeline.incremental_plan['order_items']
+        parent = build_watermark_filter(WM_2, WM_2)
+        own = build_watermark_filter(self.OWN_1, self.OWN_2, 'created_at')
+        assert plan['where'] == f"(order_id IN (SELECT id FROM ecommerce.orders WHERE {parent}) OR {own})"
+
+        pipeline.results = [{'table': 'order_items', 'status': 'success', 'rows': 1}]
+        pipeline._commit_watermarks()
+        reloaded = WatermarkStore(tmp_path / '_state' / 'watermarks.json')
+        assert reloaded.get_lower_bound('order_items', date(2024, 1, 17)) == WM_2
+        assert reloaded.get_lower_bound('order_items:created_at', date(2024, 1, 17)) == self.OWN_2